@@ -185,6 +185,11 @@ TEMPLATE_LOADERS = (
 #     'django.template.loaders.eggs.Loader',
 )
 
+# Path of the file in which the cached template loader saves parsed templates
+# for other processes, or None. Run "django-admin.py cachetemplates" to
+# create it.
+TEMPLATE_CACHE_FILE = None
+
 # List of processors used by RequestContext to populate the context.
 # Each one should be a callable that takes the request object as its
 # only parameter and returns a dictionary to add to the context.
@@ -200,6 +205,10 @@ TEMPLATE_CONTEXT_PROCESSORS = (
 # Output to use in template system for invalid (e.g. misspelled) variables.
 TEMPLATE_STRING_IF_INVALID = ''
 
+# Whether templates are compiled to Python functions the first time they are
+# rendered, rather than rendered by walking their nodes.
+TEMPLATE_COMPILE = False
+
 # URL prefix for admin media -- CSS, JavaScript and images. Make sure to use a
 # trailing slash.
 # Examples: "http://foo.com/media/", "/media/".
@@ -419,6 +428,8 @@ SESSION_SAVE_EVERY_REQUEST = False                      # Whether to save the se
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False                 # Whether a user's session cookie expires when the Web browser is closed.
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'  # The module to store session data
 SESSION_FILE_PATH = None                                # Directory to store session files if using the file session module. If None, the backend will use a sensible default.
+SESSION_SERIALIZER = 'pickle'                           # How session data is serialized: 'pickle', 'marshal', 'json' or the import path of a serializer class.
+SESSION_COMPRESS_MIN_LENGTH = 0                         # Serialized session data at least this long is compressed with zlib. 0 disables compression.
 
 #########
 # CACHE #
@@ -427,8 +438,17 @@ SESSION_FILE_PATH = None                                # Directory to store ses
 # The cache backend to use.  See the docstring in django.core.cache for the
 # possible values.
 CACHE_BACKEND = 'locmem://'
+
+# The prefix and version included in all cache keys, and the function
+# combining them with keys (None for the default one). The CACHE_BACKEND
+# arguments key_prefix, version and key_function override them.
+CACHE_KEY_PREFIX = ''
+CACHE_VERSION = 1
+CACHE_KEY_FUNCTION = None
+
 CACHE_MIDDLEWARE_KEY_PREFIX = ''
 CACHE_MIDDLEWARE_SECONDS = 600
+CACHE_MIDDLEWARE_STALE_SECONDS = 0
 
 ####################
 # COMMENTS         #
@@ -154,6 +154,19 @@ class GenericRelation(RelatedField, Field):
         # same db_type as well.
         return None
 
+    def bulk_related_objects(self, model, pk_vals, using):
+        """
+        Returns a QuerySet of all the objects related through this relation to
+        the objects of 'model' with the given primary keys. Used when those
+        objects are deleted.
+        """
+        ContentType = get_model("contenttypes", "contenttype")
+        content_type = ContentType.objects.db_manager(using).get_for_model(model)
+        return self.rel.to._base_manager.using(using).filter(**{
+            self.content_type_field_name: content_type,
+            "%s__in" % self.object_id_field_name: pk_vals,
+        })
+
     def extra_filters(self, pieces, pos, negate):
         """
         Return an extra filter to the queryset so that the results are filtered
@@ -4,14 +4,11 @@ import random
 import sys
 import time
 from datetime import datetime, timedelta
-try:
-    import cPickle as pickle
-except ImportError:
-    import pickle
 
 from django.conf import settings
 from django.core.exceptions import SuspiciousOperation
 from django.utils.hashcompat import md5_constructor
+from django.utils.serialization import get_serializer
 
 # Use the system (hardware-based) random number generator if it exists.
 if hasattr(random, 'SystemRandom'):
@@ -63,7 +60,8 @@ class SessionBase(object):
         return self._session.get(key, default)
 
     def pop(self, key, *args):
-        self.modified = self.modified or key in self._session
+        if key in self._session:
+            self.modified = True
         return self._session.pop(key, *args)
 
     def setdefault(self, key, value):
@@ -83,23 +81,30 @@ class SessionBase(object):
     def delete_test_cookie(self):
         del self[self.TEST_COOKIE_NAME]
 
+    def _get_serializer(self):
+        return get_serializer(settings.SESSION_SERIALIZER,
+                              settings.SESSION_COMPRESS_MIN_LENGTH)
+
     def encode(self, session_dict):
-        "Returns the given session dictionary pickled and encoded as a string."
-        pickled = pickle.dumps(session_dict, pickle.HIGHEST_PROTOCOL)
-        pickled_md5 = md5_constructor(pickled + settings.SECRET_KEY).hexdigest()
-        return base64.encodestring(pickled + pickled_md5)
+        "Returns the given session dictionary serialized and encoded as a string."
+        serialized = self._get_serializer().dumps(session_dict)
+        serialized_md5 = md5_constructor(serialized + settings.SECRET_KEY).hexdigest()
+        return base64.b64encode(serialized + serialized_md5)
 
     def decode(self, session_data):
-        encoded_data = base64.decodestring(session_data)
-        pickled, tamper_check = encoded_data[:-32], encoded_data[-32:]
-        if md5_constructor(pickled + settings.SECRET_KEY).hexdigest() != tamper_check:
+        encoded_data = base64.b64decode(session_data)
+        serialized, tamper_check = encoded_data[:-32], encoded_data[-32:]
+        if md5_constructor(serialized + settings.SECRET_KEY).hexdigest() != tamper_check:
             raise SuspiciousOperation("User tampered with session cookie.")
         try:
-            return pickle.loads(pickled)
-        # Unpickling can cause a variety of exceptions. If something happens,
-        # just return an empty dictionary (an empty session).
+            session_dict = self._get_serializer().loads(serialized)
+        # Deserializing can cause a variety of exceptions. If something
+        # happens, just return an empty dictionary (an empty session).
         except:
             return {}
+        # Kept for has_changed().
+        self._loaded_payload = serialized
+        return session_dict
 
     def update(self, dict_):
         self._session.update(dict_)
@@ -128,6 +133,24 @@ class SessionBase(object):
         self.accessed = True
         self.modified = True
 
+    def has_changed(self):
+        """
+        Returns False if the session has the same key and data as when it was
+        loaded, e.g. because values were replaced with equal ones, so that
+        saving it can be skipped. Sessions whose backend didn't decode the
+        data itself, like the cache backend, always count as changed.
+        """
+        try:
+            session_key, serialized = self._original
+        except AttributeError:
+            return True
+        if serialized is None or session_key != self._session_key:
+            return True
+        try:
+            return self._get_serializer().loads(serialized) != self._session
+        except Exception:
+            return True
+
     def _get_new_session_key(self):
         "Returns session key that isn't being used."
         # The random module is seeded when this Apache child is created.
@@ -166,10 +189,18 @@ class SessionBase(object):
         try:
             return self._session_cache
         except AttributeError:
+            # Loading may replace an invalid session key, which counts as a
+            # change.
+            session_key = self._session_key
+            self._loaded_payload = None
             if self._session_key is None or no_load:
                 self._session_cache = {}
             else:
                 self._session_cache = self.load()
+            # Remember the serialized data the session was decoded from, if
+            # any, for has_changed(). Unlike the loaded dictionary, it doesn't
+            # see values changed in place before being assigned again.
+            self._original = (session_key, self._loaded_payload)
         return self._session_cache
 
     _session = property(_get_session)
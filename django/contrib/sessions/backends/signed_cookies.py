@@ -0,0 +1,102 @@
+import base64
+import hmac
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import SessionBase
+from django.utils.hashcompat import sha_hmac
+
+class SessionStore(SessionBase):
+    """
+    Stores the session data in the session cookie itself, serialized and
+    signed so that it can't be tampered with. Loading and saving a session
+    doesn't need any server-side storage.
+
+    The session key is the content of the cookie: the expiry time of the
+    session and its data, followed by their HMAC/SHA1 signature.
+    """
+    def load(self):
+        session_data = self._decode(self._session_key)
+        if session_data is None:
+            # The cookie was tampered with, or has expired.
+            self.create()
+            return {}
+        return session_data
+
+    def create(self):
+        self._session_key = None
+        self.modified = True
+
+    def save(self, must_create=False):
+        self._session_key = self._encode(self._get_session(no_load=must_create))
+
+    def exists(self, session_key):
+        return False
+
+    def delete(self, session_key=None):
+        # The cookie is replaced with one holding an empty session.
+        self._session_key = None
+        self._session_cache = {}
+        self.modified = True
+
+    def cycle_key(self):
+        # The cookie changes with every save anyway.
+        self.save()
+
+    def _get_session_key(self):
+        return self._session_key
+
+    session_key = property(_get_session_key, SessionBase._set_session_key)
+
+    def _hash(self, value):
+        """
+        Creates an HMAC/SHA1 hash based on the value and the project setting's
+        SECRET_KEY, modified to make it unique for the present purpose.
+        """
+        key = 'django.contrib.sessions.backends.signed_cookies' + settings.SECRET_KEY
+        return hmac.new(key, value, sha_hmac).hexdigest()
+
+    def _encode(self, session_dict):
+        data = base64.urlsafe_b64encode(self._get_serializer().dumps(session_dict))
+        value = '%d:%s' % (time.time() + self.get_expiry_age(), data.rstrip('='))
+        return '%s$%s' % (self._hash(value), value)
+
+    def _decode(self, cookie):
+        """
+        Returns the session dictionary stored in the cookie, or None if the
+        cookie is invalid or has expired.
+        """
+        if not cookie:
+            return None
+        try:
+            signature, value = str(cookie).split('$', 1)
+        except (ValueError, UnicodeEncodeError):
+            return None
+        if not constant_time_compare(signature, self._hash(value)):
+            return None
+        try:
+            expiry, data = value.split(':', 1)
+            if int(expiry) < time.time():
+                return None
+            data = base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+            session_dict = self._get_serializer().loads(data)
+        # Deserializing can cause a variety of exceptions. If something
+        # happens, just treat it as an invalid cookie.
+        except:
+            return None
+        # Kept for has_changed().
+        self._loaded_payload = data
+        return session_dict
+
+def constant_time_compare(val1, val2):
+    """
+    Returns True if the two strings are equal, taking the same time whatever
+    the position of the first difference, so that the time taken doesn't
+    reveal how much of a signature was guessed right.
+    """
+    if len(val1) != len(val2):
+        return False
+    result = 0
+    for x, y in zip(val1, val2):
+        result |= ord(x) ^ ord(y)
+    return result == 0
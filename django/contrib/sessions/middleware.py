@@ -14,7 +14,8 @@ class SessionMiddleware(object):
     def process_response(self, request, response):
         """
         If request.session was modified, or if the configuration is to save the
-        session every time, save the changes and set a session cookie.
+        session every time, save the changes and set a session cookie. A
+        modified session whose data ended up the same isn't saved.
         """
         try:
             accessed = request.session.accessed
@@ -24,7 +25,8 @@ class SessionMiddleware(object):
         else:
             if accessed:
                 patch_vary_headers(response, ('Cookie',))
-            if modified or settings.SESSION_SAVE_EVERY_REQUEST:
+            if settings.SESSION_SAVE_EVERY_REQUEST or (modified and
+                    request.session.has_changed()):
                 if request.session.get_expire_at_browser_close():
                     max_age = None
                     expires = None
@@ -1,20 +1,18 @@
-import base64
-import cPickle as pickle
+import datetime
+import time
 
-from django.db import models
+from django.contrib.sessions.backends.base import SessionBase
+from django.db import connections, models, router, transaction
+from django.db.models.sql.constants import GET_ITERATOR_CHUNK_SIZE
 from django.utils.translation import ugettext_lazy as _
-from django.conf import settings
-from django.utils.hashcompat import md5_constructor
 
 
 class SessionManager(models.Manager):
     def encode(self, session_dict):
         """
-        Returns the given session dictionary pickled and encoded as a string.
+        Returns the given session dictionary serialized and encoded as a string.
         """
-        pickled = pickle.dumps(session_dict)
-        pickled_md5 = md5_constructor(pickled + settings.SECRET_KEY).hexdigest()
-        return base64.encodestring(pickled + pickled_md5)
+        return SessionBase().encode(session_dict)
 
     def save(self, session_key, session_dict, expire_date):
         s = self.model(session_key, self.encode(session_dict), expire_date)
@@ -24,6 +22,44 @@ class SessionManager(models.Manager):
             s.delete() # Clear sessions with no data.
         return s
 
+    def delete_expired(self, batch_size=1000, sleep=0, callback=None, using=None):
+        """
+        Deletes the sessions that have expired, batch_size sessions at a time,
+        committing after each batch and then sleeping for 'sleep' seconds, so
+        that purging a big table doesn't hold locks on it for long. The rows
+        are deleted with raw DELETE queries rather than loaded as objects.
+
+        If given, callback is called after each batch with the number of
+        sessions deleted so far. Returns the number of sessions deleted.
+        """
+        if using is None:
+            using = router.db_for_write(self.model)
+        connection = connections[using]
+        opts = self.model._meta
+        table = connection.ops.quote_name(opts.db_table)
+        column = connection.ops.quote_name(opts.pk.column)
+        now = datetime.datetime.now()
+        deleted = 0
+        while True:
+            keys = list(self.using(using).filter(expire_date__lt=now)
+                        .values_list('pk', flat=True)[:batch_size])
+            if not keys:
+                break
+            cursor = connection.cursor()
+            for offset in range(0, len(keys), GET_ITERATOR_CHUNK_SIZE):
+                chunk = keys[offset:offset + GET_ITERATOR_CHUNK_SIZE]
+                cursor.execute("DELETE FROM %s WHERE %s IN (%s)"
+                               % (table, column, ', '.join(['%s'] * len(chunk))), chunk)
+            transaction.commit_unless_managed(using=using)
+            deleted += len(keys)
+            if callback is not None:
+                callback(deleted)
+            if len(keys) < batch_size:
+                break
+            if sleep:
+                time.sleep(sleep)
+        return deleted
+
 
 class Session(models.Model):
     """
@@ -45,7 +81,7 @@ class Session(models.Model):
     session_key = models.CharField(_('session key'), max_length=40,
                                    primary_key=True)
     session_data = models.TextField(_('session data'))
-    expire_date = models.DateTimeField(_('expire date'))
+    expire_date = models.DateTimeField(_('expire date'), db_index=True)
     objects = SessionManager()
 
     class Meta:
@@ -54,14 +90,4 @@ class Session(models.Model):
         verbose_name_plural = _('sessions')
 
     def get_decoded(self):
-        encoded_data = base64.decodestring(self.session_data)
-        pickled, tamper_check = encoded_data[:-32], encoded_data[-32:]
-        if md5_constructor(pickled + settings.SECRET_KEY).hexdigest() != tamper_check:
-            from django.core.exceptions import SuspiciousOperation
-            raise SuspiciousOperation("User tampered with session cookie.")
-        try:
-            return pickle.loads(pickled)
-        # Unpickling can cause a variety of exceptions. If something happens,
-        # just return an empty dictionary (an empty session).
-        except:
-            return {}
+        return SessionBase().decode(self.session_data)
@@ -381,6 +381,184 @@ True
 True
 
 >>> settings.SESSION_EXPIRE_AT_BROWSER_CLOSE = original_expire_at_browser_close
+
+# Session data can be serialized in other formats, and compressed.
+>>> original_serializer = settings.SESSION_SERIALIZER
+>>> original_compress_min_length = settings.SESSION_COMPRESS_MIN_LENGTH
+>>> data = {'a test key': 'a test value', 'list': ['x' * 100] * 10}
+>>> for serializer in ('pickle', 'marshal', 'json'):
+...     settings.SESSION_SERIALIZER = serializer
+...     for compress_min_length in (0, 100):
+...         settings.SESSION_COMPRESS_MIN_LENGTH = compress_min_length
+...         print serializer, compress_min_length, SessionBase().decode(SessionBase().encode(data)) == data
+pickle 0 True
+pickle 100 True
+marshal 0 True
+marshal 100 True
+json 0 True
+json 100 True
+>>> settings.SESSION_COMPRESS_MIN_LENGTH = 0
+>>> encoded = SessionBase().encode(data)
+>>> settings.SESSION_COMPRESS_MIN_LENGTH = 100
+>>> len(SessionBase().encode(data)) < len(encoded)
+True
+>>> settings.SESSION_SERIALIZER = original_serializer
+>>> settings.SESSION_COMPRESS_MIN_LENGTH = original_compress_min_length
+
+# Sessions stored by the database backend can be decoded from the model.
+>>> db_session = DatabaseSession()
+>>> db_session['cat'] = 'dog'
+>>> db_session.save()
+>>> Session.objects.get(pk=db_session.session_key).get_decoded()
+{'cat': 'dog'}
+
+# Sessions stored in signed cookies.
+>>> from django.contrib.sessions.backends.signed_cookies import SessionStore as CookieSession
+>>> cookie_session = CookieSession()
+>>> cookie_session.modified
+False
+>>> cookie_session['cat'] = "dog"
+>>> cookie_session.modified
+True
+>>> cookie_session.save()
+>>> cookie = cookie_session.session_key
+>>> CookieSession(cookie)['cat']
+'dog'
+>>> CookieSession(cookie).exists(cookie)
+False
+
+# The cookie changes when the data does.
+>>> cookie_session['cat'] = "mouse"
+>>> cookie_session.save()
+>>> cookie_session.session_key == cookie
+False
+>>> CookieSession(cookie_session.session_key)['cat']
+'mouse'
+
+# Tampered, garbled and expired cookies are ignored.
+>>> signature, value = cookie.split('$')
+>>> tampered = CookieSession('%s$%s' % (signature, value.replace(value[-2], 'A' != value[-2] and 'A' or 'B')))
+>>> tampered.get('cat'), tampered.modified
+(None, True)
+>>> CookieSession('garbage').get('cat')
+>>> CookieSession(u'd\xe9j\xe0$vu').get('cat')
+>>> cookie_session.set_expiry(-10)
+>>> cookie_session.save()
+>>> CookieSession(cookie_session.session_key).get('cat')
+
+# Flushing the session empties it.
+>>> cookie_session.set_expiry(None)
+>>> cookie_session.flush()
+>>> cookie_session.save()
+>>> CookieSession(cookie_session.session_key).items()
+[]
+
+# has_changed() tells whether a modified session ended up with other data.
+>>> db_session = DatabaseSession()
+>>> db_session['cat'] = 'dog'
+>>> db_session.save()
+>>> db_session = DatabaseSession(db_session.session_key)
+>>> db_session['cat'] = 'dog'
+>>> db_session.modified, db_session.has_changed()
+(True, False)
+>>> db_session['cat'] = 'mouse'
+>>> db_session.has_changed()
+True
+>>> db_session['cat'] = 'dog'
+>>> db_session.has_changed()
+False
+>>> db_session.cycle_key()
+>>> db_session.has_changed()
+True
+
+# Values changed in place before being assigned again are changes too.
+>>> db_session = DatabaseSession()
+>>> db_session['cart'] = ['apple']
+>>> db_session.save()
+>>> db_session = DatabaseSession(db_session.session_key)
+>>> cart = db_session.get('cart')
+>>> cart.append('pear')
+>>> db_session['cart'] = cart
+>>> db_session.modified, db_session.has_changed()
+(True, True)
+
+# The cache backend doesn't decode the data itself, so its sessions always
+# count as changed.
+>>> cache_session = CacheSession()
+>>> cache_session['cat'] = 'dog'
+>>> cache_session.save()
+>>> cache_session = CacheSession(cache_session.session_key)
+>>> cache_session['cat'] = 'dog'
+>>> cache_session.has_changed()
+True
+
+# The session middleware doesn't save sessions that haven't changed.
+>>> from django.contrib.sessions.middleware import SessionMiddleware
+>>> from django.http import HttpRequest, HttpResponse
+>>> db_session = DatabaseSession()
+>>> db_session['cat'] = 'dog'
+>>> db_session.save()
+>>> request = HttpRequest()
+>>> request.COOKIES[settings.SESSION_COOKIE_NAME] = db_session.session_key
+>>> SessionMiddleware().process_request(request)
+>>> request.session['cat'] = 'dog'
+>>> response = SessionMiddleware().process_response(request, HttpResponse())
+>>> settings.SESSION_COOKIE_NAME in response.cookies
+False
+>>> request.session['cat'] = 'mouse'
+>>> response = SessionMiddleware().process_response(request, HttpResponse())
+>>> response.cookies[settings.SESSION_COOKIE_NAME].value == db_session.session_key
+True
+>>> request = HttpRequest()
+>>> request.COOKIES[settings.SESSION_COOKIE_NAME] = db_session.session_key
+>>> SessionMiddleware().process_request(request)
+>>> cats = request.session.get('cats', [])
+>>> cats.append('tabby')
+>>> request.session['cats'] = cats
+>>> response = SessionMiddleware().process_response(request, HttpResponse())
+>>> DatabaseSession(db_session.session_key)['cats']
+['tabby']
+>>> DatabaseSession(db_session.session_key)['cat']
+'mouse'
+
+# Expired sessions are purged in batches.
+>>> import datetime
+>>> from django.core.management import call_command
+>>> from StringIO import StringIO
+>>> Session.objects.all().delete()
+>>> past = datetime.datetime.now() - datetime.timedelta(days=1)
+>>> for i in range(5):
+...     Session.objects.save('expired%d' % i, {'cat': 'dog'}, past).session_key
+'expired0'
+'expired1'
+'expired2'
+'expired3'
+'expired4'
+>>> s = DatabaseSession()
+>>> s['cat'] = 'dog'
+>>> s.save()
+>>> progress = []
+>>> Session.objects.delete_expired(batch_size=2, callback=progress.append)
+5
+>>> progress
+[2, 4, 5]
+>>> Session.objects.filter(pk=s.session_key).count(), Session.objects.count()
+(1, 1)
+>>> Session.objects.delete_expired()
+0
+
+>>> for i in range(3):
+...     Session.objects.save('expired%d' % i, {'cat': 'dog'}, past).session_key
+'expired0'
+'expired1'
+'expired2'
+>>> out = StringIO()
+>>> call_command('cleanup', batch_size=2, verbosity=2, stdout=out)
+>>> print out.getvalue(),
+Deleted 2 expired sessions
+Deleted 3 expired sessions
+>>> Session.objects.count()
+1
 """
 
 if __name__ == '__main__':
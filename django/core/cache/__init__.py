@@ -30,6 +30,7 @@ BACKENDS = {
     'file': 'filebased',
     'db': 'db',
     'dummy': 'dummy',
+    'tiered': 'tiered',
 }
 
 def parse_backend_uri(backend_uri):
@@ -1,10 +1,61 @@
 "Base Cache class."
 
+import time
+
+from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
+from django.utils.importlib import import_module
+from django.utils.serialization import get_serializer
 
 class InvalidCacheBackendError(ImproperlyConfigured):
     pass
 
+# Timeout of the generation counters of namespaces: the longest relative
+# timeout memcached accepts.
+NAMESPACE_TIMEOUT = 60 * 60 * 24 * 30
+
+# First item of the entries stored by _set_refreshable(), telling them apart
+# from the values stored with set(). The entries are lists or tuples, so that
+# they survive all the serializers.
+REFRESHABLE_MARKER = 'django.core.cache.refreshable'
+
+def is_refreshable(entry):
+    """
+    Returns True if the given cache entry was stored by _set_refreshable().
+    """
+    return (isinstance(entry, (tuple, list)) and len(entry) == 3 and
+            entry[0] == REFRESHABLE_MARKER)
+
+def default_key_func(key, key_prefix, version):
+    """
+    Default function to generate keys.
+
+    Constructs the key used by all other methods. By default it prepends
+    the key prefix and the version. A different key function can be provided
+    at the time of cache construction; alternatively, you can subclass the
+    cache backend to provide custom key making behavior.
+    """
+    return '%s:%s:%s' % (key_prefix, version, key)
+
+def get_key_func(key_func):
+    """
+    Returns the key function given either as a callable or as the import path
+    of a function, or the default key function if key_func is None.
+    """
+    if key_func is None:
+        return default_key_func
+    if callable(key_func):
+        return key_func
+    try:
+        mod_name, func_name = key_func.rsplit('.', 1)
+        mod = import_module(mod_name)
+    except (ImportError, ValueError), e:
+        raise ImproperlyConfigured('Error importing cache key function %s: "%s"' % (key_func, e))
+    try:
+        return getattr(mod, func_name)
+    except AttributeError:
+        raise ImproperlyConfigured('Module "%s" does not define a "%s" function' % (mod_name, func_name))
+
 class BaseCache(object):
     def __init__(self, params):
         timeout = params.get('timeout', 300)
@@ -14,7 +65,34 @@ class BaseCache(object):
             timeout = 300
         self.default_timeout = timeout
 
-    def add(self, key, value, timeout=None):
+        compress_min_length = params.get('compress_min_length', 0)
+        try:
+            compress_min_length = int(compress_min_length)
+        except (ValueError, TypeError):
+            compress_min_length = 0
+        self._serializer = get_serializer(params.get('serializer', 'pickle'),
+                                          compress_min_length)
+
+        self.key_prefix = params.get('key_prefix', settings.CACHE_KEY_PREFIX)
+        version = params.get('version', settings.CACHE_VERSION)
+        try:
+            self.version = int(version)
+        except (ValueError, TypeError):
+            self.version = 1
+        self.key_func = get_key_func(params.get('key_function', settings.CACHE_KEY_FUNCTION))
+
+    def make_key(self, key, version=None):
+        """
+        Constructs the key used by all other methods. By default it uses the
+        key function, which prepends the key prefix and the version: entries
+        stored with another prefix or version are never seen. The version
+        defaults to the one of the cache.
+        """
+        if version is None:
+            version = self.version
+        return self.key_func(key, self.key_prefix, version)
+
+    def add(self, key, value, timeout=None, version=None):
         """
         Set a value in the cache if the key does not already exist. If
         timeout is given, that timeout will be used for the key; otherwise
@@ -24,27 +102,27 @@ class BaseCache(object):
         """
         raise NotImplementedError
 
-    def get(self, key, default=None):
+    def get(self, key, default=None, version=None):
         """
         Fetch a given key from the cache. If the key does not exist, return
         default, which itself defaults to None.
         """
         raise NotImplementedError
 
-    def set(self, key, value, timeout=None):
+    def set(self, key, value, timeout=None, version=None):
         """
         Set a value in the cache. If timeout is given, that timeout will be
         used for the key; otherwise the default cache timeout will be used.
         """
         raise NotImplementedError
 
-    def delete(self, key):
+    def delete(self, key, version=None):
         """
         Delete a key from the cache, failing silently.
         """
         raise NotImplementedError
 
-    def get_many(self, keys):
+    def get_many(self, keys, version=None):
         """
         Fetch a bunch of keys from the cache. For certain backends (memcached,
         pgsql) this can be *much* faster when fetching multiple values.
@@ -54,34 +132,102 @@ class BaseCache(object):
         """
         d = {}
         for k in keys:
-            val = self.get(k)
+            val = self.get(k, version=version)
             if val is not None:
                 d[k] = val
         return d
 
-    def has_key(self, key):
+    def get_or_set(self, key, default, timeout=None, stale_ttl=None, version=None):
+        """
+        Fetch a given key from the cache. If the key does not exist, call
+        default, store the value it returns in the cache and return it. If
+        timeout is given, that timeout will be used for the key; otherwise
+        the default cache timeout will be used.
+
+        If stale_ttl is given, values are kept stale_ttl seconds longer than
+        the timeout. The first caller to find a value out of date during that
+        time recomputes it, holding a lock stored in the cache, while other
+        callers keep getting the stale value instead of all recomputing it at
+        once.
+        """
+        if timeout is None:
+            timeout = self.default_timeout
+        if not stale_ttl:
+            value = self.get(key, version=version)
+            if is_refreshable(value):
+                value = value[2]
+            elif value is None:
+                value = default()
+                self.set(key, value, timeout, version=version)
+            return value
+        value, refresh, locked = self._get_refreshable(key, stale_ttl, version=version)
+        if refresh:
+            try:
+                value = default()
+            except:
+                if locked:
+                    self.delete(self._refresh_lock_key(key), version=version)
+                raise
+            self._set_refreshable(key, value, timeout, stale_ttl, locked, version=version)
+        return value
+
+    def _refresh_lock_key(self, key):
+        return '%s.refresh_lock' % key
+
+    def _get_refreshable(self, key, stale_ttl, version=None):
+        """
+        Fetch a value stored by _set_refreshable(). Returns a (value, refresh,
+        locked) tuple: refresh is True if the caller has to compute the value,
+        because it isn't in the cache, or because it's out of date and the
+        caller got the lock to refresh it, in which case locked is True too.
+        value is None if it isn't in the cache. A value stored with set()
+        rather than _set_refreshable(), for instance before stale_ttl was used
+        for the key, counts as missing.
+        """
+        entry = self.get(key, version=version)
+        if not is_refreshable(entry):
+            return None, True, False
+        fresh_until, value = entry[1:]
+        if fresh_until > time.time():
+            return value, False, False
+        locked = self.add(self._refresh_lock_key(key), True, stale_ttl, version=version)
+        return value, locked, locked
+
+    def _set_refreshable(self, key, value, timeout, stale_ttl, locked=False, version=None):
+        """
+        Store a value that is up to date for timeout seconds, and is kept
+        stale_ttl seconds longer to be served while it's refreshed. If locked
+        is True, releases the lock taken by _get_refreshable().
+        """
+        entry = (REFRESHABLE_MARKER, time.time() + timeout, value)
+        self.set(key, entry, timeout + stale_ttl, version=version)
+        if locked:
+            self.delete(self._refresh_lock_key(key), version=version)
+
+    def has_key(self, key, version=None):
         """
         Returns True if the key is in the cache and has not expired.
         """
-        return self.get(key) is not None
+        return self.get(key, version=version) is not None
 
-    def incr(self, key, delta=1):
+    def incr(self, key, delta=1, version=None):
         """
         Add delta to value in the cache. If the key does not exist, raise a
         ValueError exception.
         """
-        if key not in self:
+        value = self.get(key, version=version)
+        if value is None:
             raise ValueError("Key '%s' not found" % key)
-        new_value = self.get(key) + delta
-        self.set(key, new_value)
+        new_value = value + delta
+        self.set(key, new_value, version=version)
         return new_value
 
-    def decr(self, key, delta=1):
+    def decr(self, key, delta=1, version=None):
         """
         Subtract delta from value in the cache. If the key does not exist, raise
         a ValueError exception.
         """
-        return self.incr(key, -delta)
+        return self.incr(key, -delta, version=version)
 
     def __contains__(self, key):
         """
@@ -92,7 +238,7 @@ class BaseCache(object):
         # if a subclass overrides it.
         return self.has_key(key)
 
-    def set_many(self, data, timeout=None):
+    def set_many(self, data, timeout=None, version=None):
         """
         Set a bunch of values in the cache at once from a dict of key/value
         pairs.  For certain backends (memcached), this is much more efficient
@@ -102,17 +248,146 @@ class BaseCache(object):
         the default cache timeout will be used.
         """
         for key, value in data.items():
-            self.set(key, value, timeout)
+            self.set(key, value, timeout, version=version)
 
-    def delete_many(self, keys):
+    def delete_many(self, keys, version=None):
         """
         Set a bunch of values in the cache at once.  For certain backends
         (memcached), this is much more efficient than calling delete() multiple
         times.
         """
         for key in keys:
-            self.delete(key)
+            self.delete(key, version=version)
+
+    def incr_version(self, key, delta=1, version=None):
+        """
+        Moves the value of a key to the next version (or the version delta
+        versions further), and returns the new version. If the key does not
+        exist, raise a ValueError exception.
+        """
+        if version is None:
+            version = self.version
+        value = self.get(key, version=version)
+        if value is None:
+            raise ValueError("Key '%s' not found" % key)
+        self.set(key, value, version=version + delta)
+        self.delete(key, version=version)
+        return version + delta
+
+    def decr_version(self, key, delta=1, version=None):
+        """
+        Moves the value of a key to the previous version (or the version delta
+        versions back), and returns the new version. If the key does not
+        exist, raise a ValueError exception.
+        """
+        return self.incr_version(key, -delta, version)
+
+    def namespace(self, name):
+        """
+        Returns a CacheNamespace: a view of this cache whose keys belong to
+        the namespace called 'name', and can all be invalidated at once.
+        """
+        return CacheNamespace(self, name)
+
+    def invalidate_namespace(self, name):
+        """
+        Invalidates all the keys of the namespace called 'name'.
+        """
+        self.namespace(name).invalidate()
 
     def clear(self):
         """Remove *all* values from the cache at once."""
         raise NotImplementedError
+
+class CacheNamespace(object):
+    """
+    A view of a cache in which keys belong to a namespace, e.g. everything
+    about a given user. The keys include the generation of the namespace, a
+    counter stored in the cache: invalidate() only increments it, so that
+    the entries of previous generations are never read again and expire on
+    their own, without having to know or scan their keys.
+
+    The generation is read from the cache when it's first needed and then
+    kept for the lifetime of the object, so get a new namespace object for
+    each request or unit of work.
+    """
+    def __init__(self, cache, name):
+        self.cache = cache
+        self.name = name
+        self._generation = None
+
+    def _generation_key(self):
+        return 'namespace:%s' % self.name
+
+    def get_generation(self):
+        """
+        Returns the generation of the namespace. If it isn't in the cache,
+        because the namespace is new or its counter was evicted, it starts
+        from a value based on the current time, so that the keys of previous
+        generations aren't used again.
+        """
+        if self._generation is None:
+            key = self._generation_key()
+            generation = self.cache.get(key)
+            if generation is None:
+                self.cache.add(key, int(time.time() * 1000), NAMESPACE_TIMEOUT)
+                generation = self.cache.get(key)
+            self._generation = generation
+        return self._generation
+
+    def invalidate(self):
+        """
+        Invalidates all the keys of the namespace, by moving it to the next
+        generation.
+        """
+        key = self._generation_key()
+        generation = self.cache.get(key)
+        if generation is None:
+            generation = int(time.time() * 1000)
+        else:
+            generation += 1
+        self.cache.set(key, generation, NAMESPACE_TIMEOUT)
+        self._generation = generation
+
+    def make_key(self, key):
+        return '%s:%s:%s' % (self.name, self.get_generation(), key)
+
+    def add(self, key, value, timeout=None, version=None):
+        return self.cache.add(self.make_key(key), value, timeout, version=version)
+
+    def get(self, key, default=None, version=None):
+        return self.cache.get(self.make_key(key), default, version=version)
+
+    def set(self, key, value, timeout=None, version=None):
+        self.cache.set(self.make_key(key), value, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.cache.delete(self.make_key(key), version=version)
+
+    def get_many(self, keys, version=None):
+        keys = dict([(self.make_key(k), k) for k in keys])
+        found = self.cache.get_many(keys.keys(), version=version)
+        return dict([(keys[k], v) for k, v in found.items()])
+
+    def get_or_set(self, key, default, timeout=None, stale_ttl=None, version=None):
+        return self.cache.get_or_set(self.make_key(key), default, timeout,
+                                     stale_ttl, version=version)
+
+    def has_key(self, key, version=None):
+        return self.cache.has_key(self.make_key(key), version=version)
+
+    def __contains__(self, key):
+        return self.has_key(key)
+
+    def incr(self, key, delta=1, version=None):
+        return self.cache.incr(self.make_key(key), delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        return self.cache.decr(self.make_key(key), delta, version=version)
+
+    def set_many(self, data, timeout=None, version=None):
+        data = dict([(self.make_key(k), v) for k, v in data.items()])
+        self.cache.set_many(data, timeout, version=version)
+
+    def delete_many(self, keys, version=None):
+        self.cache.delete_many([self.make_key(k) for k in keys], version=version)
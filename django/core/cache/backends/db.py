@@ -2,12 +2,9 @@
 
 from django.core.cache.backends.base import BaseCache
 from django.db import connection, transaction, DatabaseError
+from django.db.models.sql.constants import GET_ITERATOR_CHUNK_SIZE
 import base64, time
 from datetime import datetime
-try:
-    import cPickle as pickle
-except ImportError:
-    import pickle
 
 class CacheClass(BaseCache):
     def __init__(self, table, params):
@@ -23,8 +20,21 @@ class CacheClass(BaseCache):
             self._cull_frequency = int(cull_frequency)
         except (ValueError, TypeError):
             self._cull_frequency = 3
+        count_interval = params.get('count_interval', 0)
+        try:
+            self._count_interval = int(count_interval)
+        except (ValueError, TypeError):
+            self._count_interval = 0
 
-    def get(self, key, default=None):
+        # The number of entries in the table, and when it was last counted.
+        # Between counts, it is estimated by adding the number of values
+        # stored since then, which may overestimate it but never
+        # underestimates the entries this process added.
+        self._num_entries = None
+        self._counted_at = None
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
         cursor = connection.cursor()
         cursor.execute("SELECT cache_key, value, expires FROM %s WHERE cache_key = %%s" % self._table, [key])
         row = cursor.fetchone()
@@ -36,35 +46,133 @@ class CacheClass(BaseCache):
             transaction.commit_unless_managed()
             return default
         value = connection.ops.process_clob(row[1])
-        return pickle.loads(base64.decodestring(value))
+        return self._serializer.loads(base64.b64decode(value))
+
+    def get_many(self, keys, version=None):
+        """
+        Fetches the keys with a single query (or one query per batch of
+        GET_ITERATOR_CHUNK_SIZE keys), rather than one query per key.
+        """
+        original_keys = dict([(self.make_key(k, version=version), k) for k in keys])
+        keys = original_keys.keys()
+        d = {}
+        expired = []
+        now = datetime.now()
+        cursor = connection.cursor()
+        for offset in range(0, len(keys), GET_ITERATOR_CHUNK_SIZE):
+            batch = keys[offset:offset + GET_ITERATOR_CHUNK_SIZE]
+            cursor.execute("SELECT cache_key, value, expires FROM %s WHERE cache_key IN (%s)"
+                           % (self._table, ', '.join(['%s'] * len(batch))), batch)
+            for key, value, expires in cursor.fetchall():
+                if expires < now:
+                    expired.append(key)
+                else:
+                    value = connection.ops.process_clob(value)
+                    d[original_keys[key]] = self._serializer.loads(base64.b64decode(value))
+        if expired:
+            self._delete_keys(cursor, expired)
+            transaction.commit_unless_managed()
+        return d
 
-    def set(self, key, value, timeout=None):
+    def set(self, key, value, timeout=None, version=None):
+        key = self.make_key(key, version=version)
         self._base_set('set', key, value, timeout)
 
-    def add(self, key, value, timeout=None):
+    def set_many(self, data, timeout=None, version=None):
+        """
+        Sets all the values with a single check of whether the cache has to
+        be culled. If the database can replace rows, the values are written
+        with one query per batch of keys; otherwise one query per batch finds
+        which keys already exist and each value is updated or inserted.
+        Commits once at the end.
+        """
+        if not data:
+            return
+        data = dict([(self.make_key(k, version=version), v) for k, v in data.items()])
+        if timeout is None:
+            timeout = self.default_timeout
+        cursor = connection.cursor()
+        now = datetime.now().replace(microsecond=0)
+        exp = datetime.fromtimestamp(time.time() + timeout).replace(microsecond=0)
+        exp = connection.ops.value_to_db_datetime(exp)
+        self._maybe_cull(cursor, now, len(data))
+        keys = data.keys()
+        columns = [connection.ops.quote_name(c) for c in ('cache_key', 'value', 'expires')]
+        try:
+            if connection.ops.replace_sql(self._table, columns, [['%s'] * 3]) is not None:
+                batch_size = min(GET_ITERATOR_CHUNK_SIZE,
+                                 connection.ops.bulk_batch_size(columns, keys))
+                for offset in range(0, len(keys), batch_size):
+                    batch = keys[offset:offset + batch_size]
+                    params = []
+                    for key in batch:
+                        params.extend([key, base64.b64encode(self._serializer.dumps(data[key])), exp])
+                    cursor.execute(connection.ops.replace_sql(self._table, columns,
+                                   [['%s'] * 3] * len(batch)), params)
+            else:
+                existing = set()
+                for offset in range(0, len(keys), GET_ITERATOR_CHUNK_SIZE):
+                    batch = keys[offset:offset + GET_ITERATOR_CHUNK_SIZE]
+                    cursor.execute("SELECT cache_key FROM %s WHERE cache_key IN (%s)"
+                                   % (self._table, ', '.join(['%s'] * len(batch))), batch)
+                    existing.update([row[0] for row in cursor.fetchall()])
+                for key in keys:
+                    encoded = base64.b64encode(self._serializer.dumps(data[key]))
+                    if key in existing:
+                        cursor.execute("UPDATE %s SET value = %%s, expires = %%s WHERE cache_key = %%s" % self._table,
+                                       [encoded, exp, key])
+                    else:
+                        cursor.execute("INSERT INTO %s (cache_key, value, expires) VALUES (%%s, %%s, %%s)" % self._table,
+                                       [key, encoded, exp])
+        except DatabaseError:
+            # Another thread may have inserted some of the keys in the
+            # meantime; set the values one at a time instead.
+            transaction.rollback_unless_managed()
+            for key, value in data.items():
+                self._base_set('set', key, value, timeout)
+        else:
+            transaction.commit_unless_managed()
+
+    def add(self, key, value, timeout=None, version=None):
+        key = self.make_key(key, version=version)
         return self._base_set('add', key, value, timeout)
 
     def _base_set(self, mode, key, value, timeout=None):
         if timeout is None:
             timeout = self.default_timeout
         cursor = connection.cursor()
-        cursor.execute("SELECT COUNT(*) FROM %s" % self._table)
-        num = cursor.fetchone()[0]
         now = datetime.now().replace(microsecond=0)
         exp = datetime.fromtimestamp(time.time() + timeout).replace(microsecond=0)
-        if num > self._max_entries:
-            self._cull(cursor, now)
-        encoded = base64.encodestring(pickle.dumps(value, 2)).strip()
-        cursor.execute("SELECT cache_key, expires FROM %s WHERE cache_key = %%s" % self._table, [key])
+        exp = connection.ops.value_to_db_datetime(exp)
+        self._maybe_cull(cursor, now, 1)
+        encoded = base64.b64encode(self._serializer.dumps(value))
+        columns = [connection.ops.quote_name(c) for c in ('cache_key', 'value', 'expires')]
+        replace_sql = connection.ops.replace_sql(self._table, columns, [['%s'] * 3])
         try:
-            result = cursor.fetchone()
-            if result and (mode == 'set' or
-                    (mode == 'add' and result[1] < now)):
-                cursor.execute("UPDATE %s SET value = %%s, expires = %%s WHERE cache_key = %%s" % self._table,
-                               [encoded, connection.ops.value_to_db_datetime(exp), key])
+            if mode == 'set' and replace_sql is not None:
+                cursor.execute(replace_sql, [key, encoded, exp])
+            elif mode == 'add':
+                # Look the key up first: a failing INSERT would abort the
+                # surrounding transaction on some databases.
+                cursor.execute("SELECT expires FROM %s WHERE cache_key = %%s" % self._table, [key])
+                result = cursor.fetchone()
+                if result is None:
+                    cursor.execute("INSERT INTO %s (cache_key, value, expires) VALUES (%%s, %%s, %%s)" % self._table,
+                                   [key, encoded, exp])
+                elif result[0] < now:
+                    cursor.execute("UPDATE %s SET value = %%s, expires = %%s WHERE cache_key = %%s" % self._table,
+                                   [encoded, exp, key])
+                else:
+                    return False
             else:
-                cursor.execute("INSERT INTO %s (cache_key, value, expires) VALUES (%%s, %%s, %%s)" % self._table,
-                               [key, encoded, connection.ops.value_to_db_datetime(exp)])
+                # Update the existing row and insert a new one if there's
+                # none. Inserting fails if another thread inserted the key in
+                # the meantime.
+                cursor.execute("UPDATE %s SET value = %%s, expires = %%s WHERE cache_key = %%s" % self._table,
+                               [encoded, exp, key])
+                if not cursor.rowcount:
+                    cursor.execute("INSERT INTO %s (cache_key, value, expires) VALUES (%%s, %%s, %%s)" % self._table,
+                                   [key, encoded, exp])
         except DatabaseError:
             # To be threadsafe, updates/inserts are allowed to fail silently
             transaction.rollback_unless_managed()
@@ -73,18 +181,49 @@ class CacheClass(BaseCache):
             transaction.commit_unless_managed()
             return True
 
-    def delete(self, key):
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
         cursor = connection.cursor()
         cursor.execute("DELETE FROM %s WHERE cache_key = %%s" % self._table, [key])
         transaction.commit_unless_managed()
 
-    def has_key(self, key):
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(k, version=version) for k in keys]
+        if keys:
+            self._delete_keys(connection.cursor(), keys)
+            transaction.commit_unless_managed()
+
+    def _delete_keys(self, cursor, keys):
+        for offset in range(0, len(keys), GET_ITERATOR_CHUNK_SIZE):
+            batch = keys[offset:offset + GET_ITERATOR_CHUNK_SIZE]
+            cursor.execute("DELETE FROM %s WHERE cache_key IN (%s)"
+                           % (self._table, ', '.join(['%s'] * len(batch))), batch)
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
         now = datetime.now().replace(microsecond=0)
         cursor = connection.cursor()
         cursor.execute("SELECT cache_key FROM %s WHERE cache_key = %%s and expires > %%s" % self._table,
                        [key, connection.ops.value_to_db_datetime(now)])
         return cursor.fetchone() is not None
 
+    def _maybe_cull(self, cursor, now, num_values):
+        """
+        Culls the cache if it's full, before num_values values are stored.
+
+        The entries are counted with a query every count_interval seconds
+        (every time if count_interval is 0); in between, the number of
+        values stored by this process since the last count is added to it.
+        """
+        t = time.time()
+        if self._counted_at is None or t - self._counted_at >= self._count_interval:
+            cursor.execute("SELECT COUNT(*) FROM %s" % self._table)
+            self._num_entries = cursor.fetchone()[0]
+            self._counted_at = t
+        if self._num_entries > self._max_entries:
+            self._cull(cursor, now)
+        self._num_entries += num_values
+
     def _cull(self, cursor, now):
         if self._cull_frequency == 0:
             self.clear()
@@ -94,9 +233,19 @@ class CacheClass(BaseCache):
             cursor.execute("SELECT COUNT(*) FROM %s" % self._table)
             num = cursor.fetchone()[0]
             if num > self._max_entries:
-                cursor.execute("SELECT cache_key FROM %s ORDER BY cache_key LIMIT 1 OFFSET %%s" % self._table, [num / self._cull_frequency])
-                cursor.execute("DELETE FROM %s WHERE cache_key < %%s" % self._table, [cursor.fetchone()[0]])
+                # Delete the entries that expire soonest, using the index on
+                # the expires column; the key breaks ties.
+                cursor.execute("SELECT expires, cache_key FROM %s ORDER BY expires, cache_key LIMIT 1 OFFSET %%s" % self._table,
+                               [num / self._cull_frequency])
+                expires, key = cursor.fetchone()
+                expires = connection.ops.value_to_db_datetime(expires)
+                cursor.execute("DELETE FROM %s WHERE expires < %%s OR (expires = %%s AND cache_key < %%s)" % self._table,
+                               [expires, expires, key])
+                num -= num / self._cull_frequency
+            self._num_entries = num
+            self._counted_at = time.time()
 
     def clear(self):
         cursor = connection.cursor()
         cursor.execute('DELETE FROM %s' % self._table)
+        self._num_entries = 0
@@ -3,15 +3,18 @@
 from django.core.cache.backends.base import BaseCache
 
 class CacheClass(BaseCache):
-    def __init__(self, *args, **kwargs):
-        pass
+    def __init__(self, _, params):
+        BaseCache.__init__(self, params)
 
     def add(self, *args, **kwargs):
         return True
 
-    def get(self, key, default=None):
+    def get(self, key, default=None, version=None):
         return default
 
+    def get_or_set(self, key, default, timeout=None, stale_ttl=None, version=None):
+        return default()
+
     def set(self, *args, **kwargs):
         pass
 
@@ -1,15 +1,34 @@
 "File-based cache backend"
 
+import heapq
 import os
+import tempfile
 import time
 import shutil
 try:
     import cPickle as pickle
 except ImportError:
     import pickle
+try:
+    import threading
+except ImportError:
+    import dummy_threading as threading
 
 from django.core.cache.backends.base import BaseCache
 from django.utils.hashcompat import md5_constructor
+from django.utils.serialization import SERIALIZATION_ERRORS
+
+# The errors raised when reading an entry that was removed in the meantime,
+# or that can't be loaded.
+ENTRY_ERRORS = (IOError, OSError) + SERIALIZATION_ERRORS
+
+# Name of the file, in the cache directory, that holds the index of the
+# entries. Entries are stored in two levels of subdirectories, so it can't
+# clash with them.
+INDEX_FILE = 'index'
+
+# Suffix of the temporary files values are written to before being renamed.
+TEMP_SUFFIX = '.tmp'
 
 class CacheClass(BaseCache):
     def __init__(self, dir, params):
@@ -31,60 +50,141 @@ class CacheClass(BaseCache):
         if not os.path.exists(self._dir):
             self._createdir()
 
-    def add(self, key, value, timeout=None):
-        if self.has_key(key):
+        # The index maps the md5 digest of each key to the expiry time of its
+        # entry, so that entries can be counted without walking the cache
+        # directory. The heap holds (expiry time, digest) pairs, soonest
+        # expiry first, for culling; pairs that no longer match the index are
+        # skipped. Both are loaded when first needed. The index file is saved
+        # whenever new entries are stored, so that every process counts them,
+        # and _index_stamp identifies the version of it last read or written.
+        self._index = None
+        self._heap = []
+        self._index_stamp = None
+        self._lock = threading.RLock()
+
+    def add(self, key, value, timeout=None, version=None):
+        if self.has_key(key, version=version):
             return False
 
-        self.set(key, value, timeout)
+        self.set(key, value, timeout, version=version)
         return True
 
-    def get(self, key, default=None):
-        fname = self._key_to_file(key)
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        return self._get(self._key_to_digest(key), time.time(), default)
+
+    def _get(self, digest, now, default=None):
+        fname = self._digest_to_file(digest)
         try:
             f = open(fname, 'rb')
             try:
                 exp = pickle.load(f)
-                now = time.time()
-                if exp < now:
-                    self._delete(fname)
-                else:
-                    return pickle.load(f)
+                if exp >= now:
+                    return self._serializer.loads(f.read())
             finally:
                 f.close()
-        except (IOError, OSError, EOFError, pickle.PickleError):
+            self._delete(digest)
+        except ENTRY_ERRORS:
             pass
         return default
 
-    def set(self, key, value, timeout=None):
-        fname = self._key_to_file(key)
-        dirname = os.path.dirname(fname)
+    def get_many(self, keys, version=None):
+        d = {}
+        now = time.time()
+        for key in keys:
+            val = self._get(self._key_to_digest(self.make_key(key, version=version)), now)
+            if val is not None:
+                d[key] = val
+        return d
 
+    def set(self, key, value, timeout=None, version=None):
+        key = self.make_key(key, version=version)
         if timeout is None:
             timeout = self.default_timeout
+        self._cull()
+        if self._set(self._key_to_digest(key), value, time.time() + timeout):
+            self._save_index()
 
+    def set_many(self, data, timeout=None, version=None):
+        """
+        Sets all the values, checking whether the cache has to be culled only
+        once rather than before each of them.
+        """
+        if timeout is None:
+            timeout = self.default_timeout
         self._cull()
+        exp = time.time() + timeout
+        added = False
+        for key, value in data.items():
+            if self._set(self._key_to_digest(self.make_key(key, version=version)), value, exp):
+                added = True
+        if added:
+            self._save_index()
 
+    def _set(self, digest, value, exp):
+        """
+        Stores a value in the entry file for digest. Returns True if the
+        entry is new to the index.
+        """
+        data = self._serializer.dumps(value)
+        fname = self._digest_to_file(digest)
+        dirname = os.path.dirname(fname)
         try:
             if not os.path.exists(dirname):
                 os.makedirs(dirname)
 
-            f = open(fname, 'wb')
+            # Write to a temporary file and rename it, so that readers never
+            # see a partly written entry.
+            fd, tmp = tempfile.mkstemp(suffix=TEMP_SUFFIX, dir=dirname)
             try:
-                now = time.time()
-                pickle.dump(now + timeout, f, pickle.HIGHEST_PROTOCOL)
-                pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
-            finally:
-                f.close()
+                f = os.fdopen(fd, 'wb')
+                try:
+                    pickle.dump(exp, f, pickle.HIGHEST_PROTOCOL)
+                    f.write(data)
+                finally:
+                    f.close()
+                self._rename(tmp, fname)
+            except:
+                os.remove(tmp)
+                raise
         except (IOError, OSError):
-            pass
+            return False
+        self._lock.acquire()
+        try:
+            if self._index is None:
+                return False
+            added = digest not in self._index
+            self._index[digest] = exp
+            heapq.heappush(self._heap, (exp, digest))
+            return added
+        finally:
+            self._lock.release()
 
-    def delete(self, key):
+    def _rename(self, src, dst):
         try:
-            self._delete(self._key_to_file(key))
+            os.rename(src, dst)
+        except OSError:
+            # On Windows, the destination can't exist.
+            if not os.path.exists(dst):
+                raise
+            os.remove(dst)
+            os.rename(src, dst)
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        try:
+            self._delete(self._key_to_digest(key))
         except (IOError, OSError):
             pass
 
-    def _delete(self, fname):
+    def _delete(self, digest):
+        self._lock.acquire()
+        try:
+            if self._index is not None:
+                self._index.pop(digest, None)
+        finally:
+            self._lock.release()
+        fname = self._digest_to_file(digest)
         os.remove(fname)
         try:
             # Remove the 2 subdirs if they're empty
@@ -94,44 +194,167 @@ class CacheClass(BaseCache):
         except (IOError, OSError):
             pass
 
-    def has_key(self, key):
-        fname = self._key_to_file(key)
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        digest = self._key_to_digest(key)
         try:
-            f = open(fname, 'rb')
+            f = open(self._digest_to_file(digest), 'rb')
             try:
                 exp = pickle.load(f)
-                now = time.time()
-                if exp < now:
-                    self._delete(fname)
-                    return False
-                else:
-                    return True
             finally:
                 f.close()
+            if exp >= time.time():
+                return True
+            self._delete(digest)
         except (IOError, OSError, EOFError, pickle.PickleError):
-            return False
+            pass
+        return False
 
     def _cull(self):
-        if int(self._num_entries) < self._max_entries:
+        """
+        Removes entries if the cache is full: expired entries first, then
+        those that expire soonest. Each removal costs O(log n) thanks to the
+        heap, instead of a walk of the whole cache directory.
+        """
+        self._lock.acquire()
+        try:
+            index = self._get_index()
+            # Other processes may have stored entries since the index was
+            # loaded; pick them up from the index file before counting.
+            self._sync_index()
+            if len(index) < self._max_entries:
+                return
+            if self._cull_frequency == 0:
+                target = 0
+            else:
+                target = len(index) - len(index) / self._cull_frequency
+            now = time.time()
+            doomed = []
+            heap = self._heap
+            while heap and (len(index) > target or heap[0][0] < now):
+                exp, digest = heapq.heappop(heap)
+                if index.get(digest) == exp:
+                    del index[digest]
+                    doomed.append(digest)
+            if len(heap) > 2 * len(index):
+                # Drop the pairs left behind by overwritten entries.
+                self._heap = [(exp, digest) for (digest, exp) in index.items()]
+                heapq.heapify(self._heap)
+            self._write_index()
+        finally:
+            self._lock.release()
+        for digest in doomed:
+            try:
+                self._delete(digest)
+            except (IOError, OSError):
+                pass
+
+    def _get_index(self):
+        """
+        Returns the index, loading it from the index file, or building it
+        from the cache directory if there's no usable index file.
+        """
+        if self._index is None:
+            index = self._read_index()
+            if index is None:
+                index = self._scan()
+            self._index = {}
+            self._heap = []
+            self._merge_index(index)
+        return self._index
+
+    def _merge_index(self, index):
+        if not index:
             return
+        for digest, exp in index.items():
+            if digest not in self._index:
+                self._index[digest] = exp
+                self._heap.append((exp, digest))
+        heapq.heapify(self._heap)
 
+    def _sync_index(self):
+        """
+        Merges the index file into the index if it changed since it was last
+        read or written. Entries removed by other processes aren't noticed;
+        they are only counted until the next cull.
+        """
         try:
-            filelist = os.listdir(self._dir)
-        except (IOError, OSError):
+            st = os.stat(os.path.join(self._dir, INDEX_FILE))
+        except OSError:
             return
+        if self._stamp(st) != self._index_stamp:
+            self._merge_index(self._read_index())
 
-        if self._cull_frequency == 0:
-            doomed = filelist
-        else:
-            doomed = [os.path.join(self._dir, k) for (i, k) in enumerate(filelist) if i % self._cull_frequency == 0]
+    def _save_index(self):
+        """
+        Saves the index, with the entries other processes saved since it was
+        last read, so that their next cull counts the new entries.
+        """
+        self._lock.acquire()
+        try:
+            if self._index is not None:
+                self._sync_index()
+                self._write_index()
+        finally:
+            self._lock.release()
 
-        for topdir in doomed:
+    def _stamp(self, st):
+        return (st.st_ino, st.st_mtime, st.st_size)
+
+    def _read_index(self):
+        try:
+            f = open(os.path.join(self._dir, INDEX_FILE), 'rb')
             try:
-                for root, _, files in os.walk(topdir):
-                    for f in files:
-                        self._delete(os.path.join(root, f))
-            except (IOError, OSError):
-                pass
+                self._index_stamp = self._stamp(os.fstat(f.fileno()))
+                return pickle.load(f)
+            finally:
+                f.close()
+        except (IOError, OSError, EOFError, pickle.PickleError):
+            return None
+
+    def _write_index(self):
+        try:
+            fd, tmp = tempfile.mkstemp(suffix=TEMP_SUFFIX, dir=self._dir)
+            try:
+                f = os.fdopen(fd, 'wb')
+                try:
+                    pickle.dump(self._index, f, pickle.HIGHEST_PROTOCOL)
+                    f.flush()
+                    stamp = self._stamp(os.fstat(f.fileno()))
+                finally:
+                    f.close()
+                self._rename(tmp, os.path.join(self._dir, INDEX_FILE))
+                self._index_stamp = stamp
+            except:
+                os.remove(tmp)
+                raise
+        except (IOError, OSError):
+            pass
+
+    def _scan(self):
+        """
+        Builds the index by reading the expiry time of every entry in the
+        cache directory.
+        """
+        index = {}
+        for root, _, files in os.walk(self._dir):
+            if root == self._dir:
+                continue
+            for name in files:
+                if name.endswith(TEMP_SUFFIX):
+                    continue
+                fname = os.path.join(root, name)
+                try:
+                    f = open(fname, 'rb')
+                    try:
+                        exp = pickle.load(f)
+                    finally:
+                        f.close()
+                except (IOError, OSError, EOFError, pickle.PickleError):
+                    continue
+                digest = fname[len(self._dir):].replace(os.sep, '')
+                index[digest] = exp
+        return index
 
     def _createdir(self):
         try:
@@ -139,6 +362,12 @@ class CacheClass(BaseCache):
         except OSError:
             raise EnvironmentError("Cache directory '%s' does not exist and could not be created'" % self._dir)
 
+    def _key_to_digest(self, key):
+        return md5_constructor(key.encode('utf-8')).hexdigest()
+
+    def _digest_to_file(self, digest):
+        return os.path.join(self._dir, digest[:2], digest[2:4], digest[4:])
+
     def _key_to_file(self, key):
         """
         Convert the filename into an md5 string. We'll turn the first couple
@@ -148,19 +377,25 @@ class CacheClass(BaseCache):
         Thus, a cache key of "foo" gets turnned into a file named
         ``{cache-dir}ac/bd/18db4cc2f85cedef654fccc4a4d8``.
         """
-        path = md5_constructor(key.encode('utf-8')).hexdigest()
-        path = os.path.join(path[:2], path[2:4], path[4:])
-        return os.path.join(self._dir, path)
+        return self._digest_to_file(self._key_to_digest(key))
 
     def _get_num_entries(self):
-        count = 0
-        for _,_,files in os.walk(self._dir):
-            count += len(files)
-        return count
+        self._lock.acquire()
+        try:
+            return len(self._get_index())
+        finally:
+            self._lock.release()
     _num_entries = property(_get_num_entries)
 
     def clear(self):
+        self._lock.acquire()
         try:
-            shutil.rmtree(self._dir)
-        except (IOError, OSError):
-            pass
+            self._index = {}
+            self._heap = []
+            self._index_stamp = None
+            try:
+                shutil.rmtree(self._dir)
+            except (IOError, OSError):
+                pass
+        finally:
+            self._lock.release()
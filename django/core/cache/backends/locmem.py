@@ -1,12 +1,9 @@
 "Thread-safe in-memory cache backend."
 
 import time
-try:
-    import cPickle as pickle
-except ImportError:
-    import pickle
 
 from django.core.cache.backends.base import BaseCache
+from django.utils.serialization import SERIALIZATION_ERRORS
 from django.utils.synch import RWLock
 
 class CacheClass(BaseCache):
@@ -27,112 +24,279 @@ class CacheClass(BaseCache):
         except (ValueError, TypeError):
             self._cull_frequency = 3
 
+        max_bytes = params.get('max_bytes', 0)
+        try:
+            self._max_bytes = int(max_bytes)
+        except (ValueError, TypeError):
+            self._max_bytes = 0
+
+        # In LRU mode, the least recently used entry is evicted whenever the
+        # cache is full. The entries are kept in a circular doubly linked
+        # list of [previous, next, key] links, in order of use, starting with
+        # the least recently used one.
+        self._lru = params.get('eviction') == 'lru'
+        self._root = []
+        self._root[:] = [self._root, self._root, None]
+        self._links = {}
+
+        # The total size of the serialized values in the cache.
+        self._bytes = 0
+
+        # Counters for get_stats(). They are updated without taking the
+        # write lock on reads, so they're approximate if several threads use
+        # the cache.
+        self._hits = self._misses = self._evictions = 0
+
         self._lock = RWLock()
 
-    def add(self, key, value, timeout=None):
+    def _reader_enters(self):
+        # Reading changes the order of the entries in LRU mode.
+        if self._lru:
+            self._lock.writer_enters()
+        else:
+            self._lock.reader_enters()
+
+    def _reader_leaves(self):
+        if self._lru:
+            self._lock.writer_leaves()
+        else:
+            self._lock.reader_leaves()
+
+    def add(self, key, value, timeout=None, version=None):
+        key = self.make_key(key, version=version)
         self._lock.writer_enters()
         try:
             exp = self._expire_info.get(key)
             if exp is None or exp <= time.time():
                 try:
-                    self._set(key, pickle.dumps(value), timeout)
+                    self._set(key, self._serializer.dumps(value), timeout)
                     return True
-                except pickle.PickleError:
+                except SERIALIZATION_ERRORS:
                     pass
             return False
         finally:
             self._lock.writer_leaves()
 
-    def get(self, key, default=None):
-        self._lock.reader_enters()
+    def _get(self, key, now):
+        """
+        Returns a (found, value) pair for 'key'. Expired entries are reported
+        as not found but left in place; the caller has to hold the lock.
+        """
+        exp = self._expire_info.get(key)
+        if exp is not None and exp > now:
+            try:
+                value = self._serializer.loads(self._cache[key])
+            except SERIALIZATION_ERRORS:
+                pass
+            else:
+                self._hits += 1
+                if self._lru:
+                    self._touch(key)
+                return True, value
+        self._misses += 1
+        return False, None
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self._reader_enters()
         try:
+            now = time.time()
+            found, value = self._get(key, now)
+            if found:
+                return value
             exp = self._expire_info.get(key)
-            if exp is None:
+            if exp is None or exp > now:
                 return default
-            elif exp > time.time():
-                try:
-                    return pickle.loads(self._cache[key])
-                except pickle.PickleError:
-                    return default
         finally:
-            self._lock.reader_leaves()
+            self._reader_leaves()
         self._lock.writer_enters()
         try:
-            try:
-                del self._cache[key]
-                del self._expire_info[key]
-            except KeyError:
-                pass
+            self._delete_expired(key, now)
             return default
         finally:
             self._lock.writer_leaves()
 
+    def get_many(self, keys, version=None):
+        """
+        Fetches all the keys while holding the lock once, rather than once
+        per key as the default implementation would.
+        """
+        d = {}
+        expired = []
+        self._reader_enters()
+        try:
+            now = time.time()
+            for k in keys:
+                key = self.make_key(k, version=version)
+                found, value = self._get(key, now)
+                if found:
+                    d[k] = value
+                elif key in self._expire_info:
+                    expired.append(key)
+        finally:
+            self._reader_leaves()
+        if expired:
+            self._lock.writer_enters()
+            try:
+                for key in expired:
+                    self._delete_expired(key, now)
+            finally:
+                self._lock.writer_leaves()
+        return d
+
     def _set(self, key, value, timeout=None):
-        if len(self._cache) >= self._max_entries:
+        if self._max_bytes and len(value) > self._max_bytes:
+            # The value could never fit.
+            self._delete(key)
+            return
+        if key in self._cache:
+            self._delete(key)
+        elif len(self._cache) >= self._max_entries:
             self._cull()
         if timeout is None:
             timeout = self.default_timeout
         self._cache[key] = value
         self._expire_info[key] = time.time() + timeout
+        self._bytes += len(value)
+        if self._lru:
+            last = self._root[0]
+            last[1] = self._root[0] = self._links[key] = [last, self._root, key]
+        while self._max_bytes and self._bytes > self._max_bytes:
+            self._cull(key)
 
-    def set(self, key, value, timeout=None):
+    def set(self, key, value, timeout=None, version=None):
+        key = self.make_key(key, version=version)
         self._lock.writer_enters()
         # Python 2.4 doesn't allow combined try-except-finally blocks.
         try:
             try:
-                self._set(key, pickle.dumps(value), timeout)
-            except pickle.PickleError:
+                self._set(key, self._serializer.dumps(value), timeout)
+            except SERIALIZATION_ERRORS:
                 pass
         finally:
             self._lock.writer_leaves()
 
-    def has_key(self, key):
+    def set_many(self, data, timeout=None, version=None):
+        self._lock.writer_enters()
+        try:
+            for key, value in data.items():
+                try:
+                    self._set(self.make_key(key, version=version), self._serializer.dumps(value), timeout)
+                except SERIALIZATION_ERRORS:
+                    pass
+        finally:
+            self._lock.writer_leaves()
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
         self._lock.reader_enters()
         try:
+            now = time.time()
             exp = self._expire_info.get(key)
             if exp is None:
                 return False
-            elif exp > time.time():
+            elif exp > now:
                 return True
         finally:
             self._lock.reader_leaves()
 
         self._lock.writer_enters()
         try:
-            try:
-                del self._cache[key]
-                del self._expire_info[key]
-            except KeyError:
-                pass
+            self._delete_expired(key, now)
             return False
         finally:
             self._lock.writer_leaves()
 
-    def _cull(self):
-        if self._cull_frequency == 0:
+    def _touch(self, key):
+        """
+        Marks 'key' as the most recently used entry.
+        """
+        link = self._links[key]
+        if link is not self._root[0]:
+            previous, next = link[0], link[1]
+            previous[1] = next
+            next[0] = previous
+            last = self._root[0]
+            link[0], link[1] = last, self._root
+            last[1] = self._root[0] = link
+
+    def _cull(self, keep=None):
+        """
+        Evicts entries to make room, except the entry for 'keep', which has
+        just been stored.
+        """
+        if self._lru:
+            # Evict the least recently used entry.
+            self._delete(self._root[1][2])
+            self._evictions += 1
+        elif self._cull_frequency == 0 and keep is None:
+            self._evictions += len(self._cache)
             self.clear()
         else:
-            doomed = [k for (i, k) in enumerate(self._cache) if i % self._cull_frequency == 0]
+            doomed = [k for k in self._cache if k != keep]
+            if self._cull_frequency:
+                doomed = doomed[::self._cull_frequency]
             for k in doomed:
                 self._delete(k)
+            self._evictions += len(doomed)
 
     def _delete(self, key):
         try:
-            del self._cache[key]
+            value = self._cache.pop(key)
         except KeyError:
             pass
+        else:
+            self._bytes -= len(value)
         try:
             del self._expire_info[key]
         except KeyError:
             pass
+        if self._lru:
+            link = self._links.pop(key, None)
+            if link is not None:
+                previous, next = link[0], link[1]
+                previous[1] = next
+                next[0] = previous
 
-    def delete(self, key):
+    def _delete_expired(self, key, now):
+        # The key may have been set again since it was found to be expired.
+        exp = self._expire_info.get(key)
+        if exp is not None and exp <= now:
+            self._delete(key)
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
         self._lock.writer_enters()
         try:
             self._delete(key)
         finally:
             self._lock.writer_leaves()
 
+    def delete_many(self, keys, version=None):
+        self._lock.writer_enters()
+        try:
+            for key in keys:
+                self._delete(self.make_key(key, version=version))
+        finally:
+            self._lock.writer_leaves()
+
+    def get_stats(self):
+        """
+        Returns a dictionary of statistics about the use of the cache: the
+        number of 'hits', 'misses' and 'evictions' so far, and the current
+        number of 'entries' and their total size in 'bytes'.
+        """
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'evictions': self._evictions,
+            'entries': len(self._cache),
+            'bytes': self._bytes,
+        }
+
     def clear(self):
         self._cache.clear()
         self._expire_info.clear()
+        self._links.clear()
+        self._root[:] = [self._root, self._root, None]
+        self._bytes = 0
@@ -1,9 +1,12 @@
 "Memcached cache backend"
 
+import socket
 import time
+from bisect import bisect
 
 from django.core.cache.backends.base import BaseCache, InvalidCacheBackendError
 from django.utils.encoding import smart_unicode, smart_str
+from django.utils.hashcompat import md5_constructor
 
 try:
     import cmemcache as memcache
@@ -16,12 +19,158 @@ except ImportError:
     try:
         import memcache
     except:
-        raise InvalidCacheBackendError("Memcached cache backend requires either the 'memcache' or 'cmemcache' library")
+        memcache = None
+
+class HashRing(object):
+    """
+    A ketama-style consistent hash ring.
+
+    Every node is placed at many points of a circle of 2**32 positions, and a
+    key belongs to the first node found going clockwise from the position of
+    the key. Adding or removing a node only moves the keys of the arcs next
+    to its points -- about 1/n of all keys -- whereas with modulo hashing
+    nearly every key would move to another node.
+    """
+    # Each md5 digest of a node name gives four points on the ring.
+    digests_per_node = 40
+
+    def __init__(self, nodes):
+        self.nodes = list(nodes)
+        ring = []
+        for index, node in enumerate(self.nodes):
+            for i in range(self.digests_per_node):
+                digest = md5_constructor('%s-%d' % (node, i)).digest()
+                for offset in range(4):
+                    ring.append((self._point(digest, offset), index))
+        ring.sort()
+        self._points = [point for point, index in ring]
+        self._indexes = [index for point, index in ring]
+
+    def _point(digest, offset):
+        """
+        Returns the position on the ring given by four bytes of 'digest'.
+        """
+        offset *= 4
+        return ((ord(digest[offset + 3]) << 24) | (ord(digest[offset + 2]) << 16) |
+                (ord(digest[offset + 1]) << 8) | ord(digest[offset]))
+    _point = staticmethod(_point)
+
+    def iter_nodes(self, key):
+        """
+        Yields all the nodes, each one once, in the order they are found going
+        clockwise around the ring from the position of 'key'.
+        """
+        if not self.nodes:
+            return
+        num_points = len(self._points)
+        position = bisect(self._points, self._point(md5_constructor(key).digest(), 0))
+        seen = set()
+        for i in xrange(num_points):
+            index = self._indexes[(position + i) % num_points]
+            if index not in seen:
+                seen.add(index)
+                yield self.nodes[index]
+                if len(seen) == len(self.nodes):
+                    return
 
 class CacheClass(BaseCache):
+    """
+    Spreads the keys over the given servers with a consistent hash ring.
+
+    Each value is stored on 'replicas' servers (1 by default). A server that
+    fails is left out of the ring for 'dead_retry' seconds (30 by default),
+    twice as long after each consecutive failure, and its keys go to the
+    next servers on the ring in the meantime.
+    """
     def __init__(self, server, params):
         BaseCache.__init__(self, params)
-        self._cache = memcache.Client(server.split(';'))
+        servers = [s for s in server.split(';') if s]
+        self._ring = HashRing(servers)
+        self._clients = {}
+        for s in servers:
+            self._clients[s] = self._get_client(s)
+
+        replicas = params.get('replicas', 1)
+        try:
+            self._replicas = max(int(replicas), 1)
+        except (ValueError, TypeError):
+            self._replicas = 1
+
+        dead_retry = params.get('dead_retry', 30)
+        try:
+            self._dead_retry = int(dead_retry)
+        except (ValueError, TypeError):
+            self._dead_retry = 30
+
+        # Maps servers to the time until which they're left out of the ring,
+        # and to the number of times in a row they have failed.
+        self._dead_until = {}
+        self._failures = {}
+
+    def _get_client(self, server):
+        """
+        Returns a memcache client for a single server.
+        """
+        if memcache is None:
+            raise InvalidCacheBackendError("Memcached cache backend requires either the 'memcache' or 'cmemcache' library")
+        return memcache.Client([server])
+
+    def _get_servers(self, key):
+        """
+        Returns the live servers 'key' is stored on, as many as there are
+        replicas, the first of them being the one it's read from.
+        """
+        now = time.time()
+        servers = []
+        for server in self._ring.iter_nodes(key):
+            if self._dead_until.get(server, 0) <= now:
+                servers.append(server)
+                if len(servers) == self._replicas:
+                    break
+        return servers
+
+    def _call(self, server, method, *args):
+        """
+        Calls 'method' of the client of 'server' with 'args'. Returns a
+        (succeeded, result) pair; servers that fail are left out of the ring
+        for a while.
+        """
+        client = self._clients[server]
+        try:
+            result = getattr(client, method)(*args)
+        except (socket.error, EnvironmentError):
+            self._mark_dead(server)
+            return False, None
+        # python-memcached doesn't raise errors for servers it can't reach;
+        # it marks them as dead and returns a failure value instead.
+        now = time.time()
+        for host in getattr(client, 'servers', ()):
+            if getattr(host, 'deaduntil', 0) > now:
+                self._mark_dead(server)
+                return False, None
+        if server in self._failures:
+            del self._failures[server]
+        return True, result
+
+    def _call_replicas(self, key, method, *args):
+        """
+        Calls 'method' with 'args' for every server 'key' is stored on. If a
+        server fails, the next server on the ring takes its place.
+        """
+        done = []
+        while True:
+            servers = [s for s in self._get_servers(key) if s not in done]
+            if not servers:
+                return
+            for server in servers:
+                if self._call(server, method, *args)[0]:
+                    done.append(server)
+
+    def _mark_dead(self, server):
+        failures = self._failures.get(server, 0) + 1
+        self._failures[server] = failures
+        # Back off exponentially, up to 32 times the initial delay.
+        self._dead_until[server] = time.time() + self._dead_retry * 2 ** min(failures - 1, 5)
 
     def _get_memcache_timeout(self, timeout):
         """
@@ -39,66 +188,128 @@ class CacheClass(BaseCache):
             timeout += int(time.time())
         return timeout
 
-    def add(self, key, value, timeout=0):
+    def add(self, key, value, timeout=0, version=None):
         if isinstance(value, unicode):
             value = value.encode('utf-8')
-        return self._cache.add(smart_str(key), value, self._get_memcache_timeout(timeout))
+        key = smart_str(self.make_key(key, version=version))
+        timeout = self._get_memcache_timeout(timeout)
+        while True:
+            servers = self._get_servers(key)
+            if not servers:
+                return False
+            succeeded, added = self._call(servers[0], 'add', key, value, timeout)
+            if succeeded:
+                break
+        if added and len(servers) > 1:
+            self._call_replicas(key, 'set', key, value, timeout)
+        return added
 
-    def get(self, key, default=None):
-        val = self._cache.get(smart_str(key))
+    def get(self, key, default=None, version=None):
+        key = smart_str(self.make_key(key, version=version))
+        while True:
+            servers = self._get_servers(key)
+            if not servers:
+                return default
+            succeeded, val = self._call(servers[0], 'get', key)
+            if succeeded:
+                break
         if val is None:
             return default
         return val
 
-    def set(self, key, value, timeout=0):
-        self._cache.set(smart_str(key), value, self._get_memcache_timeout(timeout))
+    def set(self, key, value, timeout=0, version=None):
+        key = smart_str(self.make_key(key, version=version))
+        self._call_replicas(key, 'set', key, value, self._get_memcache_timeout(timeout))
 
-    def delete(self, key):
-        self._cache.delete(smart_str(key))
+    def delete(self, key, version=None):
+        key = smart_str(self.make_key(key, version=version))
+        self._call_replicas(key, 'delete', key)
 
-    def get_many(self, keys):
-        return self._cache.get_multi(map(smart_str,keys))
+    def get_many(self, keys, version=None):
+        original_keys = dict([(smart_str(self.make_key(k, version=version)), k) for k in keys])
+        d = {}
+        pending = original_keys.keys()
+        while pending:
+            # Fetch the keys from each server with a single request. The keys
+            # of servers that fail are fetched again from the next servers.
+            by_server = {}
+            for key in pending:
+                servers = self._get_servers(key)
+                if servers:
+                    by_server.setdefault(servers[0], []).append(key)
+            pending = []
+            for server, server_keys in by_server.items():
+                succeeded, values = self._call(server, 'get_multi', server_keys)
+                if succeeded:
+                    for key, value in values.items():
+                        d[original_keys[key]] = value
+                else:
+                    pending.extend(server_keys)
+        return d
 
     def close(self, **kwargs):
-        self._cache.disconnect_all()
+        for client in self._clients.values():
+            client.disconnect_all()
 
-    def incr(self, key, delta=1):
-        try:
-            val = self._cache.incr(key, delta)
-
-        # python-memcache responds to incr on non-existent keys by
-        # raising a ValueError. Cmemcache returns None. In both
-        # cases, we should raise a ValueError though.
-        except ValueError:
-            val = None
+    def _incr(self, method, key, delta, version):
+        key = smart_str(self.make_key(key, version=version))
+        val = None
+        found = False
+        for server in self._get_servers(key):
+            try:
+                succeeded, result = self._call(server, method, key, delta)
+            # python-memcache responds to incr on non-existent keys by
+            # raising a ValueError. Cmemcache returns None. In both
+            # cases, we should raise a ValueError though.
+            except ValueError:
+                succeeded, result = True, None
+            if succeeded and not found:
+                # The value of the first server is the one that counts; the
+                # replicas are only kept up to date.
+                val = result
+                found = True
         if val is None:
             raise ValueError("Key '%s' not found" % key)
-
         return val
 
-    def decr(self, key, delta=1):
-        try:
-            val = self._cache.decr(key, delta)
+    def incr(self, key, delta=1, version=None):
+        return self._incr('incr', key, delta, version)
 
-        # python-memcache responds to decr on non-existent keys by
-        # raising a ValueError. Cmemcache returns None. In both
-        # cases, we should raise a ValueError though.
-        except ValueError:
-            val = None
-        if val is None:
-            raise ValueError("Key '%s' not found" % key)
-        return val
+    def decr(self, key, delta=1, version=None):
+        return self._incr('decr', key, delta, version)
 
-    def set_many(self, data, timeout=0):
-        safe_data = {}
+    def set_many(self, data, timeout=0, version=None):
+        timeout = self._get_memcache_timeout(timeout)
+        pending = {}
         for key, value in data.items():
             if isinstance(value, unicode):
                 value = value.encode('utf-8')
-            safe_data[smart_str(key)] = value
-        self._cache.set_multi(safe_data, self._get_memcache_timeout(timeout))
+            pending[smart_str(self.make_key(key, version=version))] = value
+        while pending:
+            # Send each server its values in a single request. The values of
+            # servers that fail are sent again, to the servers that take
+            # their place.
+            by_server = {}
+            for key, value in pending.items():
+                for server in self._get_servers(key):
+                    by_server.setdefault(server, {})[key] = value
+            pending = {}
+            for server, server_data in by_server.items():
+                if not self._call(server, 'set_multi', server_data, timeout)[0]:
+                    pending.update(server_data)
 
-    def delete_many(self, keys):
-        self._cache.delete_multi(map(smart_str, keys))
+    def delete_many(self, keys, version=None):
+        pending = [smart_str(self.make_key(k, version=version)) for k in keys]
+        while pending:
+            by_server = {}
+            for key in pending:
+                for server in self._get_servers(key):
+                    by_server.setdefault(server, []).append(key)
+            pending = []
+            for server, server_keys in by_server.items():
+                if not self._call(server, 'delete_multi', server_keys)[0]:
+                    pending.extend(server_keys)
 
     def clear(self):
-        self._cache.flush_all()
+        for server in self._clients:
+            self._call(server, 'flush_all')
@@ -0,0 +1,171 @@
+"""
+Two-level cache backend: a small local-memory cache in each process in front
+of a shared cache backend.
+
+The shared backend is given as the host part of the URI, with its own scheme,
+and the arguments that don't start with "l1_" are passed on to it::
+
+    CACHE_BACKEND = 'tiered://memcached:127.0.0.1:11211/?l1_timeout=5'
+"""
+
+import time
+from urllib import urlencode
+
+from django.core.cache.backends.base import BaseCache, InvalidCacheBackendError
+from django.core.cache.backends import locmem
+
+# The key of the generation counter in the shared cache. Bumping it discards
+# the local caches of all the processes.
+GENERATION_KEY = 'tiered.generation'
+
+class CacheClass(BaseCache):
+    def __init__(self, server, params):
+        # Imported here because this module can be imported while
+        # django.core.cache sets up the default cache.
+        from django.core.cache import get_cache
+
+        BaseCache.__init__(self, params)
+        if ':' not in server:
+            raise InvalidCacheBackendError("The tiered cache backend must be given a backend, e.g. tiered://memcached:127.0.0.1:11211/")
+        scheme, host = server.split(':', 1)
+        l2_params = dict([(k, v) for k, v in params.items() if not k.startswith('l1_')])
+        self._l2 = get_cache('%s://%s?%s' % (scheme, host, urlencode(l2_params)))
+
+        l1_timeout = params.get('l1_timeout', 5)
+        try:
+            self._l1_timeout = int(l1_timeout)
+        except (ValueError, TypeError):
+            self._l1_timeout = 5
+
+        self._l1 = locmem.CacheClass('', {
+            'timeout': self._l1_timeout,
+            'max_entries': params.get('l1_max_entries', 300),
+            'max_bytes': params.get('l1_max_bytes', 0),
+            'eviction': 'lru',
+        })
+
+        # The generation of the local cache, and when it was last compared to
+        # the one in the shared cache.
+        self._generation = None
+        self._generation_checked = 0
+
+    def _l1_timeout_for(self, timeout):
+        if timeout is None:
+            timeout = self.default_timeout
+        return min(timeout, self._l1_timeout)
+
+    def _check_generation(self):
+        """
+        Empties the local cache if the generation in the shared cache has
+        changed. This is done at most once every l1_timeout seconds, which is
+        as long as local entries are kept anyway.
+        """
+        now = time.time()
+        if now - self._generation_checked < self._l1_timeout:
+            return
+        generation = self._l2.get(GENERATION_KEY)
+        if generation is None:
+            # The shared cache was cleared, or this is the first process to
+            # use it. Start from a value unlikely to have been seen before.
+            self._l2.add(GENERATION_KEY, int(now * 1000), 60 * 60 * 24 * 30)
+            generation = self._l2.get(GENERATION_KEY)
+        if generation != self._generation:
+            # Until the first check, the local cache only holds values this
+            # process wrote itself, so it doesn't need emptying.
+            if self._generation is not None:
+                self._l1.clear()
+            self._generation = generation
+        self._generation_checked = now
+
+    def add(self, key, value, timeout=None, version=None):
+        if self._l2.add(key, value, timeout, version=version):
+            self._l1.set(key, value, self._l1_timeout_for(timeout), version=version)
+            return True
+        self._l1.delete(key, version=version)
+        return False
+
+    def get(self, key, default=None, version=None):
+        self._check_generation()
+        value = self._l1.get(key, version=version)
+        if value is None:
+            value = self._l2.get(key, version=version)
+            if value is None:
+                return default
+            self._l1.set(key, value, version=version)
+        return value
+
+    def get_many(self, keys, version=None):
+        self._check_generation()
+        d = self._l1.get_many(keys, version=version)
+        missing = [k for k in keys if k not in d]
+        if missing:
+            found = self._l2.get_many(missing, version=version)
+            self._l1.set_many(found, version=version)
+            d.update(found)
+        return d
+
+    def set(self, key, value, timeout=None, version=None):
+        self._l2.set(key, value, timeout, version=version)
+        self._l1.set(key, value, self._l1_timeout_for(timeout), version=version)
+
+    def set_many(self, data, timeout=None, version=None):
+        self._l2.set_many(data, timeout, version=version)
+        self._l1.set_many(data, self._l1_timeout_for(timeout), version=version)
+
+    def delete(self, key, version=None):
+        self._l2.delete(key, version=version)
+        self._l1.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        self._l2.delete_many(keys, version=version)
+        self._l1.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        self._check_generation()
+        return (self._l1.has_key(key, version=version) or
+                self._l2.has_key(key, version=version))
+
+    def incr(self, key, delta=1, version=None):
+        try:
+            value = self._l2.incr(key, delta, version=version)
+        except ValueError:
+            self._l1.delete(key, version=version)
+            raise
+        self._l1.set(key, value, version=version)
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        try:
+            value = self._l2.decr(key, delta, version=version)
+        except ValueError:
+            self._l1.delete(key, version=version)
+            raise
+        self._l1.set(key, value, version=version)
+        return value
+
+    def invalidate(self):
+        """
+        Discards the local caches of all the processes, without clearing the
+        shared cache. Other processes notice within l1_timeout seconds.
+        """
+        try:
+            self._l2.incr(GENERATION_KEY)
+        except ValueError:
+            pass
+        self._l1.clear()
+        self._generation_checked = 0
+
+    def get_stats(self):
+        """
+        Returns the statistics of the local cache (see the locmem backend).
+        """
+        return self._l1.get_stats()
+
+    def clear(self):
+        self._l2.clear()
+        self._l1.clear()
+        self._generation_checked = 0
+
+    def close(self, **kwargs):
+        if hasattr(self._l2, 'close'):
+            self._l2.close(**kwargs)
@@ -0,0 +1,67 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.encoding import smart_str
+
+class Command(BaseCommand):
+    help = ("Parses templates and saves them to the TEMPLATE_CACHE_FILE, from "
+            "which the cached template loader loads them without parsing them.")
+    args = '[template_name ...]'
+
+    def handle(self, *template_names, **options):
+        from django.conf import settings
+        from django.template import loader
+        from django.template.loaders import app_directories, cached
+
+        verbosity = int(options.get('verbosity', 1))
+        if not settings.TEMPLATE_CACHE_FILE:
+            raise CommandError("The TEMPLATE_CACHE_FILE setting isn't set.")
+        if settings.TEMPLATE_DEBUG:
+            raise CommandError("Templates parsed with TEMPLATE_DEBUG set can't be saved.")
+
+        cache_loader = None
+        for template_loader in loader._get_template_source_loaders():
+            if isinstance(template_loader, cached.Loader):
+                cache_loader = template_loader
+                break
+        if cache_loader is None:
+            raise CommandError("The cached template loader isn't in the TEMPLATE_LOADERS setting.")
+
+        if not template_names:
+            # Templates in the directories searched by the filesystem and
+            # app_directories loaders. Others have to be named explicitly.
+            template_names = []
+            for template_dir in tuple(settings.TEMPLATE_DIRS) + app_directories.app_template_dirs:
+                template_names.extend(self.find_templates(template_dir))
+
+        loaded = []
+        for template_name in template_names:
+            if template_name in loaded:
+                continue
+            try:
+                loader.get_template(template_name)
+            except Exception, e:
+                if verbosity >= 1:
+                    self.stderr.write("Skipped %s: %s\n" % (smart_str(template_name), smart_str(e)))
+            else:
+                loaded.append(template_name)
+        saved = cache_loader.save_templates()
+        if verbosity >= 2:
+            for template_name in loaded:
+                if template_name not in saved:
+                    self.stdout.write("Couldn't pickle %s\n" % smart_str(template_name))
+        if verbosity >= 1:
+            self.stdout.write("Saved %d templates to %s\n" % (len(saved), settings.TEMPLATE_CACHE_FILE))
+
+    def find_templates(self, template_dir):
+        "Returns the names of the templates in the given directory."
+        names = []
+        for root, dirs, files in os.walk(template_dir):
+            # Skip hidden directories and files, such as those of version
+            # control systems or editors.
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+            for name in files:
+                if not name.startswith('.'):
+                    path = os.path.join(root, name)[len(template_dir):].lstrip(os.sep)
+                    names.append(path.replace(os.sep, '/'))
+        return names
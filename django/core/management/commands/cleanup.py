@@ -1,11 +1,35 @@
-import datetime
-from django.core.management.base import NoArgsCommand
+from optparse import make_option
+
+from django.core.management.base import NoArgsCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
 
 class Command(NoArgsCommand):
+    option_list = NoArgsCommand.option_list + (
+        make_option('--batch-size', action='store', dest='batch_size', default='1000',
+            help='The number of expired sessions deleted per query. Defaults to 1000.'),
+        make_option('--sleep', action='store', dest='sleep', default='0',
+            help='The number of seconds to wait between two batches, to leave the '
+                'database some breathing room. Defaults to 0.'),
+        make_option('--database', action='store', dest='database',
+            default=DEFAULT_DB_ALIAS, help='Nominates a database to clean up. '
+                'Defaults to the "default" database.'),
+    )
     help = "Can be run as a cronjob or directly to clean out old data from the database (only expired sessions at the moment)."
 
     def handle_noargs(self, **options):
-        from django.db import transaction
         from django.contrib.sessions.models import Session
-        Session.objects.filter(expire_date__lt=datetime.datetime.now()).delete()
-        transaction.commit_unless_managed()
+        verbosity = int(options.get('verbosity', 1))
+        try:
+            batch_size = int(options.get('batch_size', 1000))
+            sleep = float(options.get('sleep', 0))
+        except ValueError:
+            raise CommandError("--batch-size must be an integer and --sleep a number.")
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        def report(deleted):
+            if verbosity >= 2:
+                self.stdout.write("Deleted %d expired sessions\n" % deleted)
+
+        Session.objects.delete_expired(batch_size=batch_size, sleep=sleep,
+            callback=report, using=options.get('database', DEFAULT_DB_ALIAS))
@@ -75,8 +75,9 @@ router = ConnectionRouter(settings.DATABASE_ROUTERS)
 connection = connections[DEFAULT_DB_ALIAS]
 backend = load_backend(connection.settings_dict['ENGINE'])
 
-# Register an event that closes the database connection
-# when a Django request is finished.
+# Register an event that closes the database connection (or, for databases
+# with a POOL setting, hands it back to the connection pool) when a Django
+# request is finished.
 def close_connection(**kwargs):
     for conn in connections.all():
         conn.close()
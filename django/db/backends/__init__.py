@@ -3,6 +3,7 @@ from threading import local
 
 from django.db import DEFAULT_DB_ALIAS
 from django.db.backends import util
+from django.db.backends.pool import ConnectionPool, get_pool
 from django.utils import datetime_safe
 from django.utils.importlib import import_module
 
@@ -11,6 +12,7 @@ class BaseDatabaseWrapper(local):
     Represents a database connection.
     """
     ops = None
+    pool_class = ConnectionPool
 
     def __init__(self, settings_dict, alias=DEFAULT_DB_ALIAS):
         # `settings_dict` should be a dictionary containing keys such as
@@ -20,6 +22,17 @@ class BaseDatabaseWrapper(local):
         self.queries = []
         self.settings_dict = settings_dict
         self.alias = alias
+        self.pool = get_pool(alias, settings_dict, self.pool_class)
+        # Maps the structure of queries to their compiled SQL; see
+        # SQLCompiler.as_sql().
+        if settings_dict.get('SQL_CACHE_SIZE'):
+            self.sql_cache = {}
+        else:
+            self.sql_cache = None
+        # When the pool was given the current connection, if it came from it,
+        # and the pool key of the settings it was opened with.
+        self._connection_birth = None
+        self._connection_key = None
 
     def __eq__(self, other):
         return self.settings_dict == other.settings_dict
@@ -67,9 +80,71 @@ class BaseDatabaseWrapper(local):
 
     def close(self):
         if self.connection is not None:
-            self.connection.close()
+            if self.pool is not None:
+                self._release_connection()
+            else:
+                self.connection.close()
             self.connection = None
 
+    def _get_pooled_connection(self):
+        """
+        Returns an idle connection from the pool for this database, or None if
+        pooling isn't enabled or no idle connection is available. Backends
+        call this from _cursor() before opening a new connection.
+        """
+        if self.pool is None:
+            return None
+        # The connection returned, or the one opened instead, uses the
+        # current settings.
+        self._connection_key = self._get_pool_key()
+        connection, self._connection_birth = self.pool.acquire(
+            self._is_usable, self._connection_key)
+        return connection
+
+    def _get_pool_key(self):
+        """
+        Returns the key under which connections made with the current
+        settings are pooled. A connection is only reused for the same
+        database, even if the settings change in the meantime.
+        """
+        settings_dict = self.settings_dict
+        options = settings_dict.get('OPTIONS') or {}
+        options = [(key, repr(value)) for key, value in options.items()]
+        options.sort()
+        return (settings_dict.get('NAME'), settings_dict.get('HOST'),
+                settings_dict.get('PORT'), settings_dict.get('USER'),
+                tuple(options))
+
+    def _release_connection(self):
+        """
+        Hands the current connection back to the pool. Any transaction left
+        open is rolled back first, so the next user of the connection starts
+        from a clean slate; a connection that can't be rolled back is closed.
+        """
+        try:
+            self._rollback()
+        except Exception:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+        else:
+            self.pool.release(self.connection, self._connection_birth,
+                              self._connection_key)
+        self._connection_birth = None
+        self._connection_key = None
+
+    def _is_usable(self, connection):
+        """
+        Tests whether an idle connection taken from the pool still works.
+        """
+        try:
+            connection.cursor().execute("SELECT 1")
+            connection.rollback()
+        except Exception:
+            return False
+        return True
+
     def cursor(self):
         from django.conf import settings
         cursor = self._cursor()
@@ -77,6 +152,22 @@ class BaseDatabaseWrapper(local):
             return self.make_debug_cursor(cursor)
         return cursor
 
+    def chunked_cursor(self):
+        """
+        Returns a cursor that streams the results of a query from the database
+        server as they are fetched, rather than having the database adapter
+        buffer the whole result set in memory first. Backends that can't do
+        this (see DatabaseFeatures.can_stream_results) return a normal cursor.
+        """
+        from django.conf import settings
+        cursor = self._chunked_cursor()
+        if settings.DEBUG:
+            return self.make_debug_cursor(cursor)
+        return cursor
+
+    def _chunked_cursor(self):
+        return self._cursor()
+
     def make_debug_cursor(self, cursor):
         return util.CursorDebugWrapper(cursor, self)
 
@@ -96,6 +187,17 @@ class BaseDatabaseFeatures(object):
     # integer primary keys.
     related_fields_match_type = False
     allow_sliced_subqueries = True
+    # Can chunked_cursor() stream results from the server, instead of the
+    # whole result set being buffered in memory by the database adapter?
+    can_stream_results = False
+    # Can a single INSERT statement create several rows at once?
+    has_bulk_insert = False
+    # Does a CASE expression have to be cast to the column type when it is
+    # assigned in an UPDATE?
+    requires_casted_case_in_updates = False
+    # Can the primary keys of all the rows created by a multi-row INSERT be
+    # retrieved in the same statement?
+    can_return_ids_from_bulk_insert = False
 
 class BaseDatabaseOperations(object):
     """
@@ -117,6 +219,23 @@ class BaseDatabaseOperations(object):
         """
         return None
 
+    def bulk_batch_size(self, fields, objs):
+        """
+        Returns the maximum allowed batch size for the backend. The fields
+        are the fields going to be inserted in the batch, the objs contains
+        all the objects to be inserted.
+        """
+        return len(objs)
+
+    def bulk_insert_sql(self, placeholder_rows):
+        """
+        Returns the SQL following the column list of a multi-row INSERT.
+        'placeholder_rows' is a list of rows, each being a list of the
+        placeholder strings for the values of that row.
+        """
+        return 'VALUES %s' % ', '.join(['(%s)' % ', '.join(row)
+            for row in placeholder_rows])
+
     def date_extract_sql(self, lookup_type, field_name):
         """
         Given a lookup_type of 'year', 'month' or 'day', returns the SQL that
@@ -169,6 +288,14 @@ class BaseDatabaseOperations(object):
         """
         return cursor.fetchone()[0]
 
+    def fetch_returned_insert_ids(self, cursor):
+        """
+        Given a cursor object that has just performed a multi-row
+        INSERT...RETURNING statement into a table that has an
+        auto-incrementing ID, returns the list of newly created IDs.
+        """
+        return [row[0] for row in cursor.fetchall()]
+
     def field_cast_sql(self, db_type):
         """
         Given a column type (e.g. 'BLOB', 'VARCHAR'), returns the SQL necessary
@@ -306,6 +433,17 @@ class BaseDatabaseOperations(object):
         """
         raise NotImplementedError
 
+    def replace_sql(self, table, columns, placeholder_rows):
+        """
+        Returns the SQL of a statement inserting rows into 'table', each of
+        them replacing the existing row with the same primary key, if there
+        is one. 'table' and 'columns' are quoted names and 'placeholder_rows'
+        is as for bulk_insert_sql().
+
+        Returns None if the backend can't do that in a single statement.
+        """
+        return None
+
     def savepoint_create_sql(self, sid):
         """
         Returns the SQL for starting a new savepoint. Only required if the
@@ -24,6 +24,7 @@ if (version < (1,2,1) or (version[:3] == (1, 2, 1) and
 
 from MySQLdb.converters import conversions
 from MySQLdb.constants import FIELD_TYPE, FLAG, CLIENT
+from MySQLdb.cursors import SSCursor
 
 from django.db import utils
 from django.db.backends import *
@@ -124,6 +125,8 @@ class DatabaseFeatures(BaseDatabaseFeatures):
     allows_group_by_pk = True
     related_fields_match_type = True
     allow_sliced_subqueries = False
+    has_bulk_insert = True
+    can_stream_results = True
 
 class DatabaseOperations(BaseDatabaseOperations):
     compiler_module = "django.db.backends.mysql.compiler"
@@ -176,6 +179,11 @@ class DatabaseOperations(BaseDatabaseOperations):
     def random_function_sql(self):
         return 'RAND()'
 
+    def replace_sql(self, table, columns, placeholder_rows):
+        return 'INSERT INTO %s (%s) %s ON DUPLICATE KEY UPDATE %s' % (table,
+            ', '.join(columns), self.bulk_insert_sql(placeholder_rows),
+            ', '.join(['%s = VALUES(%s)' % (c, c) for c in columns]))
+
     def sql_flush(self, style, tables, sequences):
         # NB: The generated SQL below is specific to MySQL
         # 'TRUNCATE x;', 'TRUNCATE y;', 'TRUNCATE z;'... style SQL statements
@@ -270,7 +278,16 @@ class DatabaseWrapper(BaseDatabaseWrapper):
                 self.connection = None
         return False
 
-    def _cursor(self):
+    def _is_usable(self, connection):
+        try:
+            connection.ping()
+        except DatabaseError:
+            return False
+        return True
+
+    def _cursor(self, cursorclass=None):
+        if self.connection is None:
+            self.connection = self._get_pooled_connection()
         if not self._valid_connection():
             kwargs = {
                 'conv': django_conversions,
@@ -298,9 +315,17 @@ class DatabaseWrapper(BaseDatabaseWrapper):
             self.connection.encoders[SafeUnicode] = self.connection.encoders[unicode]
             self.connection.encoders[SafeString] = self.connection.encoders[str]
             connection_created.send(sender=self.__class__)
-        cursor = CursorWrapper(self.connection.cursor())
+        if cursorclass is None:
+            cursor = CursorWrapper(self.connection.cursor())
+        else:
+            cursor = CursorWrapper(self.connection.cursor(cursorclass))
         return cursor
 
+    def _chunked_cursor(self):
+        # An SSCursor reads rows from the server as they are fetched. No other
+        # query can run on the connection until all of them have been read.
+        return self._cursor(SSCursor)
+
     def _rollback(self):
         try:
             BaseDatabaseWrapper._rollback(self)
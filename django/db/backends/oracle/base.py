@@ -341,6 +341,13 @@ class DatabaseWrapper(BaseDatabaseWrapper):
     def _valid_connection(self):
         return self.connection is not None
 
+    def _is_usable(self, connection):
+        try:
+            connection.cursor().execute("SELECT 1 FROM DUAL")
+        except Database.Error:
+            return False
+        return True
+
     def _connect_string(self):
         settings_dict = self.settings_dict
         if len(settings_dict['HOST'].strip()) == 0:
@@ -357,15 +364,24 @@ class DatabaseWrapper(BaseDatabaseWrapper):
     def _cursor(self):
         cursor = None
         if not self._valid_connection():
-            conn_string = convert_unicode(self._connect_string())
-            self.connection = Database.connect(conn_string, **self.settings_dict['OPTIONS'])
-            cursor = FormatStylePlaceholderCursor(self.connection)
-            # Set oracle date to ansi date format.  This only needs to execute
-            # once when we create a new connection. We also set the Territory
-            # to 'AMERICA' which forces Sunday to evaluate to a '1' in TO_CHAR().
-            cursor.execute("ALTER SESSION SET NLS_DATE_FORMAT = 'YYYY-MM-DD HH24:MI:SS' "
-                           "NLS_TIMESTAMP_FORMAT = 'YYYY-MM-DD HH24:MI:SS.FF' "
-                           "NLS_TERRITORY = 'AMERICA'")
+            self.connection = self._get_pooled_connection()
+            if self.connection is None:
+                conn_string = convert_unicode(self._connect_string())
+                self.connection = Database.connect(conn_string, **self.settings_dict['OPTIONS'])
+                cursor = FormatStylePlaceholderCursor(self.connection)
+                # Set oracle date to ansi date format.  This only needs to execute
+                # once when we create a new connection. We also set the Territory
+                # to 'AMERICA' which forces Sunday to evaluate to a '1' in TO_CHAR().
+                cursor.execute("ALTER SESSION SET NLS_DATE_FORMAT = 'YYYY-MM-DD HH24:MI:SS' "
+                               "NLS_TIMESTAMP_FORMAT = 'YYYY-MM-DD HH24:MI:SS.FF' "
+                               "NLS_TERRITORY = 'AMERICA'")
+                try:
+                    self.connection.stmtcachesize = 20
+                except:
+                    # Django docs specify cx_Oracle version 4.3.1 or higher, but
+                    # stmtcachesize is available only in 4.3.2 and up.
+                    pass
+                connection_created.send(sender=self.__class__)
             try:
                 self.oracle_version = int(self.connection.version.split('.')[0])
                 # There's no way for the DatabaseOperations class to know the
@@ -378,13 +394,6 @@ class DatabaseWrapper(BaseDatabaseWrapper):
                     self.ops.regex_lookup = self.ops.regex_lookup_10
             except ValueError:
                 pass
-            try:
-                self.connection.stmtcachesize = 20
-            except:
-                # Django docs specify cx_Oracle version 4.3.1 or higher, but
-                # stmtcachesize is available only in 4.3.2 and up.
-                pass
-            connection_created.send(sender=self.__class__)
         if not cursor:
             cursor = FormatStylePlaceholderCursor(self.connection)
         return cursor
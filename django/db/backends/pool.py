@@ -0,0 +1,137 @@
+"""
+Database connection pooling.
+
+Normally a database connection is opened by the first query of a request and
+closed again when the request finishes. A database with a ``POOL`` setting
+instead hands its connection back to a ConnectionPool, shared by all the
+threads using that database, which passes it on to the next request needing
+one. This saves the cost of connecting and authenticating on every request.
+"""
+
+import thread
+import threading
+import time
+
+# Pools are shared by all the threads using a database alias, whereas the
+# DatabaseWrapper objects holding the connections are thread-local.
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(alias, settings_dict, pool_class):
+    """
+    Returns the connection pool for the given database alias, creating it
+    from the 'POOL' entry of the database settings if needed. Returns None if
+    pooling isn't enabled for the database.
+    """
+    options = settings_dict.get('POOL')
+    if options is None:
+        return None
+    _pools_lock.acquire()
+    try:
+        if alias not in _pools:
+            _pools[alias] = pool_class(
+                max_size=options.get('MAX_SIZE', 10),
+                max_age=options.get('MAX_AGE'),
+                health_check=options.get('HEALTH_CHECK', True),
+            )
+        return _pools[alias]
+    finally:
+        _pools_lock.release()
+
+def close_quietly(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+class ConnectionPool(object):
+    """
+    A thread-safe store of idle database connections.
+
+    Connections are released and acquired with a key identifying the
+    database they're connected to, and are only handed out for the same key,
+    so a connection isn't reused after the settings of a database change, for
+    instance when the test runner switches it to the test database.
+
+    At most 'max_size' idle connections are kept. Connections older than
+    'max_age' seconds (if given) are closed rather than reused, and if
+    'health_check' is True a connection is tested before being handed out.
+    """
+    def __init__(self, max_size=10, max_age=None, health_check=True):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.health_check = health_check
+        self._lock = threading.Lock()
+        # Entries are (connection, birth, thread id, key) tuples, with the
+        # most recently released connection last.
+        self._idle = []
+
+    def __len__(self):
+        return len(self._idle)
+
+    def _expired(self, birth):
+        return self.max_age is not None and time.time() - birth >= self.max_age
+
+    def _pop(self, key):
+        """
+        Removes and returns the idle entry with the given key to hand out
+        next, or None. The most recently used connection is the most likely to
+        still be alive.
+        """
+        for i in range(len(self._idle) - 1, -1, -1):
+            if self._idle[i][3] == key:
+                return self._idle.pop(i)
+        return None
+
+    def acquire(self, is_usable, key=None):
+        """
+        Returns a (connection, birth) pair for an idle connection released
+        with the given key, birth being the time the connection was first seen
+        by the pool, or (None, None) if there isn't one. Expired connections, and connections for which
+        is_usable(connection) returns False when health checks are enabled,
+        are closed and skipped.
+        """
+        while True:
+            self._lock.acquire()
+            try:
+                entry = self._pop(key)
+            finally:
+                self._lock.release()
+            if entry is None:
+                return None, None
+            connection, birth = entry[:2]
+            if self._expired(birth) or (self.health_check and not is_usable(connection)):
+                close_quietly(connection)
+                continue
+            return connection, birth
+
+    def release(self, connection, birth=None, key=None):
+        """
+        Returns a connection to the pool, to be acquired with the given key. The connection is closed instead if
+        it has expired or the pool is full. Returns True if the connection
+        was kept.
+        """
+        if birth is None:
+            birth = time.time()
+        if not self._expired(birth):
+            self._lock.acquire()
+            try:
+                if len(self._idle) < self.max_size:
+                    self._idle.append((connection, birth, thread.get_ident(), key))
+                    return True
+            finally:
+                self._lock.release()
+        close_quietly(connection)
+        return False
+
+    def close_all(self):
+        """
+        Closes all the idle connections.
+        """
+        self._lock.acquire()
+        try:
+            idle, self._idle = self._idle, []
+        finally:
+            self._lock.release()
+        for entry in idle:
+            close_quietly(entry[0])
@@ -80,6 +80,8 @@ class UnicodeCursorWrapper(object):
 
 class DatabaseFeatures(BaseDatabaseFeatures):
     uses_savepoints = True
+    has_bulk_insert = True
+    requires_casted_case_in_updates = True
 
 class DatabaseWrapper(BaseDatabaseWrapper):
     operators = {
@@ -122,21 +124,23 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         if self.connection is None:
             new_connection = True
             set_tz = settings_dict.get('TIME_ZONE')
-            if settings_dict['NAME'] == '':
-                from django.core.exceptions import ImproperlyConfigured
-                raise ImproperlyConfigured("You need to specify NAME in your Django settings file.")
-            conn_string = "dbname=%s" % settings_dict['NAME']
-            if settings_dict['USER']:
-                conn_string = "user=%s %s" % (settings_dict['USER'], conn_string)
-            if settings_dict['PASSWORD']:
-                conn_string += " password='%s'" % settings_dict['PASSWORD']
-            if settings_dict['HOST']:
-                conn_string += " host=%s" % settings_dict['HOST']
-            if settings_dict['PORT']:
-                conn_string += " port=%s" % settings_dict['PORT']
-            self.connection = Database.connect(conn_string, **settings_dict['OPTIONS'])
-            self.connection.set_isolation_level(1) # make transactions transparent to all cursors
-            connection_created.send(sender=self.__class__)
+            self.connection = self._get_pooled_connection()
+            if self.connection is None:
+                if settings_dict['NAME'] == '':
+                    from django.core.exceptions import ImproperlyConfigured
+                    raise ImproperlyConfigured("You need to specify NAME in your Django settings file.")
+                conn_string = "dbname=%s" % settings_dict['NAME']
+                if settings_dict['USER']:
+                    conn_string = "user=%s %s" % (settings_dict['USER'], conn_string)
+                if settings_dict['PASSWORD']:
+                    conn_string += " password='%s'" % settings_dict['PASSWORD']
+                if settings_dict['HOST']:
+                    conn_string += " host=%s" % settings_dict['HOST']
+                if settings_dict['PORT']:
+                    conn_string += " port=%s" % settings_dict['PORT']
+                self.connection = Database.connect(conn_string, **settings_dict['OPTIONS'])
+                self.connection.set_isolation_level(1) # make transactions transparent to all cursors
+                connection_created.send(sender=self.__class__)
         cursor = self.connection.cursor()
         if new_connection:
             if set_tz:
@@ -4,7 +4,9 @@ PostgreSQL database backend for Django.
 Requires psycopg 2: http://initd.org/projects/psycopg2
 """
 
+import itertools
 import sys
+import thread
 
 from django.db import utils
 from django.db.backends import *
@@ -30,6 +32,9 @@ psycopg2.extensions.register_type(psycopg2.extensions.UNICODE)
 psycopg2.extensions.register_adapter(SafeString, psycopg2.extensions.QuotedString)
 psycopg2.extensions.register_adapter(SafeUnicode, psycopg2.extensions.QuotedString)
 
+# Used to give every server-side (named) cursor a unique name.
+cursor_counter = itertools.count(1)
+
 class CursorWrapper(object):
     """
     A thin wrapper around psycopg2's normal cursor class so that we can catch
@@ -67,6 +72,10 @@ class CursorWrapper(object):
 class DatabaseFeatures(BaseDatabaseFeatures):
     needs_datetime_string_cast = False
     can_return_id_from_insert = False
+    has_bulk_insert = True
+    requires_casted_case_in_updates = True
+    can_return_ids_from_bulk_insert = False
+    can_stream_results = True
 
 class DatabaseOperations(PostgresqlDatabaseOperations):
     def last_executed_query(self, cursor, sql, params):
@@ -116,27 +125,31 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         if self.connection is None:
             new_connection = True
             set_tz = settings_dict.get('TIME_ZONE')
-            if settings_dict['NAME'] == '':
-                from django.core.exceptions import ImproperlyConfigured
-                raise ImproperlyConfigured("You need to specify NAME in your Django settings file.")
-            conn_params = {
-                'database': settings_dict['NAME'],
-            }
-            conn_params.update(settings_dict['OPTIONS'])
-            if 'autocommit' in conn_params:
-                del conn_params['autocommit']
-            if settings_dict['USER']:
-                conn_params['user'] = settings_dict['USER']
-            if settings_dict['PASSWORD']:
-                conn_params['password'] = settings_dict['PASSWORD']
-            if settings_dict['HOST']:
-                conn_params['host'] = settings_dict['HOST']
-            if settings_dict['PORT']:
-                conn_params['port'] = settings_dict['PORT']
-            self.connection = Database.connect(**conn_params)
-            self.connection.set_client_encoding('UTF8')
-            self.connection.set_isolation_level(self.isolation_level)
-            connection_created.send(sender=self.__class__)
+            self.connection = self._get_pooled_connection()
+            if self.connection is not None:
+                self.connection.set_isolation_level(self.isolation_level)
+            else:
+                if settings_dict['NAME'] == '':
+                    from django.core.exceptions import ImproperlyConfigured
+                    raise ImproperlyConfigured("You need to specify NAME in your Django settings file.")
+                conn_params = {
+                    'database': settings_dict['NAME'],
+                }
+                conn_params.update(settings_dict['OPTIONS'])
+                if 'autocommit' in conn_params:
+                    del conn_params['autocommit']
+                if settings_dict['USER']:
+                    conn_params['user'] = settings_dict['USER']
+                if settings_dict['PASSWORD']:
+                    conn_params['password'] = settings_dict['PASSWORD']
+                if settings_dict['HOST']:
+                    conn_params['host'] = settings_dict['HOST']
+                if settings_dict['PORT']:
+                    conn_params['port'] = settings_dict['PORT']
+                self.connection = Database.connect(**conn_params)
+                self.connection.set_client_encoding('UTF8')
+                self.connection.set_isolation_level(self.isolation_level)
+                connection_created.send(sender=self.__class__)
         cursor = self.connection.cursor()
         cursor.tzinfo_factory = None
         if new_connection:
@@ -158,6 +171,18 @@ class DatabaseWrapper(BaseDatabaseWrapper):
                     # versions that support it, but, right now, that's hard to
                     # do without breaking other things (#10509).
                     self.features.can_return_id_from_insert = True
+                    self.features.can_return_ids_from_bulk_insert = True
+        return CursorWrapper(cursor)
+
+    def _chunked_cursor(self):
+        # Setting up the connection is left to _cursor().
+        cursor = self._cursor()
+        if self.features.uses_autocommit:
+            # Named cursors only exist inside a transaction.
+            return cursor
+        name = '_django_curs_%d_%d' % (thread.get_ident(), cursor_counter.next())
+        cursor = self.connection.cursor(name)
+        cursor.tzinfo_factory = None
         return CursorWrapper(cursor)
 
     def _enter_transaction_management(self, managed):
@@ -9,6 +9,7 @@ standard library.
 
 import re
 import sys
+import thread
 
 from django.db import utils
 from django.db.backends import *
@@ -60,8 +61,24 @@ class DatabaseFeatures(BaseDatabaseFeatures):
     # setting ensures we always read result sets fully into memory all in one
     # go.
     can_use_chunked_reads = False
+    has_bulk_insert = True
 
 class DatabaseOperations(BaseDatabaseOperations):
+    def bulk_batch_size(self, fields, objs):
+        """
+        SQLite has a compile-time default (SQLITE_LIMIT_VARIABLE_NUMBER) of
+        999 variables per query, and allows at most 500 (SQLITE_LIMIT_COMPOUND_SELECT)
+        terms in the compound SELECT used by bulk_insert_sql().
+        """
+        limit = 999 // max(len(fields), 1)
+        return min(limit, 500)
+
+    def bulk_insert_sql(self, placeholder_rows):
+        # Multi-row VALUES lists are only understood by SQLite 3.7.11 and
+        # later, so use a compound SELECT instead.
+        return ' UNION ALL '.join(['SELECT %s' % ', '.join(row)
+            for row in placeholder_rows])
+
     def date_extract_sql(self, lookup_type, field_name):
         # sqlite doesn't support extract, so we fake it with the user-defined
         # function django_extract that's registered in connect(). Note that
@@ -90,6 +107,10 @@ class DatabaseOperations(BaseDatabaseOperations):
     def no_limit_value(self):
         return -1
 
+    def replace_sql(self, table, columns, placeholder_rows):
+        return 'INSERT OR REPLACE INTO %s (%s) %s' % (table, ', '.join(columns),
+            self.bulk_insert_sql(placeholder_rows))
+
     def sql_flush(self, style, tables, sequences):
         # NB: The generated SQL below is specific to SQLite
         # Note: The DELETE FROM... SQL generated below works for SQLite databases
@@ -128,7 +149,22 @@ class DatabaseOperations(BaseDatabaseOperations):
         # No field, or the field isn't known to be a decimal or integer
         return value
 
+class SameThreadConnectionPool(ConnectionPool):
+    """
+    pysqlite connections can only be used from the thread that created them,
+    so this pool only hands a connection back to that thread. It's mostly a
+    stand-in for testing pooled configurations against SQLite, where opening
+    a connection is cheap anyway. In-memory databases are never pooled.
+    """
+    def _pop(self, key):
+        ident = thread.get_ident()
+        for i in range(len(self._idle) - 1, -1, -1):
+            if self._idle[i][2] == ident and self._idle[i][3] == key:
+                return self._idle.pop(i)
+        return None
+
 class DatabaseWrapper(BaseDatabaseWrapper):
+    pool_class = SameThreadConnectionPool
 
     # SQLite requires LIKE statements to include an ESCAPE clause if the value
     # being escaped has a percent or underscore in it.
@@ -161,6 +197,8 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         self.validation = BaseDatabaseValidation(self)
 
     def _cursor(self):
+        if self.connection is None:
+            self.connection = self._get_pooled_connection()
         if self.connection is None:
             settings_dict = self.settings_dict
             if not settings_dict['NAME']:
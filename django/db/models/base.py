@@ -7,8 +7,9 @@ from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned,
 from django.core import validators
 from django.db.models.fields import AutoField, FieldDoesNotExist
 from django.db.models.fields.related import OneToOneRel, ManyToOneRel, OneToOneField
-from django.db.models.query import delete_objects, Q
-from django.db.models.query_utils import CollectedObjects, DeferredAttribute
+from django.db.models.deletion import Collector
+from django.db.models.query import Q
+from django.db.models.query_utils import DeferredAttribute
 from django.db.models.options import Options
 from django.db import connections, router, transaction, DatabaseError, DEFAULT_DB_ALIAS
 from django.db.models import signals
@@ -244,6 +245,44 @@ class ModelState(object):
     def __init__(self, db=None):
         self.db = db
 
+# Maps (model class, attnames) to the result of get_from_db_plan().
+_from_db_plans = {}
+
+def get_from_db_plan(cls, attnames):
+    """
+    Works out how Model._from_db() can set up an instance of 'cls' from the
+    values of the fields whose attribute names are in the tuple 'attnames'.
+
+    Returns None if __init__() has to be called, because the class overrides
+    it. Otherwise returns a pair: the attribute names that have to be set
+    with setattr(), because the class has a descriptor for them, and the
+    fields that aren't loaded or deferred, which get their default values.
+    """
+    try:
+        return _from_db_plans[cls, attnames]
+    except KeyError:
+        pass
+    if cls.__init__.im_func is not Model.__init__.im_func:
+        plan = None
+    else:
+        loaded = set(attnames)
+        setters, defaults = [], []
+        for field in cls._meta.fields:
+            descriptor = None
+            for klass in cls.__mro__:
+                if field.attname in klass.__dict__:
+                    descriptor = klass.__dict__[field.attname]
+                    break
+            if field.attname not in loaded:
+                if not isinstance(descriptor, DeferredAttribute):
+                    defaults.append(field)
+            elif (hasattr(descriptor, '__set__') and
+                    not isinstance(descriptor, DeferredAttribute)):
+                setters.append(field.attname)
+        plan = (tuple(setters), tuple(defaults))
+    _from_db_plans[cls, attnames] = plan
+    return plan
+
 class Model(object):
     __metaclass__ = ModelBase
     _deferred = False
@@ -340,6 +379,42 @@ class Model(object):
                 raise TypeError("'%s' is an invalid keyword argument for this function" % kwargs.keys()[0])
         signals.post_init.send(sender=self.__class__, instance=self)
 
+    def _from_db(cls, using, attnames, values):
+        """
+        Returns an instance created from a row of values loaded from the
+        database 'using'. 'attnames' is a tuple of the attribute names of the
+        fields the values belong to, in the same order.
+
+        This is equivalent to cls(**dict(zip(attnames, values))), but unless
+        __init__() is overridden or something listens to the pre_init or
+        post_init signals, the instance is set up directly from the values,
+        which is a lot faster.
+        """
+        plan = get_from_db_plan(cls, attnames)
+        if (plan is None or signals.pre_init.has_listeners(cls) or
+                signals.post_init.has_listeners(cls)):
+            if len(attnames) == len(cls._meta.fields):
+                # Positional arguments take the faster path through __init__().
+                obj = cls(*values)
+            else:
+                obj = cls(**dict(izip(attnames, values)))
+            obj._state.db = using
+            return obj
+        setters, defaults = plan
+        obj = cls.__new__(cls)
+        obj._state = ModelState(using)
+        if setters:
+            data = dict(izip(attnames, values))
+            for attname in setters:
+                setattr(obj, attname, data.pop(attname))
+            obj.__dict__.update(data)
+        else:
+            obj.__dict__.update(izip(attnames, values))
+        for field in defaults:
+            setattr(obj, field.attname, field.get_default())
+        return obj
+    _from_db = classmethod(_from_db)
+
     def __repr__(self):
         try:
             u = unicode(self)
@@ -491,18 +566,22 @@ class Model(object):
             pk_set = pk_val is not None
             record_exists = True
             manager = cls._base_manager
-            if pk_set:
+            if pk_set and force_insert:
+                record_exists = False
+            elif pk_set and (force_update or (non_pks and not meta.select_on_save)):
+                # Don't look the record up first: if the UPDATE doesn't
+                # affect any rows, the record doesn't exist yet.
+                values = [(f, None, (raw and getattr(self, f.attname) or f.pre_save(self, False))) for f in non_pks]
+                rows = manager.using(using).filter(pk=pk_val)._update(values)
+                if force_update and not rows:
+                    raise DatabaseError("Forced update did not affect any rows.")
+                record_exists = bool(rows)
+            elif pk_set:
                 # Determine whether a record with the primary key already exists.
-                if (force_update or (not force_insert and
-                        manager.using(using).filter(pk=pk_val).exists())):
-                    # It does already exist, so do an UPDATE.
-                    if force_update or non_pks:
-                        values = [(f, None, (raw and getattr(self, f.attname) or f.pre_save(self, False))) for f in non_pks]
-                        rows = manager.using(using).filter(pk=pk_val)._update(values)
-                        if force_update and not rows:
-                            raise DatabaseError("Forced update did not affect any rows.")
-                else:
-                    record_exists = False
+                record_exists = manager.using(using).filter(pk=pk_val).exists()
+                if record_exists and non_pks:
+                    values = [(f, None, (raw and getattr(self, f.attname) or f.pre_save(self, False))) for f in non_pks]
+                    manager.using(using).filter(pk=pk_val)._update(values)
             if not pk_set or not record_exists:
                 if meta.order_with_respect_to:
                     # If this is a model with an order_with_respect_to
@@ -631,12 +710,9 @@ class Model(object):
         using = using or router.db_for_write(self.__class__, instance=self)
         assert self._get_pk_val() is not None, "%s object can't be deleted because its %s attribute is set to None." % (self._meta.object_name, self._meta.pk.attname)
 
-        # Find all the objects than need to be deleted.
-        seen_objs = CollectedObjects()
-        self._collect_sub_objects(seen_objs)
-
-        # Actually delete the objects.
-        delete_objects(seen_objs, using)
+        collector = Collector(using=using)
+        collector.collect(self.__class__, [(self._get_pk_val(), self)])
+        collector.delete()
 
     delete.alters_data = True
 
@@ -0,0 +1,309 @@
+"""
+Cascading deletion of model instances.
+"""
+
+from django.db import transaction
+from django.db.models import signals, sql
+from django.db.models.sql.constants import GET_ITERATOR_CHUNK_SIZE
+
+def has_delete_receivers(model):
+    """
+    Returns True if deleting an instance of 'model' sends a pre_delete or
+    post_delete signal that something is listening to.
+    """
+    if model._meta.auto_created:
+        # No signals are sent for automatically created models.
+        return False
+    return (signals.pre_delete.has_listeners(model) or
+            signals.post_delete.has_listeners(model))
+
+def get_concrete_model(model):
+    """
+    Returns the model whose table holds the objects of 'model', which is
+    'model' itself unless it's a proxy or deferred model.
+    """
+    while model._meta.proxy:
+        model = model._meta.proxy_for_model
+    return model
+
+def get_signal_sender(model, instance):
+    """
+    Returns the sender of the deletion signals of 'instance', an object of
+    'model': the proxy model it was loaded as, if any, or 'model'.
+    """
+    cls = instance.__class__
+    if cls is not model and not cls._deferred:
+        return cls
+    return model
+
+class Collector(object):
+    """
+    Gathers the objects that have to be deleted along with some initial set
+    of objects, and deletes all of them in dependency order.
+
+    Related objects are looked up a batch of primary keys at a time, and are
+    only loaded as model instances if something listens to the signals sent
+    when they're deleted. Objects that nothing else depends on and that have
+    no signal receivers aren't fetched at all; they're deleted with a single
+    DELETE query per batch.
+    """
+    def __init__(self, using):
+        self.using = using
+        # {model: {pk_val: instance}}. The instance is None for objects that
+        # were only fetched as primary key values.
+        self.data = {}
+        # QuerySets to delete with a raw DELETE, without fetching anything.
+        self.fast_deletes = []
+        # {model: set([models])}: the objects of a model have to be deleted
+        # after the objects of the models it maps to.
+        self.dependencies = {}
+
+    def add(self, model, objs, source=None, nullable=False,
+            reverse_dependency=False):
+        """
+        Adds 'objs', a list of (pk_val, instance) pairs, to the objects of
+        'model' to be deleted. Returns the primary keys of the objects that
+        weren't already collected.
+
+        If the objects are collected through a relation from model 'source',
+        they have to be deleted before the objects of 'source' are, unless the
+        relation is nullable. 'reverse_dependency' swaps that order, as is
+        needed for parent models.
+        """
+        instances = self.data.setdefault(model, {})
+        new_pks = []
+        for pk_val, obj in objs:
+            if pk_val not in instances:
+                new_pks.append(pk_val)
+                instances[pk_val] = obj
+            elif instances[pk_val] is None:
+                instances[pk_val] = obj
+        # Nullable relationships can be ignored -- they are nulled out before
+        # deleting, and therefore do not affect the order in which objects
+        # have to be deleted.
+        if source is not None and not nullable:
+            if reverse_dependency:
+                source, model = model, source
+            self.dependencies.setdefault(source, set()).add(model)
+        return new_pks
+
+    def can_fast_delete(self, model):
+        """
+        Returns True if objects of 'model' can be deleted without fetching
+        them first: nothing listens to their deletion, and no other objects
+        have to be deleted or updated along with them.
+        """
+        opts = model._meta
+        return not (has_delete_receivers(model) or opts.parents or
+                    opts.get_all_related_objects() or opts.many_to_many or
+                    opts.get_all_related_many_to_many_objects())
+
+    def needs_instances(self, model):
+        """
+        Returns True if the objects of 'model' have to be loaded as model
+        instances to be deleted, rather than just as primary key values.
+        """
+        if has_delete_receivers(model):
+            return True
+        for field in model._meta.parents.values():
+            if field is not None and not field.primary_key:
+                return True
+        for related in model._meta.get_all_related_objects(local_only=True):
+            if not related.field.rel.get_related_field().primary_key:
+                return True
+        return False
+
+    def collect(self, model, objs, source=None, nullable=False,
+                reverse_dependency=False):
+        """
+        Adds 'objs', a list of (pk_val, instance) pairs, to the objects of
+        'model' to be deleted, along with every object that has to be deleted
+        because of them: related objects, many-to-many rows, generic relations
+        and, for multi-table inherited models, the parent objects.
+
+        The arguments 'source', 'nullable' and 'reverse_dependency' are
+        passed on to add().
+        """
+        # Objects are collected under the model that holds them, so that
+        # proxies of the same model share their relations and their DELETEs.
+        model = get_concrete_model(model)
+        new_pks = self.add(model, objs, source, nullable, reverse_dependency)
+        if not new_pks:
+            return
+        opts = model._meta
+        instances = self.data[model]
+
+        # Deleting a child deletes its parents too. Relations to the parents
+        # are collected from the parent models.
+        for ptr in opts.parents.values():
+            if ptr is None:
+                continue
+            if ptr.primary_key:
+                parent_pks = new_pks
+            else:
+                parent_pks = [getattr(instances[pk_val], ptr.attname)
+                              for pk_val in new_pks]
+            parent = ptr.rel.to
+            if self.needs_instances(parent):
+                self.collect_related(parent, parent._meta.pk, parent_pks,
+                                     source=model, reverse_dependency=True)
+            else:
+                self.collect(parent, [(pk_val, None) for pk_val in parent_pks],
+                             source=model, reverse_dependency=True)
+
+        for related in opts.get_all_related_objects(local_only=True):
+            field = related.field
+            target = field.rel.get_related_field()
+            if target.primary_key:
+                values = new_pks
+            else:
+                values = [getattr(instances[pk_val], target.attname)
+                          for pk_val in new_pks]
+            self.collect_related(related.model, field, values, source=model,
+                                 nullable=field.null)
+
+        # Explicit intermediary models show up among the related objects
+        # above, so only the automatically created ones are handled here.
+        for field in opts.local_many_to_many:
+            through = field.rel.through
+            if through is not None and through._meta.auto_created:
+                self.collect_related(through,
+                    through._meta.get_field(field.m2m_field_name()), new_pks,
+                    source=model)
+        for related in opts.get_all_related_many_to_many_objects(local_only=True):
+            through = related.field.rel.through
+            if through is not None and through._meta.auto_created:
+                self.collect_related(through,
+                    through._meta.get_field(related.field.m2m_reverse_field_name()),
+                    new_pks, source=model)
+
+        # Generic relations aren't enforced by database constraints, so the
+        # order in which their objects are deleted doesn't matter.
+        for field in opts.many_to_many:
+            if field.rel.through is None:
+                for offset in range(0, len(new_pks), GET_ITERATOR_CHUNK_SIZE):
+                    self.collect_queryset(field.bulk_related_objects(model,
+                        new_pks[offset:offset + GET_ITERATOR_CHUNK_SIZE],
+                        self.using), nullable=True)
+
+    def collect_related(self, model, field, values, source=None,
+                        nullable=False, reverse_dependency=False):
+        """
+        Collects the objects of 'model' for which the value of 'field' is in
+        'values', looking them up a batch at a time.
+        """
+        manager = model._base_manager.using(self.using)
+        for offset in range(0, len(values), GET_ITERATOR_CHUNK_SIZE):
+            batch = values[offset:offset + GET_ITERATOR_CHUNK_SIZE]
+            self.collect_queryset(manager.filter(**{'%s__in' % field.name: batch}),
+                source, nullable, reverse_dependency)
+
+    def collect_queryset(self, queryset, source=None, nullable=False,
+                         reverse_dependency=False):
+        """
+        Collects the objects found by 'queryset'. If nothing depends on them,
+        they'll be deleted with the queryset's own DELETE query instead.
+        """
+        # Receivers of the signals of a proxy model need the instances too.
+        proxy_receivers = (queryset.model._meta.proxy and
+                           has_delete_receivers(queryset.model))
+        model = get_concrete_model(queryset.model)
+        if self.can_fast_delete(model) and not proxy_receivers:
+            self.fast_deletes.append(queryset)
+            return
+        if self.needs_instances(model) or proxy_receivers:
+            objs = [(obj._get_pk_val(), obj) for obj in queryset]
+        else:
+            objs = [(pk_val, None)
+                    for pk_val in queryset.values_list('pk', flat=True)]
+        if objs:
+            self.collect(model, objs, source, nullable, reverse_dependency)
+
+    def sort(self):
+        """
+        Returns the collected models in the order their objects have to be
+        deleted in. If there is a cyclic dependency, the objects can't be
+        deleted in general; but if an appropriate transaction is set up, or if
+        the database is lax enough, it will succeed, so the remaining models
+        are returned in arbitrary order.
+        """
+        sorted_models = []
+        models = self.data.keys()
+        while len(sorted_models) < len(models):
+            found = False
+            for model in models:
+                if model in sorted_models:
+                    continue
+                dependencies = self.dependencies.get(model)
+                if not (dependencies and dependencies.difference(sorted_models)):
+                    sorted_models.append(model)
+                    found = True
+            if not found:
+                sorted_models.extend([m for m in models if m not in sorted_models])
+        return sorted_models
+
+    def delete(self):
+        """
+        Deletes all the collected objects, sending pre_delete and post_delete
+        signals for them.
+        """
+        using = self.using
+        if not transaction.is_managed(using=using):
+            transaction.enter_transaction_management(using=using)
+            forced_managed = True
+        else:
+            forced_managed = False
+        try:
+            ordered_models = self.sort()
+
+            # Pre-notify all instances to be deleted.
+            for model in ordered_models:
+                items = self.data[model].items()
+                items.sort()
+                for pk_val, instance in items:
+                    if instance is None:
+                        continue
+                    sender = get_signal_sender(model, instance)
+                    if has_delete_receivers(sender):
+                        signals.pre_delete.send(sender=sender, instance=instance)
+
+            for queryset in self.fast_deletes:
+                queryset._raw_delete(using=using)
+
+            # Null out references between collected objects, so that the
+            # order of deletion doesn't matter for nullable relations.
+            for model in ordered_models:
+                pk_list = self.data[model].keys()
+                for field, parent in model._meta.get_fields_with_model():
+                    if field.rel and field.null and field.rel.to in self.data:
+                        sql.UpdateQuery(parent or model).clear_related(field,
+                            pk_list, using=using)
+
+            # Now delete the actual data.
+            for model in ordered_models:
+                sql.DeleteQuery(model).delete_batch(self.data[model].keys(),
+                                                    using=using)
+
+            # Last cleanup; set NULLs where there once was a reference to the
+            # object, NULL the primary key of the found objects, and perform
+            # post-notification.
+            for model in ordered_models:
+                null_fields = [f for f in model._meta.fields
+                               if f.rel and f.null and f.rel.to in self.data]
+                for instance in self.data[model].values():
+                    if instance is None:
+                        continue
+                    for field in null_fields:
+                        setattr(instance, field.attname, None)
+                    sender = get_signal_sender(model, instance)
+                    if has_delete_receivers(sender):
+                        signals.post_delete.send(sender=sender, instance=instance)
+                    setattr(instance, model._meta.pk.attname, None)
+
+            if forced_managed:
+                transaction.commit(using=using)
+            else:
+                transaction.commit_unless_managed(using=using)
+        finally:
+            if forced_managed:
+                transaction.leave_transaction_management(using=using)
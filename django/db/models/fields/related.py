@@ -1,5 +1,7 @@
+from operator import attrgetter
+
 from django.conf import settings
-from django.db import connection, router, transaction
+from django.db import connection, connections, router, transaction
 from django.db.backends import util
 from django.db.models import signals, get_model
 from django.db.models.fields import (AutoField, Field, IntegerField,
@@ -272,6 +274,31 @@ class ReverseSingleRelatedObjectDescriptor(object):
     def __init__(self, field_with_rel):
         self.field = field_with_rel
 
+    def is_cached(self, instance):
+        return hasattr(instance, self.field.get_cache_name())
+
+    def get_query_set(self, **db_hints):
+        # If the related manager indicates that it should be used for
+        # related fields, respect that.
+        rel_mgr = self.field.rel.to._default_manager
+        db = router.db_for_read(self.field.rel.to, **db_hints)
+        if getattr(rel_mgr, 'use_for_related_fields', False):
+            return rel_mgr.using(db)
+        return QuerySet(self.field.rel.to).using(db)
+
+    def get_prefetch_query_set(self, instances):
+        other_field = self.field.rel.get_related_field()
+        rel_obj_attr = attrgetter(other_field.attname)
+        instance_attr = attrgetter(self.field.attname)
+        vals = set([instance_attr(inst) for inst in instances])
+        vals.discard(None)
+        if other_field.rel:
+            params = {'%s__pk__in' % self.field.rel.field_name: vals}
+        else:
+            params = {'%s__in' % self.field.rel.field_name: vals}
+        qs = self.get_query_set(instance=instances[0]).filter(**params)
+        return qs, rel_obj_attr, instance_attr, True, self.field.get_cache_name()
+
     def __get__(self, instance, instance_type=None):
         if instance is None:
             return self
@@ -292,14 +319,7 @@ class ReverseSingleRelatedObjectDescriptor(object):
             else:
                 params = {'%s__exact' % self.field.rel.field_name: val}
 
-            # If the related manager indicates that it should be used for
-            # related fields, respect that.
-            rel_mgr = self.field.rel.to._default_manager
-            db = router.db_for_read(self.field.rel.to, instance=instance)
-            if getattr(rel_mgr, 'use_for_related_fields', False):
-                rel_obj = rel_mgr.using(db).get(**params)
-            else:
-                rel_obj = QuerySet(self.field.rel.to).using(db).get(**params)
+            rel_obj = self.get_query_set(instance=instance).get(**params)
             setattr(instance, cache_name, rel_obj)
             return rel_obj
 
@@ -403,11 +423,24 @@ class ForeignRelatedObjectsDescriptor(object):
         """
         rel_field = self.related.field
         rel_model = self.related.model
+        related_field = rel_field.rel.get_related_field()
 
         class RelatedManager(superclass):
             def get_query_set(self):
-                db = self._db or router.db_for_read(rel_model, instance=instance)
-                return superclass.get_query_set(self).using(db).filter(**(self.core_filters))
+                try:
+                    return instance._prefetched_objects_cache[rel_field.related_query_name()]
+                except (AttributeError, KeyError):
+                    db = self._db or router.db_for_read(rel_model, instance=instance)
+                    return superclass.get_query_set(self).using(db).filter(**(self.core_filters))
+
+            def get_prefetch_query_set(self, instances):
+                db = self._db or router.db_for_read(rel_model, instance=instances[0])
+                instance_attr = attrgetter(related_field.attname)
+                query = {'%s__%s__in' % (rel_field.name, related_field.name):
+                        set([instance_attr(obj) for obj in instances])}
+                qs = superclass.get_query_set(self).using(db).filter(**query)
+                return (qs, attrgetter(rel_field.attname), instance_attr,
+                        False, rel_field.related_query_name())
 
             def add(self, *objs):
                 for obj in objs:
@@ -451,7 +484,7 @@ class ForeignRelatedObjectsDescriptor(object):
                 clear.alters_data = True
 
         manager = RelatedManager()
-        attname = rel_field.rel.get_related_field().name
+        attname = related_field.name
         manager.core_filters = {'%s__%s' % (rel_field.name, attname):
                 getattr(instance, attname)}
         manager.model = self.related.model
@@ -463,11 +496,13 @@ def create_many_related_manager(superclass, rel=False):
     and adds behavior for many-to-many related objects."""
     through = rel.through
     class ManyRelatedManager(superclass):
-        def __init__(self, model=None, core_filters=None, instance=None, symmetrical=None,
+        def __init__(self, model=None, query_field_name=None, instance=None, symmetrical=None,
                 join_table=None, source_field_name=None, target_field_name=None,
-                reverse=False):
+                reverse=False, prefetch_cache_name=None):
             super(ManyRelatedManager, self).__init__()
-            self.core_filters = core_filters
+            self.query_field_name = query_field_name
+            self.core_filters = {'%s__pk' % query_field_name: instance._get_pk_val()}
+            self.prefetch_cache_name = prefetch_cache_name
             self.model = model
             self.symmetrical = symmetrical
             self.instance = instance
@@ -480,8 +515,28 @@ def create_many_related_manager(superclass, rel=False):
                 raise ValueError("%r instance needs to have a primary key value before a many-to-many relationship can be used." % instance.__class__.__name__)
 
         def get_query_set(self):
-            db = self._db or router.db_for_read(self.instance.__class__, instance=self.instance)
-            return superclass.get_query_set(self).using(db)._next_is_sticky().filter(**(self.core_filters))
+            try:
+                return self.instance._prefetched_objects_cache[self.prefetch_cache_name]
+            except (AttributeError, KeyError):
+                db = self._db or router.db_for_read(self.instance.__class__, instance=self.instance)
+                return superclass.get_query_set(self).using(db)._next_is_sticky().filter(**(self.core_filters))
+
+        def get_prefetch_query_set(self, instances):
+            db = self._db or router.db_for_read(self.instance.__class__, instance=instances[0])
+            query = {'%s__pk__in' % self.query_field_name:
+                    set([obj._get_pk_val() for obj in instances])}
+            qs = superclass.get_query_set(self).using(db)._next_is_sticky().filter(**query)
+
+            # The related objects don't know which of the instances they
+            # belong to, so select the source column of the join table (which
+            # the filter above has already joined in) alongside them.
+            source_field = self.through._meta.get_field(self.source_field_name)
+            qn = connections[db].ops.quote_name
+            qs = qs.extra(select={'_prefetch_related_val': '%s.%s' % (
+                qn(self.through._meta.db_table), qn(source_field.column))})
+            return (qs, attrgetter('_prefetch_related_val'),
+                    attrgetter(source_field.rel.get_related_field().attname),
+                    False, self.prefetch_cache_name)
 
         # If the ManyToMany relation has an intermediary model,
         # the add and remove methods do not exist.
@@ -656,12 +711,13 @@ class ManyRelatedObjectsDescriptor(object):
 
         manager = RelatedManager(
             model=rel_model,
-            core_filters={'%s__pk' % self.related.field.name: instance._get_pk_val()},
+            query_field_name=self.related.field.name,
             instance=instance,
             symmetrical=False,
             source_field_name=self.related.field.m2m_reverse_field_name(),
             target_field_name=self.related.field.m2m_field_name(),
-            reverse=True
+            reverse=True,
+            prefetch_cache_name=self.related.field.related_query_name()
         )
 
         return manager
@@ -708,12 +764,13 @@ class ReverseManyRelatedObjectsDescriptor(object):
 
         manager = RelatedManager(
             model=rel_model,
-            core_filters={'%s__pk' % self.field.related_query_name(): instance._get_pk_val()},
+            query_field_name=self.field.related_query_name(),
             instance=instance,
             symmetrical=self.field.rel.symmetrical,
             source_field_name=self.field.m2m_field_name(),
             target_field_name=self.field.m2m_reverse_field_name(),
-            reverse=False
+            reverse=False,
+            prefetch_cache_name=self.field.name
         )
 
         return manager
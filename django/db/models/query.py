@@ -3,13 +3,15 @@ The main QuerySet implementation. This provides the public API for the ORM.
 """
 
 from copy import deepcopy
-from itertools import izip
 
 from django.db import connections, router, transaction, IntegrityError
 from django.db.models.aggregates import Aggregate
-from django.db.models.fields import DateField
-from django.db.models.query_utils import Q, select_related_descend, CollectedObjects, CyclicDependency, deferred_class_factory, InvalidQuery
+from django.db.models.deletion import Collector
+from django.db.models.fields import AutoField, DateField
+from django.db.models.query_utils import Q, select_related_descend, CollectedObjects, deferred_class_factory, InvalidQuery
 from django.db.models import signals, sql
+from django.db.models.sql.constants import GET_ITERATOR_CHUNK_SIZE, LOOKUP_SEP
+from django.db.models.sql.datastructures import Case
 from django.utils.copycompat import deepcopy
 
 # Used to control how many objects are worked with at once in some cases (e.g.
@@ -36,6 +38,8 @@ class QuerySet(object):
         self._iter = None
         self._sticky_filter = False
         self._for_write = False
+        self._prefetch_related_lookups = []
+        self._prefetch_done = False
 
     ########################
     # PYTHON MAGIC METHODS #
@@ -81,9 +85,17 @@ class QuerySet(object):
                 self._result_cache = list(self.iterator())
         elif self._iter:
             self._result_cache.extend(list(self._iter))
+        if self._prefetch_related_lookups and not self._prefetch_done:
+            self._prefetch_related_objects()
         return len(self._result_cache)
 
     def __iter__(self):
+        if self._prefetch_related_lookups and not self._prefetch_done:
+            # We need all the results in order to be able to do the prefetch
+            # in one go. To minimize code duplication, we use the __len__
+            # code path which also forces this, and also does the prefetch.
+            len(self)
+
         if self._result_cache is None:
             self._iter = self.iterator()
             self._result_cache = []
@@ -210,10 +222,15 @@ class QuerySet(object):
     # METHODS THAT DO DATABASE QUERIES #
     ####################################
 
-    def iterator(self):
+    def iterator(self, chunk_size=GET_ITERATOR_CHUNK_SIZE, server_side=False):
         """
         An iterator over the results from applying this QuerySet to the
         database.
+
+        Rows are read from the database 'chunk_size' at a time. If
+        'server_side' is True, the results are streamed through a server-side
+        cursor on backends that support one, instead of being buffered
+        entirely in memory by the database adapter.
         """
         fill_cache = self.query.select_related
         if isinstance(fill_cache, dict):
@@ -228,7 +245,6 @@ class QuerySet(object):
         only_load = self.query.get_loaded_field_names()
         if not fill_cache:
             fields = self.model._meta.fields
-            pk_idx = self.model._meta.pk_index()
 
         index_start = len(extra_select)
         aggregate_start = index_start + len(self.model._meta.fields)
@@ -240,9 +256,6 @@ class QuerySet(object):
             for field, model in self.model._meta.get_fields_with_model():
                 if model is None:
                     model = self.model
-                if field == self.model._meta.pk:
-                    # Record the index of the primary key when it is found
-                    pk_idx = len(load_fields)
                 try:
                     if field.name in only_load[model]:
                         # Add a field that has been explicitly included
@@ -255,7 +268,7 @@ class QuerySet(object):
         skip = None
         if load_fields and not fill_cache:
             # Some fields have been deferred, so we have to initialise
-            # via keyword arguments.
+            # from the values of the other fields only.
             skip = set()
             init_list = []
             for field in fields:
@@ -263,26 +276,23 @@ class QuerySet(object):
                     skip.add(field.attname)
                 else:
                     init_list.append(field.attname)
+            init_list = tuple(init_list)
             model_cls = deferred_class_factory(self.model, skip)
+        if not skip:
+            model_cls = self.model
+            init_list = tuple([f.attname for f in self.model._meta.fields])
 
         compiler = self.query.get_compiler(using=self.db)
-        for row in compiler.results_iter():
+        for row in compiler.results_iter(chunk_size, server_side):
             if fill_cache:
                 obj, _ = get_cached_row(self.model, row,
                             index_start, using=self.db, max_depth=max_depth,
                             requested=requested, offset=len(aggregate_select),
                             only_load=only_load)
             else:
-                if skip:
-                    row_data = row[index_start:aggregate_start]
-                    pk_val = row_data[pk_idx]
-                    obj = model_cls(**dict(zip(init_list, row_data)))
-                else:
-                    # Omit aggregates in object creation.
-                    obj = self.model(*row[index_start:aggregate_start])
-
-                # Store the source database of the object
-                obj._state.db = self.db
+                # Omit aggregates in object creation.
+                obj = model_cls._from_db(self.db, init_list,
+                                         row[index_start:aggregate_start])
 
             for i, k in enumerate(extra_select):
                 setattr(obj, k, row[i])
@@ -352,6 +362,110 @@ class QuerySet(object):
         obj.save(force_insert=True, using=self.db)
         return obj
 
+    def bulk_create(self, objs, batch_size=None):
+        """
+        Inserts each of the given instances into the database, using as few
+        multi-row INSERT statements as the database backend allows. This does
+        *not* call save() on the instances and sends no pre_save or post_save
+        signals. Automatically generated primary keys are only set on the
+        instances if the backend can return them from a multi-row insert.
+        Returns the list of instances.
+        """
+        # Rows of multi-table inherited models can't be inserted before the
+        # primary keys of their parent rows are known, which would need one
+        # query per object anyway.
+        if self.model._meta.parents:
+            raise ValueError("Can't bulk create an inherited model.")
+        assert batch_size is None or batch_size > 0, \
+                "bulk_create() batch_size must be a positive integer."
+        objs = list(objs)
+        if not objs:
+            return objs
+        self._for_write = True
+        fields = self.model._meta.local_fields
+        if not transaction.is_managed(using=self.db):
+            transaction.enter_transaction_management(using=self.db)
+            forced_managed = True
+        else:
+            forced_managed = False
+        try:
+            objs_with_pk = [obj for obj in objs if obj.pk is not None]
+            objs_without_pk = [obj for obj in objs if obj.pk is None]
+            if objs_with_pk:
+                self._batched_insert(objs_with_pk, fields, batch_size)
+            if objs_without_pk:
+                self._batched_insert(objs_without_pk,
+                        [f for f in fields if not isinstance(f, AutoField)],
+                        batch_size, return_id=self.model._meta.has_auto_field)
+            if forced_managed:
+                transaction.commit(using=self.db)
+            else:
+                transaction.commit_unless_managed(using=self.db)
+        finally:
+            if forced_managed:
+                transaction.leave_transaction_management(using=self.db)
+        return objs
+    bulk_create.alters_data = True
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        """
+        Updates the given fields of each of the given instances in the
+        database, using one UPDATE query per batch of instances. The new
+        values are picked by primary key with a CASE expression. This does
+        *not* call save() on the instances and sends no pre_save or post_save
+        signals. Returns the number of rows matched.
+        """
+        assert self.query.can_filter(), \
+                "Cannot update a query once a slice has been taken."
+        assert batch_size is None or batch_size > 0, \
+                "bulk_update() batch_size must be a positive integer."
+        if not fields:
+            raise ValueError("bulk_update() requires a list of field names.")
+        opts = self.model._meta
+        fields = [opts.get_field(name) for name in fields]
+        for field in fields:
+            if field.primary_key or field not in opts.local_fields:
+                raise ValueError("bulk_update() can only update non-primary "
+                        "key fields of the model's own table, not %r." % field.name)
+        objs = list(objs)
+        if not objs:
+            return 0
+        for obj in objs:
+            if obj.pk is None:
+                raise ValueError("All bulk_update() objects must have a primary key.")
+        self._for_write = True
+        connection = connections[self.db]
+        # Each object adds a primary key and a value parameter per field, and
+        # its primary key to the WHERE clause.
+        max_batch_size = connection.ops.bulk_batch_size(
+                ['pk', 'pk'] * len(fields) + ['pk'], objs)
+        batch_size = min(batch_size or max_batch_size, max_batch_size)
+        rows = 0
+        if not transaction.is_managed(using=self.db):
+            transaction.enter_transaction_management(using=self.db)
+            forced_managed = True
+        else:
+            forced_managed = False
+        try:
+            for offset in range(0, len(objs), batch_size):
+                batch = objs[offset:offset + batch_size]
+                query = self.query.clone(sql.UpdateQuery)
+                query.add_update_fields([(field, None, Case(field, opts.pk,
+                        [(obj.pk, getattr(obj, field.attname)) for obj in batch]))
+                        for field in fields])
+                query.add_filter(('pk__in', [obj.pk for obj in batch]))
+                rows += query.get_compiler(self.db).execute_sql(None)
+            if forced_managed:
+                transaction.commit(using=self.db)
+            else:
+                transaction.commit_unless_managed(using=self.db)
+        finally:
+            if forced_managed:
+                transaction.leave_transaction_management(using=self.db)
+        self._result_cache = None
+        return rows
+    bulk_update.alters_data = True
+
     def get_or_create(self, **kwargs):
         """
         Looks up an object with the given kwargs, creating one if necessary.
@@ -380,6 +494,26 @@ class QuerySet(object):
                 except self.model.DoesNotExist:
                     raise e
 
+    def update_or_create(self, **kwargs):
+        """
+        Looks up an object with the given kwargs and updates it with the
+        values in 'defaults', creating a new one from kwargs and 'defaults' if
+        none exists. Returns a tuple of (object, created), where created is a
+        boolean specifying whether an object was created.
+        """
+        defaults = kwargs.pop('defaults', {})
+        assert kwargs, \
+                'update_or_create() must be passed at least one keyword argument'
+        obj, created = self.get_or_create(defaults=defaults, **kwargs)
+        if created:
+            return obj, True
+        for name, value in defaults.iteritems():
+            setattr(obj, name, value)
+        # The object has just been fetched, so there's no need to check that
+        # it exists before updating it.
+        obj.save(force_update=True, using=self.db)
+        return obj, False
+
     def latest(self, field_name=None):
         """
         Returns the latest object, according to the model's 'get_latest_by'
@@ -427,27 +561,32 @@ class QuerySet(object):
         del_query.query.select_related = False
         del_query.query.clear_ordering()
 
-        # Delete objects in chunks to prevent the list of related objects from
-        # becoming too long.
-        seen_objs = None
-        del_itr = iter(del_query)
-        while 1:
-            # Collect a chunk of objects to be deleted, and then all the
-            # objects that are related to the objects that are to be deleted.
-            # The chunking *isn't* done by slicing the del_query because we
-            # need to maintain the query cache on del_query (see #12328)
-            seen_objs = CollectedObjects(seen_objs)
-            for i, obj in izip(xrange(CHUNK_SIZE), del_itr):
-                obj._collect_sub_objects(seen_objs)
-
-            if not seen_objs:
-                break
-            delete_objects(seen_objs, del_query.db)
+        collector = Collector(using=del_query.db)
+        collector.collect_queryset(del_query)
+        collector.delete()
 
         # Clear the result cache, in case this QuerySet gets reused.
         self._result_cache = None
     delete.alters_data = True
 
+    def _raw_delete(self, using):
+        """
+        Deletes the objects found by this QuerySet with as few DELETE queries
+        as possible, without fetching them or sending any signals. Related
+        objects are not deleted.
+        """
+        query = self.query
+        del_query = sql.DeleteQuery(self.model)
+        joins = [alias for alias in query.tables if query.alias_refcount[alias]]
+        if len(joins) > 1 or query.extra_tables:
+            # A DELETE can only refer to a single table.
+            pk_list = list(self.values_list('pk', flat=True))
+            del_query.delete_batch(pk_list, using=using)
+        else:
+            del_query.do_query(self.model._meta.db_table, query.where,
+                               using=using)
+    _raw_delete.alters_data = True
+
     def update(self, **kwargs):
         """
         Updates all elements in the current QuerySet, setting all the given
@@ -607,6 +746,23 @@ class QuerySet(object):
             obj.query.max_depth = depth
         return obj
 
+    def prefetch_related(self, *lookups):
+        """
+        Returns a new QuerySet instance that will prefetch the specified
+        many-to-one, many-to-many and foreign key related objects when the
+        QuerySet is evaluated, using one query per relation.
+
+        When prefetch_related() is called more than once, the list of lookups
+        to prefetch is appended to. If prefetch_related(None) is called, the
+        list is cleared.
+        """
+        clone = self._clone()
+        if lookups == (None,):
+            clone._prefetch_related_lookups = []
+        else:
+            clone._prefetch_related_lookups.extend(lookups)
+        return clone
+
     def dup_select_related(self, other):
         """
         Copies the related selection status from the QuerySet 'other' to the
@@ -744,6 +900,7 @@ class QuerySet(object):
             query.filter_is_sticky = True
         c = klass(model=self.model, query=query, using=self._db)
         c._for_write = self._for_write
+        c._prefetch_related_lookups = self._prefetch_related_lookups[:]
         c.__dict__.update(kwargs)
         if setup and hasattr(c, '_setup_query'):
             c._setup_query()
@@ -761,6 +918,50 @@ class QuerySet(object):
             except StopIteration:
                 self._iter = None
 
+    def _batched_insert(self, objs, fields, batch_size, return_id=False):
+        """
+        A helper method for bulk_create() that inserts the given objects in
+        batches no larger than both 'batch_size' and what the database backend
+        can handle in a single statement.
+        """
+        connection = connections[self.db]
+        ops, features = connection.ops, connection.features
+        max_batch_size = max(ops.bulk_batch_size(fields, objs), 1)
+        if not features.has_bulk_insert or not fields:
+            max_batch_size = 1
+        batch_size = min(batch_size or max_batch_size, max_batch_size)
+        if batch_size > 1:
+            return_id = return_id and features.can_return_ids_from_bulk_insert
+        pk_attname = self.model._meta.pk.attname
+        for offset in range(0, len(objs), batch_size):
+            batch = objs[offset:offset + batch_size]
+            if fields:
+                value_rows = [
+                    [f.get_db_prep_save(f.pre_save(obj, True), connection=connection)
+                     for f in fields]
+                    for obj in batch
+                ]
+                ids = bulk_insert_query(self.model, fields, value_rows,
+                        return_id=return_id, using=self.db)
+            else:
+                # Nothing but an automatic primary key to insert, so create
+                # each row with its defaults.
+                ids = insert_query(self.model,
+                        [(self.model._meta.pk, ops.pk_default_value())],
+                        return_id=return_id, raw_values=True, using=self.db)
+            if return_id:
+                if len(batch) == 1:
+                    ids = [ids]
+                for obj, pk_val in zip(batch, ids):
+                    setattr(obj, pk_attname, pk_val)
+            for obj in batch:
+                obj._state.db = self.db
+
+    def _prefetch_related_objects(self):
+        # This method can only be called once the result cache has been filled.
+        prefetch_related_objects(self._result_cache, self._prefetch_related_lookups)
+        self._prefetch_done = True
+
     def _next_is_sticky(self):
         """
         Indicates that the next filter call and the one following that should
@@ -818,7 +1019,7 @@ class ValuesQuerySet(QuerySet):
         # QuerySet.clone() will also set up the _fields attribute with the
         # names of the model fields to select.
 
-    def iterator(self):
+    def iterator(self, chunk_size=GET_ITERATOR_CHUNK_SIZE, server_side=False):
         # Purge any extra columns that haven't been explicitly asked for
         extra_names = self.query.extra_select.keys()
         field_names = self.field_names
@@ -826,7 +1027,8 @@ class ValuesQuerySet(QuerySet):
 
         names = extra_names + field_names + aggregate_names
 
-        for row in self.query.get_compiler(self.db).results_iter():
+        compiler = self.query.get_compiler(self.db)
+        for row in compiler.results_iter(chunk_size, server_side):
             yield dict(zip(names, row))
 
     def _setup_query(self):
@@ -939,12 +1141,13 @@ class ValuesQuerySet(QuerySet):
         return self
 
 class ValuesListQuerySet(ValuesQuerySet):
-    def iterator(self):
+    def iterator(self, chunk_size=GET_ITERATOR_CHUNK_SIZE, server_side=False):
+        compiler = self.query.get_compiler(self.db)
         if self.flat and len(self._fields) == 1:
-            for row in self.query.get_compiler(self.db).results_iter():
+            for row in compiler.results_iter(chunk_size, server_side):
                 yield row[0]
         elif not self.query.extra_select and not self.query.aggregate_select:
-            for row in self.query.get_compiler(self.db).results_iter():
+            for row in compiler.results_iter(chunk_size, server_side):
                 yield tuple(row)
         else:
             # When extra(select=...) or an annotation is involved, the extra
@@ -964,7 +1167,7 @@ class ValuesListQuerySet(ValuesQuerySet):
             else:
                 fields = names
 
-            for row in self.query.get_compiler(self.db).results_iter():
+            for row in compiler.results_iter(chunk_size, server_side):
                 data = dict(zip(names, row))
                 yield tuple([data[f] for f in fields])
 
@@ -975,8 +1178,8 @@ class ValuesListQuerySet(ValuesQuerySet):
 
 
 class DateQuerySet(QuerySet):
-    def iterator(self):
-        return self.query.get_compiler(self.db).results_iter()
+    def iterator(self, chunk_size=GET_ITERATOR_CHUNK_SIZE, server_side=False):
+        return self.query.get_compiler(self.db).results_iter(chunk_size, server_side)
 
     def _setup_query(self):
         """
@@ -1026,7 +1229,7 @@ class EmptyQuerySet(QuerySet):
         c._result_cache = []
         return c
 
-    def iterator(self):
+    def iterator(self, chunk_size=GET_ITERATOR_CHUNK_SIZE, server_side=False):
         # This slightly odd construction is because we need an empty generator
         # (it raises StopIteration immediately).
         yield iter([]).next()
@@ -1061,6 +1264,12 @@ class EmptyQuerySet(QuerySet):
         """
         return self
 
+    def prefetch_related(self, *lookups):
+        """
+        Always returns EmptyQuerySet.
+        """
+        return self
+
     def annotate(self, *args, **kwargs):
         """
         Always returns EmptyQuerySet.
@@ -1185,11 +1394,10 @@ def get_cached_row(klass, row, index_start, using, max_depth=0, cur_depth=0,
         # Otherwise, construct the related object.
         if fields == (None,) * field_count:
             obj = None
-        elif skip:
-            klass = deferred_class_factory(klass, skip)
-            obj = klass(**dict(zip(init_list, fields)))
         else:
-            obj = klass(*fields)
+            if skip:
+                klass = deferred_class_factory(klass, skip)
+            obj = klass._from_db(using, tuple(init_list), fields)
 
     else:
         # Load all fields on klass
@@ -1205,11 +1413,7 @@ def get_cached_row(klass, row, index_start, using, max_depth=0, cur_depth=0,
         if fields == (None,) * field_count:
             obj = None
         else:
-            obj = klass(**dict(zip(field_names, fields)))
-
-    # If an object was retrieved, set the database state.
-    if obj:
-        obj._state.db = using
+            obj = klass._from_db(using, tuple(field_names), fields)
 
     index_end = index_start + field_count + offset
     # Iterate over each related object, populating any
@@ -1281,78 +1485,137 @@ def get_cached_row(klass, row, index_start, using, max_depth=0, cur_depth=0,
                                     pass
     return obj, index_end
 
-def delete_objects(seen_objs, using):
+def prefetch_related_objects(result_cache, related_lookups):
+    """
+    Helper function for prefetch_related functionality.
+
+    Populates the prefetched objects caches for a list of results from a
+    QuerySet. Each lookup is a chain of relation names separated by '__';
+    every relation in the chain is fetched with a single query for all the
+    objects found at the previous level.
+    """
+    if not result_cache:
+        return
+
+    # Several lookups may share a prefix (e.g. 'entries' and
+    # 'entries__authors'); each level is only fetched once.
+    done_queries = {}
+
+    for lookup in related_lookups:
+        # Top level, the list of objects to decorate is the result cache from
+        # the primary QuerySet. It won't be for deeper levels.
+        obj_list = result_cache
+        attrs = lookup.split(LOOKUP_SEP)
+        for level, attr in enumerate(attrs):
+            if not obj_list:
+                break
+            # Results of values() and similar QuerySets can't hold a cache,
+            # which makes prefetching pointless.
+            if not hasattr(obj_list[0], '_meta'):
+                break
+            for obj in obj_list:
+                if not hasattr(obj, '_prefetched_objects_cache'):
+                    obj._prefetched_objects_cache = {}
+
+            # The objects are all of the same type (that's the premise of
+            # prefetch_related), so what applies to the first one applies to
+            # all of them.
+            first_obj = obj_list[0]
+            prefetcher, attr_found, is_fetched = get_prefetcher(first_obj, attr)
+
+            if not attr_found:
+                raise AttributeError("Cannot find '%s' on %s object, '%s' is "
+                                     "an invalid parameter to prefetch_related()" %
+                                     (attr, first_obj.__class__.__name__, lookup))
+
+            if level == len(attrs) - 1 and prefetcher is None:
+                # The last part of the lookup *must* be something that
+                # supports prefetching, otherwise asking for it is a mistake.
+                raise ValueError("'%s' does not resolve to an item that "
+                                 "supports prefetching - this is an invalid "
+                                 "parameter to prefetch_related()." % lookup)
+
+            current_lookup = LOOKUP_SEP.join(attrs[:level + 1])
+            if current_lookup in done_queries:
+                obj_list = done_queries[current_lookup]
+            elif prefetcher is not None and not is_fetched:
+                obj_list = prefetch_one_level(obj_list, prefetcher, attr)
+                done_queries[current_lookup] = obj_list
+            else:
+                # Either a single related object that has already been
+                # fetched (e.g. through select_related()), or some other
+                # attribute that needs to be traversed. Nullable relations
+                # leave gaps, which are skipped.
+                obj_list = [getattr(obj, attr) for obj in obj_list]
+                obj_list = [obj for obj in obj_list if obj is not None]
+
+def get_prefetcher(instance, attr):
     """
-    Iterate through a list of seen classes, and remove any instances that are
-    referred to.
+    For the attribute 'attr' on the given instance, finds an object that has a
+    get_prefetch_query_set() method. Returns a tuple of (the prefetcher object
+    or None, whether the attribute was found at all, whether the related
+    object has already been fetched).
     """
-    connection = connections[using]
-    if not transaction.is_managed(using=using):
-        transaction.enter_transaction_management(using=using)
-        forced_managed = True
+    prefetcher = None
+    attr_found = False
+    is_fetched = False
+
+    # For single related objects we have to avoid getting the attribute from
+    # the instance, since that would trigger the query. So we look at the
+    # descriptor on the class first.
+    rel_obj_descriptor = getattr(instance.__class__, attr, None)
+    if rel_obj_descriptor is None:
+        attr_found = hasattr(instance, attr)
     else:
-        forced_managed = False
-    try:
-        ordered_classes = seen_objs.keys()
-    except CyclicDependency:
-        # If there is a cyclic dependency, we cannot in general delete the
-        # objects.  However, if an appropriate transaction is set up, or if the
-        # database is lax enough, it will succeed. So for now, we go ahead and
-        # try anyway.
-        ordered_classes = seen_objs.unordered_keys()
-
-    obj_pairs = {}
-    try:
-        for cls in ordered_classes:
-            items = seen_objs[cls].items()
-            items.sort()
-            obj_pairs[cls] = items
-
-            # Pre-notify all instances to be deleted.
-            for pk_val, instance in items:
-                if not cls._meta.auto_created:
-                    signals.pre_delete.send(sender=cls, instance=instance)
-
-            pk_list = [pk for pk,instance in items]
-
-            update_query = sql.UpdateQuery(cls)
-            for field, model in cls._meta.get_fields_with_model():
-                if (field.rel and field.null and field.rel.to in seen_objs and
-                        filter(lambda f: f.column == field.rel.get_related_field().column,
-                        field.rel.to._meta.fields)):
-                    if model:
-                        sql.UpdateQuery(model).clear_related(field, pk_list, using=using)
-                    else:
-                        update_query.clear_related(field, pk_list, using=using)
-
-        # Now delete the actual data.
-        for cls in ordered_classes:
-            items = obj_pairs[cls]
-            items.reverse()
-
-            pk_list = [pk for pk,instance in items]
-            del_query = sql.DeleteQuery(cls)
-            del_query.delete_batch(pk_list, using=using)
-
-            # Last cleanup; set NULLs where there once was a reference to the
-            # object, NULL the primary key of the found objects, and perform
-            # post-notification.
-            for pk_val, instance in items:
-                for field in cls._meta.fields:
-                    if field.rel and field.null and field.rel.to in seen_objs:
-                        setattr(instance, field.attname, None)
+        attr_found = True
+        if hasattr(rel_obj_descriptor, 'get_prefetch_query_set'):
+            prefetcher = rel_obj_descriptor
+            is_fetched = rel_obj_descriptor.is_cached(instance)
+        else:
+            # The descriptor doesn't support prefetching itself, so get the
+            # attribute from the instance to reach the related manager.
+            rel_obj = getattr(instance, attr)
+            if hasattr(rel_obj, 'get_prefetch_query_set'):
+                prefetcher = rel_obj
+    return prefetcher, attr_found, is_fetched
+
+def prefetch_one_level(instances, prefetcher, attname):
+    """
+    Helper function for prefetch_related_objects().
 
-                if not cls._meta.auto_created:
-                    signals.post_delete.send(sender=cls, instance=instance)
-                setattr(instance, cls._meta.pk.attname, None)
+    Runs a single prefetch query for all the instances using the prefetcher
+    object and assigns the results to the relevant caches on the instances.
+    Returns the list of prefetched objects.
 
-        if forced_managed:
-            transaction.commit(using=using)
+    The prefetcher's get_prefetch_query_set() takes the list of instances and
+    returns a tuple of (a QuerySet of the objects related to the instances, a
+    callable that gets the value to match from each related object, a callable
+    that gets the value to match from each instance, a boolean that is True
+    for single related objects, the cache name to assign the results to).
+    """
+    rel_qs, rel_obj_attr, instance_attr, single, cache_name = \
+        prefetcher.get_prefetch_query_set(instances)
+    all_related_objects = list(rel_qs)
+
+    rel_obj_cache = {}
+    for rel_obj in all_related_objects:
+        rel_obj_cache.setdefault(rel_obj_attr(rel_obj), []).append(rel_obj)
+
+    for obj in instances:
+        vals = rel_obj_cache.get(instance_attr(obj), [])
+        if single:
+            if vals:
+                setattr(obj, cache_name, vals[0])
         else:
-            transaction.commit_unless_managed(using=using)
-    finally:
-        if forced_managed:
-            transaction.leave_transaction_management(using=using)
+            # The attribute is a related manager; prime the QuerySet its all()
+            # method will hand out from now on.
+            qs = getattr(obj, attname).all()
+            qs._result_cache = vals
+            # The individual QuerySet mustn't redo the prefetching that has
+            # just been done for it.
+            qs._prefetch_done = True
+            obj._prefetched_objects_cache[cache_name] = qs
+    return all_related_objects
 
 class RawQuerySet(object):
     """
@@ -1477,3 +1740,13 @@ def insert_query(model, values, return_id=False, raw_values=False, using=None):
     query = sql.InsertQuery(model)
     query.insert_values(values, raw_values)
     return query.get_compiler(using=using).execute_sql(return_id)
+
+def bulk_insert_query(model, fields, value_rows, return_id=False, using=None):
+    """
+    Inserts several records for the given model with a single statement. This
+    is how QuerySet.bulk_create() is implemented and is not part of the public
+    API.
+    """
+    query = sql.InsertQuery(model)
+    query.insert_batch(fields, value_rows)
+    return query.get_compiler(using=using).execute_sql(return_id)
@@ -51,6 +51,40 @@ class SQLCompiler(object):
 
         If 'with_limits' is False, any limit/offset information is not included
         in the query.
+
+        If the database has an SQL cache (see the SQL_CACHE_SIZE database
+        setting), the SQL of queries with the same structure is only built
+        once, and later queries just supply new parameters.
+        """
+        cache = self.connection.sql_cache
+        if cache is None:
+            return self.as_uncached_sql(with_limits, with_col_aliases)
+        key, params = self.query.get_sql_cache_key(self.connection)
+        if key is not None:
+            key = (self.__class__, with_limits, with_col_aliases, key)
+            try:
+                sql, ordering_aliases = cache[key]
+            except KeyError:
+                pass
+            except TypeError:
+                # Some part of the query isn't hashable.
+                key = None
+            else:
+                self.query.ordering_aliases = list(ordering_aliases)
+                return sql, tuple(params)
+        sql, result_params = self.as_uncached_sql(with_limits, with_col_aliases)
+        # Only cache the SQL if the query's parameters really were the WHERE
+        # parameters the key was built with.
+        if key is not None and result_params == tuple(params):
+            if len(cache) >= self.connection.settings_dict['SQL_CACHE_SIZE']:
+                cache.clear()
+            cache[key] = (sql, tuple(self.query.ordering_aliases))
+        return sql, result_params
+
+    def as_uncached_sql(self, with_limits=True, with_col_aliases=False):
+        """
+        Creates the SQL for this query without using the SQL cache. Takes the
+        same arguments, and returns the same values, as as_sql().
         """
         self.pre_sql_setup()
         out_cols = self.get_columns(with_col_aliases)
@@ -663,13 +697,17 @@ class SQLCompiler(object):
         self.query.deferred_to_data(columns, self.query.deferred_to_columns_cb)
         return columns
 
-    def results_iter(self):
+    def results_iter(self, chunk_size=GET_ITERATOR_CHUNK_SIZE, server_side=False):
         """
         Returns an iterator over the results from executing this query.
+
+        The rows are fetched from the cursor 'chunk_size' at a time. If
+        'server_side' is True, a cursor that streams results from the database
+        server is used, where the backend supports it.
         """
         resolve_columns = hasattr(self, 'resolve_columns')
         fields = None
-        for rows in self.execute_sql(MULTI):
+        for rows in self.execute_sql(MULTI, chunk_size, server_side):
             for row in rows:
                 if resolve_columns:
                     if fields is None:
@@ -700,7 +738,8 @@ class SQLCompiler(object):
 
                 yield row
 
-    def execute_sql(self, result_type=MULTI):
+    def execute_sql(self, result_type=MULTI, chunk_size=GET_ITERATOR_CHUNK_SIZE,
+            server_side=False):
         """
         Run the query against the database and returns the result(s). The
         return value is a single data item if result_type is SINGLE, or an
@@ -712,6 +751,11 @@ class SQLCompiler(object):
         subclasses such as InsertQuery). It's possible, however, that no query
         is needed, as the filters describe an empty set. In that case, None is
         returned, to avoid any unnecessary database interaction.
+
+        For MULTI queries, 'chunk_size' is the number of rows retrieved by
+        each fetchmany() call, and 'server_side' requests a cursor that
+        streams the results from the database server (see
+        BaseDatabaseWrapper.chunked_cursor()).
         """
         try:
             sql, params = self.as_sql()
@@ -723,7 +767,10 @@ class SQLCompiler(object):
             else:
                 return
 
-        cursor = self.connection.cursor()
+        if result_type == MULTI and server_side:
+            cursor = self.connection.chunked_cursor()
+        else:
+            cursor = self.connection.cursor()
         cursor.execute(sql, params)
 
         if not result_type:
@@ -736,9 +783,12 @@ class SQLCompiler(object):
         # The MULTI case.
         if self.query.ordering_aliases:
             result = order_modified_iter(cursor, len(self.query.ordering_aliases),
-                    self.connection.features.empty_fetchmany_value)
+                    self.connection.features.empty_fetchmany_value, chunk_size)
+        elif server_side:
+            result = cursor_iter(cursor,
+                    self.connection.features.empty_fetchmany_value, chunk_size)
         else:
-            result = iter((lambda: cursor.fetchmany(GET_ITERATOR_CHUNK_SIZE)),
+            result = iter((lambda: cursor.fetchmany(chunk_size)),
                     self.connection.features.empty_fetchmany_value)
         if not self.connection.features.can_use_chunked_reads:
             # If we are using non-chunked reads, we return the same data
@@ -769,7 +819,14 @@ class SQLInsertCompiler(SQLCompiler):
         result = ['INSERT INTO %s' % qn(opts.db_table)]
         result.append('(%s)' % ', '.join([qn(c) for c in self.query.columns]))
         values = [self.placeholder(*v) for v in self.query.values]
-        result.append('VALUES (%s)' % ', '.join(values))
+        if self.query.extra_rows:
+            placeholder_rows = [values] + [
+                [self.placeholder(*v) for v in row]
+                for row in self.query.extra_rows
+            ]
+            result.append(self.connection.ops.bulk_insert_sql(placeholder_rows))
+        else:
+            result.append('VALUES (%s)' % ', '.join(values))
         params = self.query.params
         if self.return_id and self.connection.features.can_return_id_from_insert:
             col = "%s.%s" % (qn(opts.db_table), qn(opts.pk.column))
@@ -783,6 +840,8 @@ class SQLInsertCompiler(SQLCompiler):
         cursor = super(SQLInsertCompiler, self).execute_sql(None)
         if not (return_id and cursor):
             return
+        if self.query.extra_rows:
+            return self.connection.ops.fetch_returned_insert_ids(cursor)
         if self.connection.features.can_return_id_from_insert:
             return self.connection.ops.fetch_returned_insert_id(cursor)
         return self.connection.ops.last_insert_id(cursor,
@@ -800,7 +859,8 @@ class SQLDeleteCompiler(SQLCompiler):
         qn = self.quote_name_unless_alias
         result = ['DELETE FROM %s' % qn(self.query.tables[0])]
         where, params = self.query.where.as_sql(qn=qn, connection=self.connection)
-        result.append('WHERE %s' % where)
+        if where:
+            result.append('WHERE %s' % where)
         return ' '.join(result), tuple(params)
 
 class SQLUpdateCompiler(SQLCompiler):
@@ -932,7 +992,7 @@ class SQLAggregateCompiler(SQLCompiler):
         return (sql, params)
 
 class SQLDateCompiler(SQLCompiler):
-    def results_iter(self):
+    def results_iter(self, chunk_size=GET_ITERATOR_CHUNK_SIZE, server_side=False):
         """
         Returns an iterator over the results from executing this query.
         """
@@ -945,7 +1005,7 @@ class SQLDateCompiler(SQLCompiler):
             needs_string_cast = self.connection.features.needs_datetime_string_cast
 
         offset = len(self.query.extra_select)
-        for rows in self.execute_sql(MULTI):
+        for rows in self.execute_sql(MULTI, chunk_size, server_side):
             for row in rows:
                 date = row[offset]
                 if resolve_columns:
@@ -962,13 +1022,23 @@ def empty_iter():
     yield iter([]).next()
 
 
-def order_modified_iter(cursor, trim, sentinel):
+def cursor_iter(cursor, sentinel, chunk_size=GET_ITERATOR_CHUNK_SIZE):
+    """
+    Yields blocks of rows from a cursor, closing the cursor once all the rows
+    have been read. Server-side cursors hold resources on the database server
+    until they are closed, so they shouldn't wait for garbage collection.
+    """
+    for rows in iter((lambda: cursor.fetchmany(chunk_size)), sentinel):
+        yield rows
+    cursor.close()
+
+
+def order_modified_iter(cursor, trim, sentinel, chunk_size=GET_ITERATOR_CHUNK_SIZE):
     """
     Yields blocks of rows from a cursor. We use this iterator in the special
     case when extra output columns have been added to support ordering
     requirements. We must trim those extra columns before anything else can use
     the results, since they're only needed to make the SQL valid.
     """
-    for rows in iter((lambda: cursor.fetchmany(GET_ITERATOR_CHUNK_SIZE)),
-            sentinel):
+    for rows in iter((lambda: cursor.fetchmany(chunk_size)), sentinel):
         yield [r[:-trim] for r in rows]
@@ -44,3 +44,38 @@ class Date(object):
         else:
             col = self.col
         return connection.ops.date_trunc_sql(self.lookup_type, col)
+
+class Case(object):
+    """
+    The new value of a field in an UPDATE of several rows, chosen by the
+    primary key of each row.
+    """
+    def __init__(self, field, pk_field, values):
+        self.field = field
+        self.pk_field = pk_field
+        # A list of (pk_val, value) pairs.
+        self.values = values
+
+    def prepare_database_save(self, unused):
+        return self
+
+    def as_sql(self, qn, connection):
+        field = self.field
+        whens, params = [], []
+        for pk_val, value in self.values:
+            params.append(self.pk_field.get_db_prep_value(pk_val,
+                    connection=connection))
+            value = field.get_db_prep_save(value, connection=connection)
+            if value is None:
+                whens.append('WHEN %s THEN NULL')
+                continue
+            if hasattr(field, 'get_placeholder'):
+                placeholder = field.get_placeholder(value, connection)
+            else:
+                placeholder = '%s'
+            whens.append('WHEN %%s THEN %s' % placeholder)
+            params.append(value)
+        sql = 'CASE %s %s END' % (qn(self.pk_field.column), ' '.join(whens))
+        if connection.features.requires_casted_case_in_updates:
+            sql = 'CAST(%s AS %s)' % (sql, field.db_type(connection=connection))
+        return sql, params
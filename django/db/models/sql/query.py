@@ -205,6 +205,39 @@ class Query(object):
     def prepare(self):
         return self
 
+    def get_sql_cache_key(self, connection):
+        """
+        Returns a (key, params) pair used to look up the SQL for this query in
+        the SQL cache of the connection (see SQLCompiler.as_sql()). The key
+        describes the structure of the query, so that identically shaped
+        queries share it, and 'params' are the values of the query's WHERE
+        parameters -- the only parameters of a query that can be cached.
+
+        Returns (None, None) for queries that aren't cached: anything using
+        select_related(), extra(), aggregates or subqueries, and subclasses.
+        """
+        if (self.__class__ is not Query or self.select_related or
+                self.related_select_cols or self.extra or self.extra_tables or
+                self.aggregates or self.group_by is not None or
+                self.having.children):
+            return None, None
+        for col in self.select:
+            if not isinstance(col, tuple):
+                return None, None
+        where_key, params = self.where.get_cache_key(connection)
+        if where_key is None:
+            return None, None
+        key = (self.model, tuple(self.tables),
+               tuple([(self.alias_map[alias], self.alias_refcount[alias])
+                      for alias in self.tables]),
+               tuple(self.select), self.default_cols,
+               frozenset(self.included_inherited_models.items()),
+               frozenset(self.deferred_loading[0]), self.deferred_loading[1],
+               tuple(self.order_by), tuple(self.extra_order_by),
+               self.default_ordering, self.standard_ordering, self.distinct,
+               self.low_mark, self.high_mark, where_key)
+        return key, params
+
     def get_compiler(self, using=None, connection=None):
         if using is None and connection is None:
             raise ValueError("Need either using or connection")
@@ -249,19 +282,24 @@ class Query(object):
         obj.dupe_avoidance = self.dupe_avoidance.copy()
         obj.select = self.select[:]
         obj.tables = self.tables[:]
-        obj.where = deepcopy(self.where, memo=memo)
+        # Only the roots of the where-trees are copied; the rest of the trees
+        # is shared with this query (see Node.clone()).
+        obj.where = self.where.clone()
         obj.where_class = self.where_class
         if self.group_by is None:
             obj.group_by = None
         else:
             obj.group_by = self.group_by[:]
-        obj.having = deepcopy(self.having, memo=memo)
+        obj.having = self.having.clone()
         obj.order_by = self.order_by[:]
         obj.low_mark, obj.high_mark = self.low_mark, self.high_mark
         obj.distinct = self.distinct
         obj.select_related = self.select_related
         obj.related_select_cols = []
-        obj.aggregates = deepcopy(self.aggregates, memo=memo)
+        if self.aggregates:
+            obj.aggregates = deepcopy(self.aggregates, memo=memo)
+        else:
+            obj.aggregates = SortedDict()
         if self.aggregate_select_mask is None:
             obj.aggregate_select_mask = None
         else:
@@ -284,7 +322,9 @@ class Query(object):
             obj._extra_select_cache = self._extra_select_cache.copy()
         obj.extra_tables = self.extra_tables
         obj.extra_order_by = self.extra_order_by
-        obj.deferred_loading = deepcopy(self.deferred_loading, memo=memo)
+        # The set of deferred field names is always replaced, never changed in
+        # place, so it can be shared.
+        obj.deferred_loading = self.deferred_loading
         if self.filter_is_sticky and self.used_aliases:
             obj.used_aliases = self.used_aliases.copy()
         else:
@@ -461,7 +501,7 @@ class Query(object):
         # Now relabel a copy of the rhs where-clause and add it to the current
         # one.
         if rhs.where:
-            w = deepcopy(rhs.where)
+            w = rhs.where.clone()
             w.relabel_aliases(change_map)
             if not self.where:
                 # Since 'self' matches everything, add an explicit "include
@@ -33,9 +33,9 @@ class DeleteQuery(Query):
         More than one physical query may be executed if there are a
         lot of values in pk_list.
         """
+        field = self.model._meta.pk
         for offset in range(0, len(pk_list), GET_ITERATOR_CHUNK_SIZE):
             where = self.where_class()
-            field = self.model._meta.pk
             where.add((Constraint(None, field.column, field), 'in',
                     pk_list[offset : offset + GET_ITERATOR_CHUNK_SIZE]), AND)
             self.do_query(self.model._meta.db_table, where, using=using)
@@ -72,7 +72,7 @@ class UpdateQuery(Query):
         Set up and execute an update query that clears related entries for the
         keys in pk_list.
 
-        This is used by the QuerySet.delete_objects() method.
+        This is used by django.db.models.deletion.Collector.delete().
         """
         for offset in range(0, len(pk_list), GET_ITERATOR_CHUNK_SIZE):
             self.where = self.where_class()
@@ -143,12 +143,14 @@ class InsertQuery(Query):
         super(InsertQuery, self).__init__(*args, **kwargs)
         self.columns = []
         self.values = []
+        self.extra_rows = []
         self.params = ()
 
     def clone(self, klass=None, **kwargs):
         extras = {
             'columns': self.columns[:],
             'values': self.values[:],
+            'extra_rows': self.extra_rows[:],
             'params': self.params
         }
         extras.update(kwargs)
@@ -175,6 +177,18 @@ class InsertQuery(Query):
             self.params += tuple(values)
             self.values.extend(placeholders)
 
+    def insert_batch(self, fields, value_rows):
+        """
+        Set up the insert query to create several rows with a single
+        statement. 'fields' is the list of model fields being inserted and
+        'value_rows' is a list of rows, each holding the (already prepared)
+        values for those fields, in the same order.
+        """
+        self.insert_values(zip(fields, value_rows[0]))
+        for row in value_rows[1:]:
+            self.extra_rows.append(zip(fields, row))
+            self.params += tuple(row)
+
 class DateQuery(Query):
     """
     A DateQuery is a normal query, except that it specifically selects a single
@@ -4,6 +4,7 @@ Code to manage the creation and SQL rendering of 'where' constraints.
 import datetime
 
 from django.utils import tree
+from django.utils.copycompat import copy, deepcopy
 from django.db.models.fields import Field
 from django.db.models.query_utils import QueryWrapper
 from datastructures import EmptyResultSet, FullResultSet
@@ -195,6 +196,43 @@ class WhereNode(tree.Node):
 
         raise TypeError('Invalid lookup_type: %r' % lookup_type)
 
+    def get_cache_key(self, connection):
+        """
+        Returns a (key, params) pair: 'key' describes the SQL that as_sql()
+        produces for this node -- everything about it except the parameter
+        values -- and 'params' are the parameters it uses. Returns (None,
+        None) if the SQL can't be described that way, for example because it
+        contains a subquery or extra SQL.
+        """
+        keys = []
+        params = []
+        for child in self.children:
+            if isinstance(child, WhereNode):
+                key, child_params = child.get_cache_key(connection)
+                if key is None:
+                    return None, None
+            elif isinstance(child, tuple) and hasattr(child[0], 'process'):
+                lvalue, lookup_type, value_annot, value = child
+                try:
+                    lvalue, child_params = lvalue.process(lookup_type, value,
+                                                          connection)
+                except EmptyShortCircuit:
+                    return None, None
+                if (hasattr(child_params, 'as_sql') or
+                        (lookup_type == 'in' and not value_annot)):
+                    return None, None
+                if lookup_type == 'isnull':
+                    child_params = ()
+                # The number of parameters matters for "in" lookups, and an
+                # empty string may be turned into a NULL test.
+                key = (lvalue, lookup_type, value_annot, len(child_params),
+                       list(child_params) == [''])
+            else:
+                return None, None
+            keys.append(key)
+            params.extend(child_params)
+        return (self.connector, self.negated, tuple(keys)), params
+
     def sql_for_columns(self, data, qn, connection):
         """
         Returns the SQL fragment used for the left-hand side of a column
@@ -212,26 +250,38 @@ class WhereNode(tree.Node):
         """
         Relabels the alias values of any children. 'change_map' is a dictionary
         mapping old (current) alias values to the new values.
+
+        Everything below the root of the tree may be shared with the
+        where-trees of other queries (see Node.clone()), so the children are
+        replaced with relabelled copies rather than changed in place.
         """
         if not node:
             node = self
         for pos, child in enumerate(node.children):
-            if hasattr(child, 'relabel_aliases'):
+            if isinstance(child, tree.Node):
+                child = child.clone()
+                if hasattr(child, 'relabel_aliases'):
+                    child.relabel_aliases(change_map)
+                else:
+                    self.relabel_aliases(change_map, child)
+            elif hasattr(child, 'relabel_aliases'):
+                child = deepcopy(child)
                 child.relabel_aliases(change_map)
-            elif isinstance(child, tree.Node):
-                self.relabel_aliases(change_map, child)
             elif isinstance(child, (list, tuple)):
-                if isinstance(child[0], (list, tuple)):
-                    elt = list(child[0])
-                    if elt[0] in change_map:
-                        elt[0] = change_map[elt[0]]
-                        node.children[pos] = (tuple(elt),) + child[1:]
+                lvalue, value = child[0], child[3]
+                if isinstance(lvalue, (list, tuple)):
+                    if lvalue[0] in change_map:
+                        lvalue = (change_map[lvalue[0]],) + tuple(lvalue[1:])
                 else:
-                    child[0].relabel_aliases(change_map)
+                    lvalue = copy(lvalue)
+                    lvalue.relabel_aliases(change_map)
 
                 # Check if the query value also requires relabelling
-                if hasattr(child[3], 'relabel_aliases'):
-                    child[3].relabel_aliases(change_map)
+                if hasattr(value, 'relabel_aliases'):
+                    value = deepcopy(value)
+                    value.relabel_aliases(change_map)
+                child = (lvalue,) + tuple(child[1:3]) + (value,)
+            node.children[pos] = child
 
 class EverythingNode(object):
     """
@@ -201,6 +201,14 @@ class Signal(object):
                 responses.append((receiver, response))
         return responses
 
+    def has_listeners(self, sender=None):
+        """
+        Returns True if send(sender) would call any receivers.
+        """
+        if not self.receivers:
+            return False
+        return bool(self._live_receivers(_make_id(sender)))
+
     def _live_receivers(self, senderkey):
         """
         Filter sequence of receivers to get resolved, live receivers.
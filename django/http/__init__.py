@@ -390,6 +390,12 @@ class HttpResponse(object):
                         expires='Thu, 01-Jan-1970 00:00:00 GMT')
 
     def _get_content(self):
+        if not self._is_string:
+            # An iterator can only be consumed once; keep its chunks so that
+            # the response can still be iterated over afterwards.
+            chunks = list(self._container)
+            self.close()
+            self._container = chunks
         if self.has_header('Content-Encoding'):
             return ''.join(self._container)
         return smart_str(''.join(self._container), self._charset)
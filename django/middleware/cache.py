@@ -46,10 +46,16 @@ More details about how the caching works:
 * This middleware also sets ETag, Last-Modified, Expires and Cache-Control
   headers on the response object.
 
+* If CACHE_MIDDLEWARE_STALE_SECONDS is set, pages are kept that many seconds
+  longer than their timeout. When a page goes out of date, the first request
+  for it regenerates it while the other requests are served the stale copy,
+  rather than all regenerating the page at the same time.
+
 """
 
 from django.conf import settings
 from django.core.cache import cache
+from django.core.cache.backends.base import is_refreshable
 from django.utils.cache import get_cache_key, learn_cache_key, patch_response_headers, get_max_age
 
 class UpdateCacheMiddleware(object):
@@ -65,6 +71,7 @@ class UpdateCacheMiddleware(object):
         self.cache_timeout = settings.CACHE_MIDDLEWARE_SECONDS
         self.key_prefix = settings.CACHE_MIDDLEWARE_KEY_PREFIX
         self.cache_anonymous_only = getattr(settings, 'CACHE_MIDDLEWARE_ANONYMOUS_ONLY', False)
+        self.stale_seconds = settings.CACHE_MIDDLEWARE_STALE_SECONDS
 
     def process_response(self, request, response):
         """Sets the cache, if needed."""
@@ -90,8 +97,14 @@ class UpdateCacheMiddleware(object):
             return response
         patch_response_headers(response, timeout)
         if timeout:
-            cache_key = learn_cache_key(request, response, timeout, self.key_prefix)
-            cache.set(cache_key, response, timeout)
+            if self.stale_seconds:
+                cache_key = learn_cache_key(request, response,
+                    timeout + self.stale_seconds, self.key_prefix)
+                cache._set_refreshable(cache_key, response, timeout, self.stale_seconds,
+                                       getattr(request, '_cache_refresh_lock', False))
+            else:
+                cache_key = learn_cache_key(request, response, timeout, self.key_prefix)
+                cache.set(cache_key, response, timeout)
         return response
 
 class FetchFromCacheMiddleware(object):
@@ -106,6 +119,7 @@ class FetchFromCacheMiddleware(object):
         self.cache_timeout = settings.CACHE_MIDDLEWARE_SECONDS
         self.key_prefix = settings.CACHE_MIDDLEWARE_KEY_PREFIX
         self.cache_anonymous_only = getattr(settings, 'CACHE_MIDDLEWARE_ANONYMOUS_ONLY', False)
+        self.stale_seconds = settings.CACHE_MIDDLEWARE_STALE_SECONDS
 
     def process_request(self, request):
         """
@@ -128,7 +142,19 @@ class FetchFromCacheMiddleware(object):
             request._cache_update_cache = True
             return None # No cache information available, need to rebuild.
 
-        response = cache.get(cache_key, None)
+        if self.stale_seconds:
+            # Only one request gets to regenerate an out of date page; the
+            # others are served the stale copy in the meantime.
+            response, refresh, locked = cache._get_refreshable(cache_key, self.stale_seconds)
+            if refresh:
+                request._cache_update_cache = True
+                request._cache_refresh_lock = locked
+                return None
+        else:
+            response = cache.get(cache_key, None)
+            if is_refreshable(response):
+                # Stored while CACHE_MIDDLEWARE_STALE_SECONDS was set.
+                response = response[2]
         if response is None:
             request._cache_update_cache = True
             return None # No cache information available, need to rebuild.
@@ -143,7 +169,8 @@ class CacheMiddleware(UpdateCacheMiddleware, FetchFromCacheMiddleware):
     Also used as the hook point for the cache decorator, which is generated
     using the decorator-from-middleware utility.
     """
-    def __init__(self, cache_timeout=None, key_prefix=None, cache_anonymous_only=None):
+    def __init__(self, cache_timeout=None, key_prefix=None, cache_anonymous_only=None,
+                 stale_seconds=None):
         self.cache_timeout = cache_timeout
         if cache_timeout is None:
             self.cache_timeout = settings.CACHE_MIDDLEWARE_SECONDS
@@ -154,3 +181,6 @@ class CacheMiddleware(UpdateCacheMiddleware, FetchFromCacheMiddleware):
             self.cache_anonymous_only = getattr(settings, 'CACHE_MIDDLEWARE_ANONYMOUS_ONLY', False)
         else:
             self.cache_anonymous_only = cache_anonymous_only
+        self.stale_seconds = stale_seconds
+        if stale_seconds is None:
+            self.stale_seconds = settings.CACHE_MIDDLEWARE_STALE_SECONDS
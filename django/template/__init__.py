@@ -59,6 +59,7 @@ from django.utils.itercompat import is_iterable
 from django.utils.functional import curry, Promise
 from django.utils.text import smart_split, unescape_string_literal, get_text_list
 from django.utils.encoding import smart_unicode, force_unicode, smart_str
+from django.utils import translation
 from django.utils.translation import ugettext as _
 from django.utils.safestring import SafeData, EscapeData, mark_safe, mark_for_escaping
 from django.utils.formats import localize
@@ -91,6 +92,9 @@ ALLOWED_VARIABLE_CHARS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ01
 # (e.g. strings)
 UNKNOWN_SOURCE = '<unknown source>'
 
+# minimum length of the chunks yielded by Template.generate()
+GENERATE_CHUNK_SIZE = 4096
+
 # match a variable or block tag and capture the entire tag, including start/end delimiters
 tag_re = re.compile('(%s.*?%s|%s.*?%s|%s.*?%s)' % (re.escape(BLOCK_TAG_START), re.escape(BLOCK_TAG_END),
                                           re.escape(VARIABLE_TAG_START), re.escape(VARIABLE_TAG_END),
@@ -164,6 +168,9 @@ class Template(object):
                 yield subnode
 
     def _render(self, context):
+        if settings.TEMPLATE_COMPILE:
+            from django.template.compiler import compile_nodelist
+            return compile_nodelist(self.nodelist)(context)
         return self.nodelist.render(context)
 
     def render(self, context):
@@ -174,6 +181,54 @@ class Template(object):
         finally:
             context.render_context.pop()
 
+    def _generate(self, context):
+        return self.nodelist.generate(context)
+
+    def generate(self, context):
+        """
+        Display stage, like render(), but returns an iterator yielding the
+        output in chunks as it's rendered, rather than a single string.
+
+        The output is rendered in the language active when generate() is
+        called, even if the iterator is consumed after it was deactivated,
+        e.g. by LocaleMiddleware once the response has been returned.
+        """
+        return self._generate_chunks(context, translation.get_language())
+
+    def _generate_chunks(self, context, language):
+        context.render_context.push()
+        try:
+            chunks = _join_chunks(self._generate(context), GENERATE_CHUNK_SIZE)
+            while True:
+                previous_language = translation.get_language()
+                if previous_language != language:
+                    translation.activate(language)
+                try:
+                    try:
+                        chunk = chunks.next()
+                    except StopIteration:
+                        break
+                finally:
+                    if previous_language != language:
+                        translation.activate(previous_language)
+                yield chunk
+        except:
+            context.render_context.pop()
+            raise
+        context.render_context.pop()
+
+def _join_chunks(chunks, size):
+    "Joins the given chunks of output into chunks of at least 'size' characters."
+    bits, length = [], 0
+    for chunk in chunks:
+        bits.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield mark_safe(u''.join(bits))
+            bits, length = [], 0
+    if bits:
+        yield mark_safe(u''.join(bits))
+
 def compile_string(template_string, origin):
     "Compiles template_string into NodeList ready for rendering"
     if settings.TEMPLATE_DEBUG:
@@ -688,6 +743,7 @@ class Variable(object):
                 if var.find(VARIABLE_ATTRIBUTE_SEPARATOR + '_') > -1 or var[0] == '_':
                     raise TemplateSyntaxError("Variables and attributes may not begin with underscores: '%s'" % var)
                 self.lookups = tuple(var.split(VARIABLE_ATTRIBUTE_SEPARATOR))
+                self._lookup_strategies = self._make_lookup_strategies()
 
     def resolve(self, context):
         """Resolve this variable against a given context."""
@@ -707,6 +763,24 @@ class Variable(object):
     def __str__(self):
         return self.var
 
+    def __getstate__(self):
+        # The lookup strategies are keyed by types, which may not be
+        # picklable; they're found again after unpickling.
+        state = self.__dict__.copy()
+        if self.lookups is not None:
+            state['_lookup_strategies'] = self._make_lookup_strategies()
+        return state
+
+    def _make_lookup_strategies(self):
+        """
+        Returns the (bit, strategies) pairs used by _resolve_lookup(), where
+        strategies maps the types of the objects the bit was looked up in to
+        the function that looks it up in objects of that type, or to None if
+        it has to be looked up as a dictionary key first. The first bit is
+        looked up in the context, always as a dictionary key first.
+        """
+        return tuple([(self.lookups[0], None)] + [(bit, {}) for bit in self.lookups[1:]])
+
     def _resolve_lookup(self, context):
         """
         Performs resolution of a real variable (i.e. not a literal) against the
@@ -717,41 +791,18 @@ class Variable(object):
         instead.
         """
         current = context
-        for bit in self.lookups:
+        for bit, strategies in self._lookup_strategies:
+            if strategies:
+                resolve = strategies.get(type(current))
+                if resolve is not None:
+                    current = resolve(current, bit)
+                    continue
             try: # dictionary lookup
                 current = current[bit]
             except (TypeError, AttributeError, KeyError):
-                try: # attribute lookup
-                    current = getattr(current, bit)
-                    if callable(current):
-                        if getattr(current, 'alters_data', False):
-                            current = settings.TEMPLATE_STRING_IF_INVALID
-                        else:
-                            try: # method call (assuming no args required)
-                                current = current()
-                            except TypeError: # arguments *were* required
-                                # GOTCHA: This will also catch any TypeError
-                                # raised in the function itself.
-                                current = settings.TEMPLATE_STRING_IF_INVALID # invalid method call
-                            except Exception, e:
-                                if getattr(e, 'silent_variable_failure', False):
-                                    current = settings.TEMPLATE_STRING_IF_INVALID
-                                else:
-                                    raise
-                except (TypeError, AttributeError):
-                    try: # list-index lookup
-                        current = current[int(bit)]
-                    except (IndexError, # list index out of range
-                            ValueError, # invalid literal for int()
-                            KeyError,   # current is a dict without `int(bit)` key
-                            TypeError,  # unsubscriptable object
-                            ):
-                        raise VariableDoesNotExist("Failed lookup for key [%s] in %r", (bit, current)) # missing attribute
-                except Exception, e:
-                    if getattr(e, 'silent_variable_failure', False):
-                        current = settings.TEMPLATE_STRING_IF_INVALID
-                    else:
-                        raise
+                if strategies is not None and type(current) not in strategies:
+                    strategies[type(current)] = _get_lookup_strategy(type(current), bit)
+                current = _resolve_attribute_or_index(current, bit)
             except Exception, e:
                 if getattr(e, 'silent_variable_failure', False):
                     current = settings.TEMPLATE_STRING_IF_INVALID
@@ -760,6 +811,64 @@ class Variable(object):
 
         return current
 
+def _get_lookup_strategy(cls, bit):
+    """
+    Returns the function looking up 'bit' in objects of type 'cls' with the
+    same result as Variable._resolve_lookup(), but skipping the lookups bound
+    to fail, or None if there's no such shortcut.
+    """
+    if not hasattr(cls, '__getitem__'):
+        # Looking up a dictionary key always raises TypeError.
+        return _resolve_attribute_or_index
+    if cls in (list, tuple) and not hasattr(cls, bit):
+        # Lists and tuples don't have instance attributes either.
+        return _resolve_index
+    return None
+
+def _resolve_index(current, bit):
+    try: # list-index lookup
+        return current[int(bit)]
+    except (IndexError, ValueError, KeyError, TypeError):
+        raise VariableDoesNotExist("Failed lookup for key [%s] in %r", (bit, current)) # missing attribute
+
+def _resolve_attribute_or_index(current, bit):
+    """
+    Looks up 'bit' in 'current' as an attribute (calling it if it's a method),
+    or as a list index, once looking it up as a dictionary key has failed.
+    """
+    try: # attribute lookup
+        current = getattr(current, bit)
+        if callable(current):
+            if getattr(current, 'alters_data', False):
+                current = settings.TEMPLATE_STRING_IF_INVALID
+            else:
+                try: # method call (assuming no args required)
+                    current = current()
+                except TypeError: # arguments *were* required
+                    # GOTCHA: This will also catch any TypeError
+                    # raised in the function itself.
+                    current = settings.TEMPLATE_STRING_IF_INVALID # invalid method call
+                except Exception, e:
+                    if getattr(e, 'silent_variable_failure', False):
+                        current = settings.TEMPLATE_STRING_IF_INVALID
+                    else:
+                        raise
+    except (TypeError, AttributeError):
+        try: # list-index lookup
+            current = current[int(bit)]
+        except (IndexError, # list index out of range
+                ValueError, # invalid literal for int()
+                KeyError,   # current is a dict without `int(bit)` key
+                TypeError,  # unsubscriptable object
+                ):
+            raise VariableDoesNotExist("Failed lookup for key [%s] in %r", (bit, current)) # missing attribute
+    except Exception, e:
+        if getattr(e, 'silent_variable_failure', False):
+            current = settings.TEMPLATE_STRING_IF_INVALID
+        else:
+            raise
+    return current
+
 class Node(object):
     # Set this to True for nodes that must be first in the template (although
     # they can be preceded by text nodes.
@@ -770,6 +879,14 @@ class Node(object):
         "Return the node rendered as a string"
         pass
 
+    def generate(self, context):
+        """
+        Yield the node rendered as a sequence of strings. Nodes whose output
+        may be long override this to yield it as it's rendered; by default, the
+        whole output of render() is yielded at once.
+        """
+        yield self.render(context)
+
     def __iter__(self):
         yield self
 
@@ -798,6 +915,14 @@ class NodeList(list):
                 bits.append(node)
         return mark_safe(''.join([force_unicode(b) for b in bits]))
 
+    def generate(self, context):
+        for node in self:
+            if isinstance(node, Node):
+                for bit in self.generate_node(node, context):
+                    yield force_unicode(bit)
+            else:
+                yield force_unicode(node)
+
     def get_nodes_by_type(self, nodetype):
         "Return a list of all nodes of the given type"
         nodes = []
@@ -805,9 +930,18 @@ class NodeList(list):
             nodes.extend(node.get_nodes_by_type(nodetype))
         return nodes
 
+    def __getstate__(self):
+        # The function compiled by django.template.compiler can't be pickled.
+        state = self.__dict__.copy()
+        state.pop('_compiled', None)
+        return state
+
     def render_node(self, node, context):
         return node.render(context)
 
+    def generate_node(self, node, context):
+        return node.generate(context)
+
 class TextNode(Node):
     def __init__(self, s):
         self.s = s
@@ -862,6 +996,17 @@ def generic_tag_compiler(params, defaults, name, node_class, parser, token):
         raise TemplateSyntaxError(message)
     return node_class(bits)
 
+# The node classes created by Library.simple_tag() and Library.inclusion_tag(),
+# by tag function. Pickle can't find these classes, so their nodes are
+# pickled along with the tag function instead, and unpickled with
+# create_tag_node().
+tag_node_classes = {}
+
+def create_tag_node(func):
+    "Returns a new, uninitialized node of the tag registered for func."
+    node_class = tag_node_classes[func]
+    return node_class.__new__(node_class)
+
 class Library(object):
     def __init__(self):
         self.filters = {}
@@ -926,6 +1071,10 @@ class Library(object):
                 resolved_vars = [var.resolve(context) for var in self.vars_to_resolve]
                 return func(*resolved_vars)
 
+            def __reduce__(self):
+                return (create_tag_node, (func,), self.__dict__)
+
+        tag_node_classes[func] = SimpleNode
         compile_func = curry(generic_tag_compiler, params, defaults, getattr(func, "_decorated_function", func).__name__, SimpleNode)
         compile_func.__doc__ = func.__doc__
         self.tag(getattr(func, "_decorated_function", func).__name__, compile_func)
@@ -969,6 +1118,13 @@ class Library(object):
                         new_context['csrf_token'] = csrf_token
                     return self.nodelist.render(new_context)
 
+                def __reduce__(self):
+                    # The nodelist of the included template is loaded again.
+                    state = self.__dict__.copy()
+                    state.pop('nodelist', None)
+                    return (create_tag_node, (func,), state)
+
+            tag_node_classes[func] = InclusionNode
             compile_func = curry(generic_tag_compiler, params, defaults, getattr(func, "_decorated_function", func).__name__, InclusionNode)
             compile_func.__doc__ = func.__doc__
             self.tag(getattr(func, "_decorated_function", func).__name__, compile_func)
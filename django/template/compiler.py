@@ -0,0 +1,391 @@
+"""
+Compiles templates to Python functions.
+
+NodeList.render() renders a template by walking its tree of nodes: each node
+renders its own children, and each variable is resolved by looping over its
+lookups. compile_nodelist() instead writes the source code of a Python
+function rendering a whole NodeList at once:
+
+    * text is appended to the output as a constant;
+    * each variable gets its own lookup and filter code, with the names it
+      looks up written in;
+    * the for, if, with and block tags become Python loops and conditions.
+
+Other nodes are rendered by calling their render() method. The compiled
+function returns the same output as NodeList.render(); Template uses it when
+the TEMPLATE_COMPILE setting is True.
+
+Only plain NodeLists can be compiled: the ones built when TEMPLATE_DEBUG is
+True annotate rendering errors with the source of the failing node, so they
+are rendered as usual.
+"""
+
+from django import template
+from django.conf import settings
+from django.template import (Node, NodeList, TextNode, Variable, VariableNode,
+    VariableDoesNotExist, _render_value_in_context, _resolve_attribute_or_index)
+from django.template.defaulttags import ForNode, IfNode, TemplateLiteral, WithNode
+from django.template.loader_tags import BlockNode, BLOCK_CONTEXT_KEY
+from django.utils.encoding import force_unicode
+from django.utils.safestring import SafeData, EscapeData, mark_safe, mark_for_escaping
+from django.utils.translation import ugettext
+
+def compile_nodelist(nodelist):
+    """
+    Returns a function taking a context and returning the same string as
+    nodelist.render(context). The function is compiled the first time and
+    kept on the nodelist.
+    """
+    try:
+        return nodelist._compiled
+    except AttributeError:
+        pass
+    if type(nodelist) is NodeList:
+        compiled = Compiler().compile(nodelist)
+    else:
+        compiled = nodelist.render
+    try:
+        nodelist._compiled = compiled
+    except AttributeError:
+        pass
+    return compiled
+
+def resolve_invalid(var):
+    """
+    Returns the value of a variable that doesn't exist, as
+    FilterExpression.resolve() does, and whether filters apply to it.
+    """
+    if settings.TEMPLATE_STRING_IF_INVALID:
+        if template.invalid_var_format_string is None:
+            template.invalid_var_format_string = '%s' in settings.TEMPLATE_STRING_IF_INVALID
+        if template.invalid_var_format_string:
+            return settings.TEMPLATE_STRING_IF_INVALID % var, False
+        return settings.TEMPLATE_STRING_IF_INVALID, False
+    return settings.TEMPLATE_STRING_IF_INVALID, True
+
+# The names available to compiled functions.
+NAMESPACE = {
+    'BLOCK_CONTEXT_KEY': BLOCK_CONTEXT_KEY,
+    'BlockNode': BlockNode,
+    'EscapeData': EscapeData,
+    'SafeData': SafeData,
+    'VariableDoesNotExist': VariableDoesNotExist,
+    'compile_nodelist': compile_nodelist,
+    'force_unicode': force_unicode,
+    'mark_for_escaping': mark_for_escaping,
+    'mark_safe': mark_safe,
+    'render_value_in_context': _render_value_in_context,
+    'resolve_attribute_or_index': _resolve_attribute_or_index,
+    'resolve_invalid': resolve_invalid,
+    'settings': settings,
+    'ugettext': ugettext,
+}
+
+class Compiler(object):
+    """
+    Writes and compiles the source code of the function rendering a
+    NodeList. The output is collected with append().
+    """
+    def __init__(self):
+        self.lines = []
+        self.level = 0
+        self.namespace = NAMESPACE.copy()
+        self.counter = 0
+        self.handlers = {
+            TextNode: self.text_node,
+            VariableNode: self.variable_node,
+            ForNode: self.for_node,
+            IfNode: self.if_node,
+            WithNode: self.with_node,
+            BlockNode: self.block_node,
+        }
+
+    def compile(self, nodelist):
+        self.write('def render(context):')
+        self.indent()
+        self.write('bits = []')
+        self.write('append = bits.append')
+        self.nodelist(nodelist)
+        self.write("return mark_safe(u''.join(bits))")
+        source = '\n'.join(self.lines) + '\n'
+        exec compile(source, '<compiled template>', 'exec') in self.namespace
+        return self.namespace['render']
+
+    def write(self, line):
+        self.lines.append('    ' * self.level + line)
+
+    def indent(self):
+        self.level += 1
+
+    def dedent(self):
+        self.level -= 1
+
+    def name(self, prefix):
+        "Returns a new local variable name."
+        self.counter += 1
+        return '%s%d' % (prefix, self.counter)
+
+    def constant(self, value):
+        "Returns the name of a global holding 'value'."
+        name = self.name('_k')
+        self.namespace[name] = value
+        return name
+
+    def nodelist(self, nodelist):
+        if not nodelist:
+            self.write('pass')
+        for node in nodelist:
+            if isinstance(node, Node):
+                self.node(node)
+            else:
+                self.write('append(%s)' % self.constant(force_unicode(node)))
+
+    def node(self, node):
+        # Subclasses of the built-in nodes may render differently, so only
+        # nodes of these exact types are inlined.
+        handler = self.handlers.get(type(node))
+        if handler is None or not self.can_inline(node):
+            self.write('append(force_unicode(%s.render(context)))' % self.constant(node))
+        else:
+            handler(node)
+
+    def can_inline(self, node):
+        for attr in node.child_nodelists:
+            if hasattr(node, attr) and type(getattr(node, attr)) is not NodeList:
+                return False
+        return True
+
+    def variable(self, var, target):
+        """
+        Writes code assigning the value of a Variable to 'target', raising
+        VariableDoesNotExist if it can't be resolved.
+        """
+        if var.lookups is None:
+            self.write('%s = %s' % (target, self.constant(var.literal)))
+        else:
+            current = 'context'
+            for bit in var.lookups:
+                # The same lookups as Variable._resolve_lookup().
+                self.write('try:')
+                self.indent()
+                self.write('%s = %s[%r]' % (target, current, bit))
+                self.dedent()
+                self.write('except (TypeError, AttributeError, KeyError):')
+                self.indent()
+                self.write('%s = resolve_attribute_or_index(%s, %r)' % (target, current, bit))
+                self.dedent()
+                self.write('except Exception, e:')
+                self.indent()
+                self.write("if not getattr(e, 'silent_variable_failure', False):")
+                self.indent()
+                self.write('raise')
+                self.dedent()
+                self.write('%s = settings.TEMPLATE_STRING_IF_INVALID' % target)
+                self.dedent()
+                current = target
+        if var.translate:
+            self.write('%s = ugettext(%s)' % (target, target))
+
+    def filter_expression(self, expression, target, ignore_failures=False):
+        """
+        Writes code assigning the value of a FilterExpression to 'target', as
+        returned by its resolve() method.
+        """
+        var = expression.var
+        filters = expression.filters
+        if not isinstance(var, Variable):
+            self.write('%s = %s' % (target, self.constant(var)))
+        elif var.lookups is None:
+            self.variable(var, target)
+        else:
+            flag = None
+            self.write('try:')
+            self.indent()
+            self.variable(var, target)
+            self.dedent()
+            self.write('except VariableDoesNotExist:')
+            self.indent()
+            if ignore_failures:
+                self.write('%s = None' % target)
+            elif filters:
+                flag = self.name('f')
+                self.write('%s, %s = resolve_invalid(%s)' % (target, flag, self.constant(var)))
+            else:
+                self.write('%s = resolve_invalid(%s)[0]' % (target, self.constant(var)))
+            self.dedent()
+            if flag:
+                # The filters aren't applied to TEMPLATE_STRING_IF_INVALID.
+                self.write('else:')
+                self.indent()
+                self.write('%s = True' % flag)
+                self.dedent()
+                self.write('if %s:' % flag)
+                self.indent()
+        for func, args in filters:
+            arg_names = []
+            for lookup, arg in args:
+                if lookup:
+                    name = self.name('a')
+                    self.variable(arg, name)
+                    arg_names.append(name)
+                else:
+                    arg_names.append(self.constant(mark_safe(arg)))
+            if getattr(func, 'needs_autoescape', False):
+                arg_names.append('autoescape=context.autoescape')
+            result = self.name('r')
+            self.write('%s = %s(%s)' % (result, self.constant(func), ', '.join([target] + arg_names)))
+            if getattr(func, 'is_safe', False):
+                self.write('if isinstance(%s, SafeData):' % target)
+                self.indent()
+                self.write('%s = mark_safe(%s)' % (target, result))
+                self.dedent()
+                self.write('elif isinstance(%s, EscapeData):' % target)
+            else:
+                self.write('if isinstance(%s, EscapeData):' % target)
+            self.indent()
+            self.write('%s = mark_for_escaping(%s)' % (target, result))
+            self.dedent()
+            self.write('else:')
+            self.indent()
+            self.write('%s = %s' % (target, result))
+            self.dedent()
+        if isinstance(var, Variable) and var.lookups is not None and flag:
+            self.dedent()
+
+    def text_node(self, node):
+        self.write('append(%s)' % self.constant(force_unicode(node.s)))
+
+    def variable_node(self, node):
+        value = self.name('v')
+        self.write('try:')
+        self.indent()
+        self.filter_expression(node.filter_expression, value)
+        self.dedent()
+        self.write('except UnicodeDecodeError:')
+        self.indent()
+        self.write('pass')
+        self.dedent()
+        self.write('else:')
+        self.indent()
+        self.write('append(render_value_in_context(%s, context))' % value)
+        self.dedent()
+
+    def for_node(self, node):
+        parentloop, values, length = self.name('p'), self.name('s'), self.name('n')
+        loop, i, item = self.name('l'), self.name('i'), self.name('x')
+        self.write("if 'forloop' in context:")
+        self.indent()
+        self.write("%s = context['forloop']" % parentloop)
+        self.dedent()
+        self.write('else:')
+        self.indent()
+        self.write('%s = {}' % parentloop)
+        self.dedent()
+        self.write('context.push()')
+        self.write('try:')
+        self.indent()
+        self.filter_expression(node.sequence, values, ignore_failures=True)
+        self.dedent()
+        self.write('except VariableDoesNotExist:')
+        self.indent()
+        self.write('%s = []' % values)
+        self.dedent()
+        self.write('if %s is None:' % values)
+        self.indent()
+        self.write('%s = []' % values)
+        self.dedent()
+        self.write("if not hasattr(%s, '__len__'):" % values)
+        self.indent()
+        self.write('%s = list(%s)' % (values, values))
+        self.dedent()
+        self.write('%s = len(%s)' % (length, values))
+        self.write('if %s < 1:' % length)
+        self.indent()
+        self.write('context.pop()')
+        self.nodelist(node.nodelist_empty)
+        self.dedent()
+        self.write('else:')
+        self.indent()
+        if node.is_reversed:
+            self.write('%s = reversed(%s)' % (values, values))
+        self.write("%s = context['forloop'] = {'parentloop': %s}" % (loop, parentloop))
+        self.write('for %s, %s in enumerate(%s):' % (i, item, values))
+        self.indent()
+        self.write("%s['counter0'] = %s" % (loop, i))
+        self.write("%s['counter'] = %s + 1" % (loop, i))
+        self.write("%s['revcounter'] = %s - %s" % (loop, length, i))
+        self.write("%s['revcounter0'] = %s - %s - 1" % (loop, length, i))
+        self.write("%s['first'] = (%s == 0)" % (loop, i))
+        self.write("%s['last'] = (%s == %s - 1)" % (loop, i, length))
+        unpack = len(node.loopvars) > 1
+        if unpack:
+            self.write('context.update(dict(zip(%s, %s)))' % (self.constant(node.loopvars), item))
+        else:
+            self.write('context[%r] = %s' % (node.loopvars[0], item))
+        self.nodelist(node.nodelist_loop)
+        if unpack:
+            self.write('context.pop()')
+        self.dedent()
+        self.write('context.pop()')
+        self.dedent()
+
+    def if_node(self, node):
+        condition = self.name('c')
+        self.write('try:')
+        self.indent()
+        if type(node.var) is TemplateLiteral:
+            self.filter_expression(node.var.value, condition, ignore_failures=True)
+        else:
+            self.write('%s = %s.eval(context)' % (condition, self.constant(node.var)))
+        self.dedent()
+        self.write('except VariableDoesNotExist:')
+        self.indent()
+        self.write('%s = None' % condition)
+        self.dedent()
+        self.write('if %s:' % condition)
+        self.indent()
+        self.nodelist(node.nodelist_true)
+        self.dedent()
+        self.write('else:')
+        self.indent()
+        self.nodelist(node.nodelist_false)
+        self.dedent()
+
+    def with_node(self, node):
+        value = self.name('w')
+        self.filter_expression(node.var, value)
+        self.write('context.push()')
+        self.write('context[%r] = %s' % (node.name, value))
+        self.nodelist(node.nodelist)
+        self.write('context.pop()')
+
+    def block_node(self, node):
+        # The same as BlockNode.render(), with the block rendered by compiled
+        # code: inline if it isn't overridden, by the compiled function of
+        # the block that overrides it otherwise.
+        block_context, push, block = self.name('bc'), self.name('bp'), self.name('b')
+        name = self.constant(node.name)
+        self.write('%s = context.render_context.get(BLOCK_CONTEXT_KEY)' % block_context)
+        self.write('context.push()')
+        self.write('if %s is None:' % block_context)
+        self.indent()
+        self.write("context['block'] = %s" % self.constant(node))
+        self.nodelist(node.nodelist)
+        self.dedent()
+        self.write('else:')
+        self.indent()
+        self.write('%s = %s = %s.pop(%s)' % (push, block, block_context, name))
+        self.write('if %s is None:' % block)
+        self.indent()
+        self.write('%s = %s' % (block, self.constant(node)))
+        self.dedent()
+        self.write('%s = BlockNode(%s.name, %s.nodelist)' % (block, block, block))
+        self.write('%s.context = context' % block)
+        self.write("context['block'] = %s" % block)
+        self.write('append(compile_nodelist(%s.nodelist)(context))' % block)
+        self.write('if %s is not None:' % push)
+        self.indent()
+        self.write('%s.push(%s, %s)' % (block_context, name, push))
+        self.dedent()
+        self.dedent()
+        self.write('context.pop()')
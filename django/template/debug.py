@@ -1,3 +1,5 @@
+import sys
+
 from django.template import Lexer, Parser, tag_re, NodeList, VariableNode, TemplateSyntaxError
 from django.utils.encoding import force_unicode
 from django.utils.html import escape
@@ -70,18 +72,33 @@ class DebugNodeList(NodeList):
     def render_node(self, node, context):
         try:
             result = node.render(context)
-        except TemplateSyntaxError, e:
+        except Exception:
+            self.reraise(node)
+        return result
+
+    def generate_node(self, node, context):
+        try:
+            for bit in node.generate(context):
+                yield bit
+        except Exception:
+            self.reraise(node)
+
+    def reraise(self, node):
+        """
+        Re-raises the exception being handled, raised while rendering node, as
+        a TemplateSyntaxError giving the source of the node.
+        """
+        exc_info = sys.exc_info()
+        e = exc_info[1]
+        if isinstance(e, TemplateSyntaxError):
             if not hasattr(e, 'source'):
                 e.source = node.source
-            raise
-        except Exception, e:
-            from sys import exc_info
-            wrapped = TemplateSyntaxError(u'Caught %s while rendering: %s' %
-                (e.__class__.__name__, force_unicode(e, errors='replace')))
-            wrapped.source = node.source
-            wrapped.exc_info = exc_info()
-            raise wrapped, None, wrapped.exc_info[2]
-        return result
+            raise exc_info[0], e, exc_info[2]
+        wrapped = TemplateSyntaxError(u'Caught %s while rendering: %s' %
+            (e.__class__.__name__, force_unicode(e, errors='replace')))
+        wrapped.source = node.source
+        wrapped.exc_info = exc_info
+        raise wrapped, None, exc_info[2]
 
 class DebugVariableNode(VariableNode):
     def render(self, context):
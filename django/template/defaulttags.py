@@ -175,6 +175,50 @@ class ForNode(Node):
         context.pop()
         return nodelist.render(context)
 
+    def generate(self, context):
+        # The same as render(), yielding the output of each iteration as soon
+        # as it's rendered.
+        if 'forloop' in context:
+            parentloop = context['forloop']
+        else:
+            parentloop = {}
+        context.push()
+        try:
+            values = self.sequence.resolve(context, True)
+        except VariableDoesNotExist:
+            values = []
+        if values is None:
+            values = []
+        if not hasattr(values, '__len__'):
+            values = list(values)
+        len_values = len(values)
+        if len_values < 1:
+            context.pop()
+            for bit in self.nodelist_empty.generate(context):
+                yield bit
+            return
+        if self.is_reversed:
+            values = reversed(values)
+        unpack = len(self.loopvars) > 1
+        loop_dict = context['forloop'] = {'parentloop': parentloop}
+        for i, item in enumerate(values):
+            loop_dict['counter0'] = i
+            loop_dict['counter'] = i+1
+            loop_dict['revcounter'] = len_values - i
+            loop_dict['revcounter0'] = len_values - i - 1
+            loop_dict['first'] = (i == 0)
+            loop_dict['last'] = (i == len_values - 1)
+            if unpack:
+                context.update(dict(zip(self.loopvars, item)))
+            else:
+                context[self.loopvars[0]] = item
+            for node in self.nodelist_loop:
+                for bit in node.generate(context):
+                    yield bit
+            if unpack:
+                context.pop()
+        context.pop()
+
 class IfChangedNode(Node):
     child_nodelists = ('nodelist_true', 'nodelist_false')
 
@@ -252,6 +296,17 @@ class IfNode(Node):
         else:
             return self.nodelist_false.render(context)
 
+    def generate(self, context):
+        try:
+            var = self.var.eval(context)
+        except VariableDoesNotExist:
+            var = None
+
+        if var:
+            return self.nodelist_true.generate(context)
+        else:
+            return self.nodelist_false.generate(context)
+
 class RegroupNode(Node):
     def __init__(self, target, expression, var_name):
         self.target, self.expression = target, expression
@@ -426,6 +481,14 @@ class WithNode(Node):
         context.pop()
         return output
 
+    def generate(self, context):
+        val = self.var.resolve(context)
+        context.push()
+        context[self.name] = val
+        for bit in self.nodelist.generate(context):
+            yield bit
+        context.pop()
+
 #@register.tag
 def autoescape(parser, token):
     """
@@ -117,7 +117,7 @@ def find_template_loader(loader):
     else:
         raise ImproperlyConfigured('Loader does not define a "load_template" callable template source loader')
 
-def find_template(name, dirs=None):
+def _get_template_source_loaders():
     # Calculate template_source_loaders the first time the function is executed
     # because putting this logic in the module-level namespace may cause
     # circular import errors. See Django ticket #1292.
@@ -129,7 +129,10 @@ def find_template(name, dirs=None):
             if loader is not None:
                 loaders.append(loader)
         template_source_loaders = tuple(loaders)
-    for loader in template_source_loaders:
+    return template_source_loaders
+
+def find_template(name, dirs=None):
+    for loader in _get_template_source_loaders():
         try:
             source, display_name = loader(name, dirs)
             return (source, make_origin(display_name, loader, name, dirs))
@@ -185,6 +188,34 @@ def render_to_string(template_name, dictionary=None, context_instance=None):
         context_instance = Context(dictionary)
     return t.render(context_instance)
 
+def render_to_iterator(template_name, dictionary=None, context_instance=None):
+    """
+    Like render_to_string(), but returns an iterator yielding the output in
+    chunks as the template is rendered, suitable as the content of an
+    HttpResponse.
+    """
+    dictionary = dictionary or {}
+    if isinstance(template_name, (list, tuple)):
+        t = select_template(template_name)
+    else:
+        t = get_template(template_name)
+    if context_instance:
+        context_instance.update(dictionary)
+    else:
+        context_instance = Context(dictionary)
+    return t.generate(context_instance)
+
+def preload_templates():
+    """
+    Loads ahead of time the templates that the template loaders can preload,
+    such as the templates saved in TEMPLATE_CACHE_FILE by the cached loader.
+    Call it when a process starts, so that it doesn't load them while serving
+    its first requests.
+    """
+    for loader in _get_template_source_loaders():
+        if hasattr(loader, 'preload'):
+            loader.preload()
+
 def select_template(template_name_list):
     "Given a list of template names, returns the first that can be loaded."
     for template_name in template_name_list:
@@ -65,6 +65,27 @@ class BlockNode(Node):
         context.pop()
         return result
 
+    def generate(self, context):
+        block_context = context.render_context.get(BLOCK_CONTEXT_KEY)
+        context.push()
+        if block_context is None:
+            context['block'] = self
+            for bit in self.nodelist.generate(context):
+                yield bit
+        else:
+            push = block = block_context.pop(self.name)
+            if block is None:
+                block = self
+            # Create new block so we can store context without thread-safety issues.
+            block = BlockNode(block.name, block.nodelist)
+            block.context = context
+            context['block'] = block
+            for bit in block.nodelist.generate(context):
+                yield bit
+            if push is not None:
+                block_context.push(self.name, push)
+        context.pop()
+
     def super(self):
         render_context = self.context.render_context
         if (BLOCK_CONTEXT_KEY in render_context and
@@ -100,6 +121,18 @@ class ExtendsNode(Node):
         return get_template(parent)
 
     def render(self, context):
+        # Call Template._render explicitly so the parser context stays
+        # the same.
+        return self.prepare_parent(context)._render(context)
+
+    def generate(self, context):
+        return self.prepare_parent(context)._generate(context)
+
+    def prepare_parent(self, context):
+        """
+        Returns the parent template, after adding the blocks overriding its
+        blocks to the block context.
+        """
         compiled_parent = self.get_parent(context)
 
         if BLOCK_CONTEXT_KEY not in context.render_context:
@@ -119,13 +152,11 @@ class ExtendsNode(Node):
                                    compiled_parent.nodelist.get_nodes_by_type(BlockNode)])
                     block_context.add_blocks(blocks)
                 break
-
-        # Call Template._render explicitly so the parser context stays
-        # the same.
-        return compiled_parent._render(context)
+        return compiled_parent
 
 class ConstantIncludeNode(Node):
     def __init__(self, template_path):
+        self.template_path = template_path
         try:
             t = get_template(template_path)
             self.template = t
@@ -140,6 +171,20 @@ class ConstantIncludeNode(Node):
         else:
             return ''
 
+    def generate(self, context):
+        if self.template:
+            return self.template.generate(context)
+        else:
+            return iter([])
+
+    def __getstate__(self):
+        # The included template is loaded again when unpickling, in case it
+        # changed in the meantime.
+        return {'template_path': self.template_path}
+
+    def __setstate__(self, state):
+        self.__init__(state['template_path'])
+
 class IncludeNode(Node):
     def __init__(self, template_name):
         self.template_name = Variable(template_name)
@@ -156,6 +201,20 @@ class IncludeNode(Node):
         except:
             return '' # Fail silently for invalid included templates.
 
+    def generate(self, context):
+        # Errors are silenced as in render(), but the output that was
+        # already yielded can't be taken back.
+        try:
+            template_name = self.template_name.resolve(context)
+            t = get_template(template_name)
+            for bit in t.generate(context):
+                yield bit
+        except TemplateSyntaxError, e:
+            if settings.TEMPLATE_DEBUG:
+                raise
+        except:
+            pass # Fail silently for invalid included templates.
+
 def do_block(parser, token):
     """
     Define a block that can be overridden by child templates.
@@ -3,9 +3,19 @@ Wrapper class that takes a list of template loaders as an argument and attempts
 to load templates from them in order, caching the result.
 """
 
+import os
+import tempfile
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from django import get_version
+from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 from django.template import TemplateDoesNotExist
 from django.template.loader import BaseLoader, get_template_from_string, find_template_loader, make_origin
+from django.utils.encoding import smart_str
 from django.utils.hashcompat import sha_constructor
 from django.utils.importlib import import_module
 
@@ -17,6 +27,13 @@ class Loader(BaseLoader):
         self._loaders = loaders
         self._cached_loaders = []
 
+        # The templates read from TEMPLATE_CACHE_FILE, as a dictionary mapping
+        # template names to the digest of their source and the pickled
+        # Template, loaded when first needed. The digests of the sources of
+        # the templates in template_cache are kept so that they can be saved.
+        self._saved_templates = None
+        self._digests = {}
+
     @property
     def loaders(self):
         # Resolve loaders on demand to avoid circular imports
@@ -41,10 +58,19 @@ class Loader(BaseLoader):
             key = '-'.join([template_name, sha_constructor('|'.join(template_dirs)).hexdigest()])
 
         if key not in self.template_cache:
-            template, origin = self.find_template(template_name, template_dirs)
+            # Templates parsed in debug mode keep their origin, which can't
+            # be pickled, so they aren't saved to TEMPLATE_CACHE_FILE.
+            save = settings.TEMPLATE_CACHE_FILE and not settings.TEMPLATE_DEBUG and not template_dirs
+            if save:
+                template, origin = self.find_template_source(template_name), None
+            else:
+                template, origin = self.find_template(template_name, template_dirs)
             if not hasattr(template, 'render'):
                 try:
-                    template = get_template_from_string(template, origin, template_name)
+                    if save:
+                        template = self.get_saved_template(template, template_name)
+                    else:
+                        template = get_template_from_string(template, origin, template_name)
                 except TemplateDoesNotExist:
                     # If compiling the template we found raises TemplateDoesNotExist,
                     # back off to returning the source and display name for the template
@@ -54,6 +80,109 @@ class Loader(BaseLoader):
             self.template_cache[key] = template
         return self.template_cache[key], None
 
+    def find_template_source(self, name):
+        """
+        Returns the source of the given template, rather than the Template
+        parsed by the loader that found it, so that it can be compared with
+        the source of the saved template.
+        """
+        for loader in self.loaders:
+            try:
+                if hasattr(loader, 'load_template_source'):
+                    return loader.load_template_source(name)[0]
+                return loader(name)[0]
+            except TemplateDoesNotExist:
+                pass
+        raise TemplateDoesNotExist(name)
+
+    def get_saved_template(self, source, template_name):
+        """
+        Returns the Template for the given source, unpickled from
+        TEMPLATE_CACHE_FILE if it was saved there from the same source, parsed
+        otherwise.
+        """
+        digest = sha_constructor(smart_str(source)).hexdigest()
+        self._digests[template_name] = digest
+        saved = self.get_saved_templates().get(template_name)
+        if saved is not None and saved[0] == digest:
+            try:
+                return pickle.loads(saved[1])
+            # Unpickling can cause a variety of exceptions, for instance if a
+            # template tag library changed. Parse the template instead.
+            except:
+                pass
+        return get_template_from_string(source, None, template_name)
+
+    def get_saved_templates(self):
+        "Returns the templates read from TEMPLATE_CACHE_FILE."
+        if self._saved_templates is None:
+            self._saved_templates = {}
+            try:
+                f = open(settings.TEMPLATE_CACHE_FILE, 'rb')
+                try:
+                    version, templates = pickle.load(f)
+                finally:
+                    f.close()
+            except (IOError, OSError, EOFError, ValueError, pickle.PickleError):
+                pass
+            else:
+                # Templates parsed by another version of Django may not work.
+                if version == get_version():
+                    self._saved_templates = templates
+        return self._saved_templates
+
+    def preload(self):
+        """
+        Loads all the templates saved in TEMPLATE_CACHE_FILE, rather than when
+        each of them is first used.
+        """
+        for template_name in self.get_saved_templates().keys():
+            try:
+                self.load_template(template_name)
+            except TemplateDoesNotExist:
+                pass
+
+    def save_templates(self):
+        """
+        Saves the templates loaded so far to TEMPLATE_CACHE_FILE, so that
+        other processes can load them without parsing them. Templates that
+        can't be pickled, such as those using filters defined as lambdas or
+        custom tags whose nodes hold unpicklable state, are left out. Returns
+        the names of the saved templates.
+        """
+        templates = {}
+        for template_name, digest in self._digests.items():
+            template = self.template_cache.get(template_name)
+            if not hasattr(template, 'render'):
+                continue
+            try:
+                templates[template_name] = (digest, pickle.dumps(template, pickle.HIGHEST_PROTOCOL))
+            except (pickle.PicklingError, TypeError, AttributeError):
+                pass
+        # Write to a temporary file and rename it, so that other processes
+        # never read a partly written file.
+        dirname = os.path.dirname(os.path.abspath(settings.TEMPLATE_CACHE_FILE))
+        fd, tmp = tempfile.mkstemp(dir=dirname)
+        try:
+            f = os.fdopen(fd, 'wb')
+            try:
+                pickle.dump((get_version(), templates), f, pickle.HIGHEST_PROTOCOL)
+            finally:
+                f.close()
+            try:
+                os.rename(tmp, settings.TEMPLATE_CACHE_FILE)
+            except OSError:
+                # On Windows, the destination can't exist.
+                os.remove(settings.TEMPLATE_CACHE_FILE)
+                os.rename(tmp, settings.TEMPLATE_CACHE_FILE)
+        except:
+            os.remove(tmp)
+            raise
+        self._saved_templates = templates
+        return templates.keys()
+
     def reset(self):
         "Empty the template cache."
         self.template_cache.clear()
+        self._digests.clear()
+        self._saved_templates = None
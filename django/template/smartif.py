@@ -63,6 +63,9 @@ def infix(bp, func):
                 # %} where 'bar' does not support 'in', so default to False
                 return False
 
+        def __reduce__(self):
+            return (create_operator, (self.id,), self.__dict__)
+
     return Operator
 
 
@@ -85,6 +88,9 @@ def prefix(bp, func):
             except Exception:
                 return False
 
+        def __reduce__(self):
+            return (create_operator, (self.id,), self.__dict__)
+
     return Operator
 
 
@@ -112,6 +118,14 @@ OPERATORS = {
 for key, op in OPERATORS.items():
     op.id = key
 
+def create_operator(id):
+    """
+    Creates an operator given its id. Operator classes are created by infix()
+    and prefix(), so pickle can't find them; operators are unpickled with this
+    function instead.
+    """
+    return OPERATORS[id]()
+
 
 class Literal(TokenBase):
     """
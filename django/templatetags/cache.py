@@ -1,37 +1,132 @@
+import copy
+import re
+
 from django.template import Library, Node, TemplateSyntaxError, Variable, VariableDoesNotExist
-from django.template import resolve_variable
 from django.core.cache import cache
-from django.utils.encoding import force_unicode
 from django.utils.http import urlquote
 from django.utils.hashcompat import md5_constructor
 
 register = Library()
 
+# The batch of fragments of the enclosing {% cachebatch %} tag is stored in
+# the context, where it's also seen by included templates, under a key that
+# can't clash with a template variable.
+CACHE_BATCH_KEY = object()
+
+def copy_context(context):
+    """
+    Returns a copy of the context that isn't affected by the later
+    iterations of the loops enclosing the current node, for rendering the
+    node later on.
+    """
+    duplicate = copy.copy(context)
+    duplicate.dicts = []
+    for d in context.dicts:
+        if isinstance(d, dict):
+            d = d.copy()
+            # {% for %} updates its forloop dictionaries in place.
+            if isinstance(d.get('forloop'), dict):
+                d['forloop'] = copy_forloop(d['forloop'])
+        duplicate.dicts.append(d)
+    return duplicate
+
+def copy_forloop(forloop):
+    forloop = forloop.copy()
+    if isinstance(forloop.get('parentloop'), dict):
+        forloop['parentloop'] = copy_forloop(forloop['parentloop'])
+    return forloop
+
+class CacheBatch(object):
+    """
+    The fragments found while rendering a {% cachebatch %} tag. Each of them
+    is rendered as a placeholder, replaced by the cached fragment or, if it
+    isn't in the cache, by the fragment rendered with a copy of the context
+    it was found in.
+    """
+    def __init__(self):
+        self.collecting = True
+        self.fragments = []
+        self.placeholder_re = re.compile(u'\x00%d:(\\d+)\x00' % id(self))
+
+    def add(self, node, context, cache_key, expire_time):
+        "Returns the placeholder of a fragment found while rendering."
+        self.fragments.append((node, copy_context(context), cache_key, expire_time))
+        return u'\x00%d:%d\x00' % (id(self), len(self.fragments) - 1)
+
+    def replace_placeholders(self, output):
+        """
+        Replaces the placeholders in the given output with the fragments,
+        fetching them with a single request, and storing the ones that
+        weren't in the cache with a single request per timeout.
+        """
+        self.collecting = False
+        if not self.fragments:
+            return output
+        values = cache.get_many(list(set([f[2] for f in self.fragments])))
+        misses = {}
+        def replace(match):
+            node, context, cache_key, expire_time = self.fragments[int(match.group(1))]
+            if cache_key not in values:
+                values[cache_key] = node.nodelist.render(context)
+                misses.setdefault(expire_time, {})[cache_key] = values[cache_key]
+            return values[cache_key]
+        output = self.placeholder_re.sub(replace, output)
+        for expire_time, data in misses.items():
+            cache.set_many(data, expire_time)
+        return output
+
 class CacheNode(Node):
     def __init__(self, nodelist, expire_time_var, fragment_name, vary_on):
         self.nodelist = nodelist
         self.expire_time_var = Variable(expire_time_var)
         self.fragment_name = fragment_name
-        self.vary_on = vary_on
+        self.vary_on = [Variable(var) for var in vary_on]
 
-    def render(self, context):
+    def get_expire_time(self, context):
         try:
             expire_time = self.expire_time_var.resolve(context)
         except VariableDoesNotExist:
             raise TemplateSyntaxError('"cache" tag got an unknown variable: %r' % self.expire_time_var.var)
         try:
-            expire_time = int(expire_time)
+            return int(expire_time)
         except (ValueError, TypeError):
             raise TemplateSyntaxError('"cache" tag got a non-integer timeout value: %r' % expire_time)
+
+    def get_cache_key(self, context):
         # Build a unicode key for this fragment and all vary-on's.
-        args = md5_constructor(u':'.join([urlquote(resolve_variable(var, context)) for var in self.vary_on]))
-        cache_key = 'template.cache.%s.%s' % (self.fragment_name, args.hexdigest())
+        args = md5_constructor(u':'.join([urlquote(var.resolve(context)) for var in self.vary_on]))
+        return 'template.cache.%s.%s' % (self.fragment_name, args.hexdigest())
+
+    def render(self, context):
+        expire_time = self.get_expire_time(context)
+        cache_key = self.get_cache_key(context)
+        batch = context.get(CACHE_BATCH_KEY)
+        if batch is not None and batch.collecting:
+            return batch.add(self, context, cache_key, expire_time)
         value = cache.get(cache_key)
         if value is None:
             value = self.nodelist.render(context)
             cache.set(cache_key, value, expire_time)
         return value
 
+class CacheBatchNode(Node):
+    def __init__(self, nodelist):
+        self.nodelist = nodelist
+
+    def render(self, context):
+        batch = context.get(CACHE_BATCH_KEY)
+        if batch is not None and batch.collecting:
+            # The fragments are already part of an enclosing batch.
+            return self.nodelist.render(context)
+        batch = CacheBatch()
+        context.push()
+        try:
+            context[CACHE_BATCH_KEY] = batch
+            output = self.nodelist.render(context)
+        finally:
+            context.pop()
+        return batch.replace_placeholders(output)
+
 def do_cache(parser, token):
     """
     This will cache the contents of a template fragment for a given amount
@@ -60,4 +155,33 @@ def do_cache(parser, token):
         raise TemplateSyntaxError(u"'%r' tag requires at least 2 arguments." % tokens[0])
     return CacheNode(nodelist, tokens[1], tokens[2], tokens[3:])
 
+def do_cachebatch(parser, token):
+    """
+    Fetches all the template fragments cached with the ``cache`` tag inside
+    this block with a single request to the cache, and stores the missing
+    ones with a single request once they've been rendered.
+
+    Usage::
+
+        {% load cache %}
+        {% cachebatch %}
+            {% for entry in entries %}
+                {% cache 500 entry entry.id %}
+                    .. some expensive processing ..
+                {% endcache %}
+            {% endfor %}
+        {% endcachebatch %}
+
+    The block is rendered once, with placeholders for the fragments. The
+    missing fragments are then rendered with a copy of the context they were
+    found in.
+    """
+    bits = token.contents.split()
+    if len(bits) != 1:
+        raise TemplateSyntaxError(u"%r tag takes no arguments." % bits[0])
+    nodelist = parser.parse(('endcachebatch',))
+    parser.delete_first_token()
+    return CacheBatchNode(nodelist)
+
 register.tag('cache', do_cache)
+register.tag('cachebatch', do_cachebatch)
@@ -26,7 +26,15 @@ def instrumented_test_render(self, context):
     that can be intercepted by the test system Client
     """
     signals.template_rendered.send(sender=self, template=self, context=context)
-    return self.nodelist.render(context)
+    return self.original_render(context)
+
+def instrumented_test_generate(self, context):
+    """
+    An instrumented Template generate method, sending the same signal as
+    instrumented_test_render() for templates whose output is streamed.
+    """
+    signals.template_rendered.send(sender=self, template=self, context=context)
+    return self.original_generate(context)
 
 
 def setup_test_environment():
@@ -38,6 +46,8 @@ def setup_test_environment():
     """
     Template.original_render = Template._render
     Template._render = instrumented_test_render
+    Template.original_generate = Template._generate
+    Template._generate = instrumented_test_generate
 
     mail.original_SMTPConnection = mail.SMTPConnection
     mail.SMTPConnection = locmem.EmailBackend
@@ -58,6 +68,8 @@ def teardown_test_environment():
     """
     Template._render = Template.original_render
     del Template.original_render
+    Template._generate = Template.original_generate
+    del Template.original_generate
 
     mail.SMTPConnection = mail.original_SMTPConnection
     del mail.original_SMTPConnection
@@ -0,0 +1,108 @@
+"""
+Serializers turning Python values into byte strings and back, used by the
+cache backends and the session backends to store values.
+
+A serializer is an object with a dumps(value) method returning a string and a
+loads(data) method doing the opposite. get_serializer() returns one given its
+short name or the import path of its class.
+"""
+
+import marshal
+import zlib
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import simplejson
+from django.utils.importlib import import_module
+
+# The exceptions the built-in serializers raise for values they can't
+# serialize, and for data they can't load.
+SERIALIZATION_ERRORS = (pickle.PickleError, TypeError, ValueError, EOFError)
+
+# Short name --> import path of the serializer class.
+SERIALIZERS = {
+    'pickle': 'django.utils.serialization.PickleSerializer',
+    'marshal': 'django.utils.serialization.MarshalSerializer',
+    'json': 'django.utils.serialization.JSONSerializer',
+}
+
+class PickleSerializer(object):
+    """
+    Serializes any picklable value, using the most efficient pickle protocol.
+    """
+    def dumps(self, value):
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data):
+        return pickle.loads(data)
+
+class MarshalSerializer(object):
+    """
+    Serializes values made only of the built-in types (None, booleans,
+    numbers, strings, tuples, lists, dictionaries and sets) faster than
+    pickle does. The format depends on the Python version.
+    """
+    def dumps(self, value):
+        return marshal.dumps(value)
+
+    def loads(self, data):
+        return marshal.loads(data)
+
+class JSONSerializer(object):
+    """
+    Serializes values that can be represented in JSON. Strings come back as
+    unicode and tuples as lists.
+    """
+    def dumps(self, value):
+        return simplejson.dumps(value, separators=(',', ':'))
+
+    def loads(self, data):
+        return simplejson.loads(data)
+
+class CompressedSerializer(object):
+    """
+    Compresses the output of another serializer with zlib when it is at least
+    min_length bytes long. Each serialized value starts with a flag telling
+    whether the rest of it is compressed.
+    """
+    def __init__(self, serializer, min_length):
+        self.serializer = serializer
+        self.min_length = min_length
+
+    def dumps(self, value):
+        data = self.serializer.dumps(value)
+        if len(data) >= self.min_length:
+            compressed = zlib.compress(data)
+            if len(compressed) < len(data):
+                return 'z' + compressed
+        return '-' + data
+
+    def loads(self, data):
+        if data[:1] == 'z':
+            return self.serializer.loads(zlib.decompress(data[1:]))
+        return self.serializer.loads(data[1:])
+
+def get_serializer(name='pickle', compress_min_length=0):
+    """
+    Returns an instance of the serializer called 'name', which is either one
+    of the keys of SERIALIZERS or the import path of a serializer class. If
+    compress_min_length is given, values serialized to at least that many
+    bytes are compressed.
+    """
+    path = SERIALIZERS.get(name, name)
+    try:
+        mod_name, klass_name = path.rsplit('.', 1)
+        mod = import_module(mod_name)
+    except (ImportError, ValueError), e:
+        raise ImproperlyConfigured('Error importing serializer %s: "%s"' % (path, e))
+    try:
+        klass = getattr(mod, klass_name)
+    except AttributeError:
+        raise ImproperlyConfigured('Module "%s" does not define a "%s" class' % (mod_name, klass_name))
+    serializer = klass()
+    if compress_min_length:
+        serializer = CompressedSerializer(serializer, compress_min_length)
+    return serializer
@@ -62,6 +62,20 @@ class Node(object):
         obj.subtree_parents = deepcopy(self.subtree_parents, memodict)
         return obj
 
+    def clone(self):
+        """
+        Returns a copy of the tree that can be modified independently of this
+        one. Unlike a deepcopy(), this only copies the root node: the children
+        are shared between the two trees. That's safe as long as only the root
+        of a tree is modified in place, which is what the methods of this
+        class do; code that needs to change any other part of a tree has to
+        replace the nodes along the way with copies instead.
+        """
+        obj = Node(self.children, self.connector, self.negated)
+        obj.__class__ = self.__class__
+        obj.subtree_parents = [parent.clone() for parent in self.subtree_parents]
+        return obj
+
     def __len__(self):
         """
         The size of a node if the number of children it has.
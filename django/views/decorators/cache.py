@@ -37,17 +37,18 @@ def cache_page(*args, **kwargs):
     # We also add some asserts to give better error messages in case people are
     # using other ways to call cache_page that no longer work.
     key_prefix = kwargs.pop('key_prefix', None)
-    assert not kwargs, "The only keyword argument accepted is key_prefix"
+    stale_seconds = kwargs.pop('stale_seconds', None)
+    assert not kwargs, "The only keyword arguments accepted are key_prefix and stale_seconds"
     if len(args) > 1:
         assert len(args) == 2, "cache_page accepts at most 2 arguments"
         if callable(args[0]):
-            return decorator_from_middleware_with_args(CacheMiddleware)(cache_timeout=args[1], key_prefix=key_prefix)(args[0])
+            return decorator_from_middleware_with_args(CacheMiddleware)(cache_timeout=args[1], key_prefix=key_prefix, stale_seconds=stale_seconds)(args[0])
         elif callable(args[1]):
-            return decorator_from_middleware_with_args(CacheMiddleware)(cache_timeout=args[0], key_prefix=key_prefix)(args[1])
+            return decorator_from_middleware_with_args(CacheMiddleware)(cache_timeout=args[0], key_prefix=key_prefix, stale_seconds=stale_seconds)(args[1])
         else:
             assert False, "cache_page must be passed either a single argument (timeout) or a view function and a timeout"
     else:
-        return decorator_from_middleware_with_args(CacheMiddleware)(cache_timeout=args[0], key_prefix=key_prefix)
+        return decorator_from_middleware_with_args(CacheMiddleware)(cache_timeout=args[0], key_prefix=key_prefix, stale_seconds=stale_seconds)
 
 
 def cache_control(**kwargs):
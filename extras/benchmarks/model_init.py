@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+"""
+Measures the cost of creating model instances from rows loaded from the
+database, which QuerySet.iterator() does for every row.
+"""
+
+from utils import bench, setup_environ
+
+setup_environ()
+
+import datetime
+
+from django.db import models
+
+class Entry(models.Model):
+    title = models.CharField(max_length=50)
+    body = models.TextField()
+    pub_date = models.DateTimeField()
+    rating = models.IntegerField()
+    public = models.BooleanField()
+
+    class Meta:
+        app_label = 'benchmarks'
+
+ROW = (1, 'title', 'body', datetime.datetime(2010, 1, 1), 5, True)
+ATTNAMES = tuple([f.attname for f in Entry._meta.fields])
+
+def main():
+    bench('Entry(*row)', lambda: Entry(*ROW), number=10000)
+    bench('Entry(**kwargs)', lambda: Entry(**dict(zip(ATTNAMES, ROW))),
+          number=10000)
+    bench('Entry._from_db()', lambda: Entry._from_db('default', ATTNAMES, ROW),
+          number=10000)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""
+Measures the cost of cloning queries, which every filter(), exclude() and
+order_by() call on a QuerySet does.
+
+Only the root of the where-tree of a query is copied, with Node.clone(); the
+rest of the tree is shared by the copies, rather than deepcopy()ed. The
+"deepcopy" lines show what cloning the same trees used to cost.
+"""
+
+from utils import bench, setup_environ
+
+setup_environ()
+
+from django.db import models
+from django.utils.copycompat import deepcopy
+
+class Author(models.Model):
+    name = models.CharField(max_length=50)
+
+    class Meta:
+        app_label = 'benchmarks'
+
+class Book(models.Model):
+    title = models.CharField(max_length=50)
+    pages = models.IntegerField()
+    author = models.ForeignKey(Author)
+
+    class Meta:
+        app_label = 'benchmarks'
+
+def build(filters):
+    qs = Book.objects.all()
+    for i in range(filters):
+        if i % 2:
+            qs = qs.exclude(author__name='author %d' % i)
+        else:
+            qs = qs.filter(pages__gt=i, title__startswith='title %d' % i)
+    return qs
+
+def main():
+    for filters in (0, 1, 5, 20):
+        query = build(filters).query
+        bench('Query.clone(), %d filters' % filters, query.clone)
+        bench('  where.clone()', query.where.clone)
+        bench('  deepcopy(where)', lambda: deepcopy(query.where))
+    bench('chained filter() calls', lambda: build(5), number=200)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""
+Measures the serializers used by the cache and session backends on typical
+payloads: a session, a page of rows as cached from a queryset, and a rendered
+page of HTML.
+"""
+
+from utils import bench, setup_environ
+
+setup_environ()
+
+import datetime
+
+from django.utils.serialization import get_serializer
+
+SESSION = {
+    '_auth_user_id': 42,
+    '_auth_user_backend': 'django.contrib.auth.backends.ModelBackend',
+    'django_language': 'en',
+    'cart': [1, 5, 12, 17],
+}
+
+ROWS = [{
+    'id': i,
+    'title': 'Entry number %d' % i,
+    'body': 'Lorem ipsum dolor sit amet. ' * 10,
+    'rating': i % 5,
+    'public': True,
+} for i in range(100)]
+
+PAGE = '<div class="entry"><h2>Title</h2><p>%s</p></div>\n' % ('Lorem ipsum ' * 20) * 50
+
+PAYLOADS = [('session', SESSION), ('rows', ROWS), ('page', PAGE)]
+
+SERIALIZERS = [
+    ('pickle', get_serializer('pickle')),
+    ('marshal', get_serializer('marshal')),
+    ('json', get_serializer('json')),
+    ('pickle+zlib', get_serializer('pickle', compress_min_length=1024)),
+]
+
+def main():
+    for payload_name, payload in PAYLOADS:
+        for name, serializer in SERIALIZERS:
+            data = serializer.dumps(payload)
+            label = '%s %s (%d bytes)' % (payload_name, name, len(data))
+            bench('%s dumps' % label, lambda: serializer.dumps(payload))
+            bench('%s loads' % label, lambda: serializer.loads(data))
+
+if __name__ == '__main__':
+    main()
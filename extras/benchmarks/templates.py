@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Measures the resolution of template variables through dictionaries, object
+attributes and methods, and list indexes, as well as the rendering of a
+loop doing each kind of lookup.
+"""
+
+from utils import bench, setup_environ
+
+setup_environ()
+
+from django.template import Context, Template, Variable
+
+class Entry(object):
+    def __init__(self, i):
+        self.title = 'Entry number %d' % i
+        self.author = Author()
+
+    def get_rating(self):
+        return 4
+
+class Author(object):
+    name = 'Jane'
+
+CONTEXT = Context({
+    'entry': Entry(0),
+    'data': {'title': 'Title', 'author': {'name': 'Jane'}},
+    'items': ['first', 'second'],
+    'entries': [Entry(i) for i in range(100)],
+    'rows': [{'title': 'Row %d' % i, 'tags': ['a', 'b']} for i in range(100)],
+})
+
+VARIABLES = [
+    ('dict', 'data.title'),
+    ('nested dict', 'data.author.name'),
+    ('attribute', 'entry.title'),
+    ('nested attribute', 'entry.author.name'),
+    ('method', 'entry.get_rating'),
+    ('list index', 'items.1'),
+    ('missing', 'entry.missing'),
+]
+
+TEMPLATES = [
+    ('loop over objects', '{% for e in entries %}{{ e.title }} {{ e.author.name }} {{ e.get_rating }}{% endfor %}'),
+    ('loop over dicts', '{% for r in rows %}{{ r.title }} {{ r.tags.0 }}{% endfor %}'),
+]
+
+def main():
+    for name, var in VARIABLES:
+        variable = Variable(var)
+        def resolve():
+            try:
+                variable.resolve(CONTEXT)
+            except Exception:
+                pass
+        bench('resolve %s (%s)' % (name, var), resolve, number=100000)
+    for name, source in TEMPLATES:
+        template = Template(source)
+        bench('render %s' % name, lambda: template.render(CONTEXT), number=500)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Helpers shared by the benchmark scripts.
+"""
+
+import time
+
+def setup_environ(**options):
+    """
+    Configures settings for a benchmark run: an in-memory SQLite database
+    and whatever else is passed in 'options'.
+    """
+    from django.conf import settings
+    if not settings.configured:
+        options.setdefault('DATABASES', {
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:',
+            },
+        })
+        settings.configure(**options)
+
+def bench(name, func, number=1000, repeat=3):
+    """
+    Calls 'func' 'number' times, 'repeat' times over, and prints the best
+    time per call. Returns that time, in seconds.
+    """
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        for j in xrange(number):
+            func()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    per_call = best / number
+    print '%-50s %10.2f usec' % (name, per_call * 1e6)
+    return per_call
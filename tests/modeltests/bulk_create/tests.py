@@ -0,0 +1,81 @@
+from django import db
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+
+from models import Country, Restaurant, State, TwoFields, NoFields
+
+
+class BulkCreateTests(TestCase):
+    def setUp(self):
+        self.data = [
+            Country(name="United States of America", iso_two_letter="US"),
+            Country(name="The Netherlands", iso_two_letter="NL"),
+            Country(name="Germany", iso_two_letter="DE"),
+            Country(name="Czech Republic", iso_two_letter="CZ")
+        ]
+
+    def test_simple(self):
+        created = Country.objects.bulk_create(self.data)
+        self.assertEqual(len(created), 4)
+        self.assertQuerysetEqual(Country.objects.order_by("-name"), [
+            "United States of America", "The Netherlands", "Germany", "Czech Republic"
+        ], lambda c: c.name)
+
+    def test_single_query(self):
+        # Explicitly enable debug - we need to count the queries issued.
+        old_debug = settings.DEBUG
+        settings.DEBUG = True
+        try:
+            db.reset_queries()
+            Country.objects.bulk_create(self.data)
+            self.assertEqual(len(db.connection.queries), 1)
+        finally:
+            settings.DEBUG = old_debug
+
+    def test_empty(self):
+        self.assertEqual(Country.objects.bulk_create([]), [])
+        self.assertEqual(Country.objects.count(), 0)
+
+    def test_inheritance(self):
+        self.assertRaises(ValueError,
+            Restaurant.objects.bulk_create, [Restaurant(name="Nicholas's")])
+
+    def test_non_auto_increment_pk(self):
+        State.objects.bulk_create([
+            State(two_letter_code=s) for s in ["IL", "NY", "CA", "ME"]
+        ])
+        self.assertQuerysetEqual(State.objects.order_by("two_letter_code"), [
+            "CA", "IL", "ME", "NY",
+        ], lambda s: s.two_letter_code)
+
+    def test_large_batch(self):
+        # More rows than a single statement can hold on SQLite.
+        TwoFields.objects.bulk_create([
+            TwoFields(f1=i, f2=i + 1) for i in range(0, 1001)
+        ])
+        self.assertEqual(TwoFields.objects.count(), 1001)
+        self.assertEqual(TwoFields.objects.filter(f1__gte=450, f1__lte=550).count(), 101)
+        self.assertEqual(TwoFields.objects.filter(f2__gte=901).count(), 101)
+
+    def test_explicit_batch_size(self):
+        objs = [TwoFields(f1=i, f2=i) for i in range(0, 10)]
+        TwoFields.objects.bulk_create(objs, batch_size=3)
+        self.assertEqual(TwoFields.objects.count(), 10)
+        self.assertRaises(AssertionError,
+            TwoFields.objects.bulk_create, objs, batch_size=0)
+
+    def test_zero_as_autoval(self):
+        # A model with nothing but an automatic primary key still gets rows.
+        objs = NoFields.objects.bulk_create([NoFields(), NoFields()])
+        self.assertEqual(NoFields.objects.count(), 2)
+        self.assertEqual([obj.pk is not None for obj in objs], [True, True])
+
+    def test_returned_ids(self):
+        created = Country.objects.bulk_create(self.data)
+        if connection.features.can_return_ids_from_bulk_insert:
+            self.assertEqual(
+                sorted([c.pk for c in created]),
+                sorted(Country.objects.values_list('pk', flat=True)))
+        else:
+            self.assertEqual([c.pk for c in created], [None] * 4)
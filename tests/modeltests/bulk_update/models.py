@@ -0,0 +1,17 @@
+from django.db import models
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=20)
+
+class Note(models.Model):
+    note = models.CharField(max_length=100)
+    misc = models.CharField(max_length=10, null=True)
+    tag = models.ForeignKey(Tag, null=True)
+    published = models.DateField(null=True)
+    tags = models.ManyToManyField(Tag, related_name='notes')
+
+class Feed(models.Model):
+    slug = models.SlugField(unique=True)
+    title = models.CharField(max_length=100)
+    entries = models.IntegerField(default=0)
@@ -0,0 +1,107 @@
+import datetime
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+
+from models import Tag, Note, Feed
+
+
+class QueryCountMixin(object):
+    def count_queries(self, func, *args, **kwargs):
+        old_debug = settings.DEBUG
+        settings.DEBUG = True
+        connection.queries = []
+        try:
+            func(*args, **kwargs)
+            return len(connection.queries)
+        finally:
+            settings.DEBUG = old_debug
+
+class BulkUpdateTests(QueryCountMixin, TestCase):
+    def setUp(self):
+        self.notes = [Note.objects.create(note=str(i)) for i in range(10)]
+
+    def test_simple(self):
+        for note in self.notes:
+            note.note = 'test-%s' % note.pk
+        self.assertEqual(self.count_queries(Note.objects.bulk_update,
+                                            self.notes, ['note']), 1)
+        self.assertEqual(
+            sorted(Note.objects.values_list('note', flat=True)),
+            sorted(['test-%s' % note.pk for note in self.notes]))
+
+    def test_multiple_fields(self):
+        for note in self.notes:
+            note.note = 'test-%s' % note.pk
+            note.misc = 'misc-%s' % note.pk
+        rows = Note.objects.bulk_update(self.notes, ['note', 'misc'])
+        self.assertEqual(rows, 10)
+        for note in Note.objects.all():
+            self.assertEqual(note.note, 'test-%s' % note.pk)
+            self.assertEqual(note.misc, 'misc-%s' % note.pk)
+
+    def test_null_and_typed_values(self):
+        tag = Tag.objects.create(name='python')
+        day = datetime.date(2010, 9, 1)
+        for note in self.notes:
+            note.misc = note.pk % 2 and 'odd' or None
+            note.tag = tag
+            note.published = day
+        Note.objects.bulk_update(self.notes, ['misc', 'tag', 'published'])
+        self.assertEqual(Note.objects.filter(misc__isnull=True).count(), 5)
+        self.assertEqual(Note.objects.filter(misc='odd').count(), 5)
+        self.assertEqual(Note.objects.filter(tag=tag, published=day).count(), 10)
+
+    def test_batch_size(self):
+        for note in self.notes:
+            note.note = 'batched'
+        self.assertEqual(self.count_queries(Note.objects.bulk_update,
+                                            self.notes, ['note'], batch_size=3), 4)
+        self.assertEqual(Note.objects.filter(note='batched').count(), 10)
+
+    def test_filtered_queryset(self):
+        for note in self.notes:
+            note.note = 'changed'
+        rows = Note.objects.filter(pk__in=[n.pk for n in self.notes[:4]]).bulk_update(
+            self.notes, ['note'])
+        self.assertEqual(rows, 4)
+        self.assertEqual(Note.objects.filter(note='changed').count(), 4)
+
+    def test_empty(self):
+        self.assertEqual(self.count_queries(Note.objects.bulk_update, [], ['note']), 0)
+
+    def test_invalid_fields(self):
+        self.assertRaises(ValueError, Note.objects.bulk_update, self.notes, [])
+        self.assertRaises(ValueError, Note.objects.bulk_update, self.notes, ['id'])
+        self.assertRaises(ValueError, Note.objects.bulk_update, self.notes, ['tags'])
+
+    def test_unsaved_objects(self):
+        self.assertRaises(ValueError, Note.objects.bulk_update,
+                          [Note(note='new')], ['note'])
+
+class UpdateOrCreateTests(QueryCountMixin, TestCase):
+    def test_create(self):
+        feed, created = Feed.objects.update_or_create(slug='django',
+                                                      defaults={'title': 'Django'})
+        self.assertTrue(created)
+        self.assertEqual(Feed.objects.get(slug='django').title, 'Django')
+
+    def test_update(self):
+        Feed.objects.create(slug='django', title='Old', entries=3)
+        feed, created = Feed.objects.update_or_create(slug='django',
+                                                      defaults={'title': 'New'})
+        self.assertFalse(created)
+        self.assertEqual(feed.title, 'New')
+        feed = Feed.objects.get(slug='django')
+        self.assertEqual((feed.title, feed.entries), ('New', 3))
+
+    def test_update_queries(self):
+        Feed.objects.create(slug='django', title='Old')
+        # One query to fetch the object and one to update it.
+        self.assertEqual(self.count_queries(Feed.objects.update_or_create,
+            slug='django', defaults={'title': 'New'}), 2)
+
+    def test_requires_lookup(self):
+        self.assertRaises(AssertionError, Feed.objects.update_or_create,
+                          defaults={'title': 'New'})
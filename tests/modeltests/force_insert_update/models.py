@@ -12,6 +12,12 @@ class WithCustomPK(models.Model):
     name = models.IntegerField(primary_key=True)
     value = models.IntegerField()
 
+class SelectOnSave(models.Model):
+    value = models.IntegerField()
+
+    class Meta:
+        select_on_save = True
+
 __test__ = {"API_TESTS": """
 >>> c = Counter.objects.create(name="one", value=1)
 
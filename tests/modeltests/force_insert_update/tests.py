@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+
+from models import Counter, WithCustomPK, SelectOnSave
+
+
+class SaveQueriesTests(TestCase):
+    def setUp(self):
+        self.old_debug = settings.DEBUG
+        settings.DEBUG = True
+
+    def tearDown(self):
+        settings.DEBUG = self.old_debug
+
+    def count_queries(self, func, *args, **kwargs):
+        connection.queries = []
+        func(*args, **kwargs)
+        return len(connection.queries)
+
+    def test_update_existing(self):
+        c = Counter.objects.create(name="one", value=1)
+        c.value = 2
+        # No SELECT to check that the row exists.
+        self.assertEqual(self.count_queries(c.save), 1)
+        self.assertEqual(Counter.objects.get(pk=c.pk).value, 2)
+
+    def test_insert_with_pk(self):
+        obj = WithCustomPK(name=1, value=1)
+        # The UPDATE doesn't match any row, so the object is inserted.
+        self.assertEqual(self.count_queries(obj.save), 2)
+        self.assertEqual(WithCustomPK.objects.get(name=1).value, 1)
+
+    def test_select_on_save(self):
+        obj = SelectOnSave.objects.create(value=1)
+        obj.value = 2
+        self.assertEqual(self.count_queries(obj.save), 2)
+        self.assertEqual(SelectOnSave.objects.get(pk=obj.pk).value, 2)
@@ -0,0 +1,47 @@
+from django.db import models
+
+
+class Author(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    first_book = models.ForeignKey('Book', related_name='first_time_authors')
+
+    class Meta:
+        ordering = ['id']
+
+    def __unicode__(self):
+        return self.name
+
+class Book(models.Model):
+    title = models.CharField(max_length=255)
+    authors = models.ManyToManyField(Author, related_name='books')
+
+    class Meta:
+        ordering = ['id']
+
+    def __unicode__(self):
+        return self.title
+
+class Reader(models.Model):
+    name = models.CharField(max_length=50)
+    books_read = models.ManyToManyField(Book, related_name='read_by')
+
+    class Meta:
+        ordering = ['id']
+
+    def __unicode__(self):
+        return self.name
+
+class Comment(models.Model):
+    book = models.ForeignKey(Book)
+    author = models.ForeignKey(Author, null=True)
+    text = models.CharField(max_length=100)
+
+    class Meta:
+        ordering = ['id']
+
+class Person(models.Model):
+    name = models.CharField(max_length=50)
+    friends = models.ManyToManyField('self')
+
+    class Meta:
+        ordering = ['id']
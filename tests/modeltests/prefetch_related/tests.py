@@ -0,0 +1,151 @@
+from django import db
+from django.conf import settings
+from django.test import TestCase
+
+from models import Author, Book, Reader, Comment, Person
+
+
+class PrefetchRelatedTests(TestCase):
+    def setUp(self):
+        # Explicitly enable debug - we need to count the queries issued.
+        self.old_debug = settings.DEBUG
+        settings.DEBUG = True
+
+        self.book1 = Book.objects.create(title="Poems")
+        self.book2 = Book.objects.create(title="Jane Eyre")
+        self.book3 = Book.objects.create(title="Wuthering Heights")
+        self.book4 = Book.objects.create(title="Sense and Sensibility")
+
+        self.author1 = Author.objects.create(name="Charlotte",
+                                            first_book=self.book1)
+        self.author2 = Author.objects.create(name="Anne",
+                                            first_book=self.book1)
+        self.author3 = Author.objects.create(name="Emily",
+                                            first_book=self.book1)
+        self.author4 = Author.objects.create(name="Jane",
+                                            first_book=self.book4)
+
+        self.book1.authors.add(self.author1, self.author2, self.author3)
+        self.book2.authors.add(self.author1)
+        self.book3.authors.add(self.author3)
+        self.book4.authors.add(self.author4)
+
+        self.reader1 = Reader.objects.create(name="Amy")
+        self.reader2 = Reader.objects.create(name="Belinda")
+        self.reader1.books_read.add(self.book1, self.book4)
+        self.reader2.books_read.add(self.book2, self.book4)
+
+        Comment.objects.create(book=self.book1, author=self.author2, text="Nice")
+        Comment.objects.create(book=self.book1, author=None, text="Meh")
+        Comment.objects.create(book=self.book2, author=self.author1, text="Ok")
+
+        db.reset_queries()
+
+    def tearDown(self):
+        settings.DEBUG = self.old_debug
+
+    def assertQueries(self, queries):
+        self.assertEqual(len(db.connection.queries), queries)
+
+    def test_m2m_forward(self):
+        lists = [[unicode(a) for a in b.authors.all()]
+                 for b in Book.objects.prefetch_related('authors')]
+        self.assertQueries(2)
+        self.assertEqual(lists, [
+            [u"Charlotte", u"Anne", u"Emily"],
+            [u"Charlotte"],
+            [u"Emily"],
+            [u"Jane"],
+        ])
+
+    def test_m2m_reverse(self):
+        lists = [[unicode(b) for b in a.books.all()]
+                 for a in Author.objects.prefetch_related('books')]
+        self.assertQueries(2)
+        self.assertEqual(lists, [
+            [u"Poems", u"Jane Eyre"],
+            [u"Poems"],
+            [u"Poems", u"Wuthering Heights"],
+            [u"Sense and Sensibility"],
+        ])
+
+    def test_foreignkey_reverse(self):
+        lists = [[c.text for c in b.comment_set.all()]
+                 for b in Book.objects.prefetch_related('comment_set')]
+        self.assertQueries(2)
+        self.assertEqual(lists, [[u"Nice", u"Meh"], [u"Ok"], [], []])
+
+    def test_foreignkey_forward(self):
+        authors = list(Author.objects.prefetch_related('first_book'))
+        self.assertEqual([unicode(a.first_book) for a in authors], [
+            u"Poems", u"Poems", u"Poems", u"Sense and Sensibility"
+        ])
+        self.assertQueries(2)
+
+    def test_nested(self):
+        books = list(Book.objects.prefetch_related('comment_set__author'))
+        authors = [[c.author and c.author.name for c in b.comment_set.all()]
+                   for b in books]
+        self.assertQueries(3)
+        self.assertEqual(authors, [[u"Anne", None], [u"Charlotte"], [], []])
+
+    def test_nested_m2m(self):
+        readers = list(Reader.objects.prefetch_related('books_read__authors'))
+        self.assertQueries(3)
+        names = [[[unicode(a) for a in b.authors.all()]
+                  for b in r.books_read.all()]
+                 for r in readers]
+        self.assertQueries(3)
+        self.assertEqual(names, [
+            [[u"Charlotte", u"Anne", u"Emily"], [u"Jane"]],
+            [[u"Charlotte"], [u"Jane"]],
+        ])
+
+    def test_overlapping_lookups(self):
+        readers = list(Reader.objects.prefetch_related('books_read',
+                                                       'books_read__authors'))
+        self.assertQueries(3)
+        self.assertEqual([unicode(b) for b in readers[0].books_read.all()],
+                         [u"Poems", u"Sense and Sensibility"])
+        self.assertQueries(3)
+
+    def test_symmetrical_m2m(self):
+        p1 = Person.objects.create(name="Joe")
+        p2 = Person.objects.create(name="Bob")
+        p3 = Person.objects.create(name="Ann")
+        p1.friends.add(p2, p3)
+        db.reset_queries()
+        friends = [[p.name for p in person.friends.all()]
+                   for person in Person.objects.prefetch_related('friends')]
+        self.assertQueries(2)
+        self.assertEqual(friends, [[u"Bob", u"Ann"], [u"Joe"], [u"Joe"]])
+
+    def test_filter_after_prefetch_hits_db(self):
+        book = Book.objects.prefetch_related('authors').get(pk=self.book1.pk)
+        self.assertQueries(2)
+        self.assertEqual([a.name for a in book.authors.filter(name="Anne")],
+                         [u"Anne"])
+        self.assertQueries(3)
+
+    def test_chained_and_cleared(self):
+        qs = Book.objects.prefetch_related('authors').prefetch_related('comment_set')
+        self.assertEqual(qs._prefetch_related_lookups, ['authors', 'comment_set'])
+        self.assertEqual(qs.prefetch_related(None)._prefetch_related_lookups, [])
+
+    def test_count_uses_cache(self):
+        books = list(Book.objects.prefetch_related('authors'))
+        self.assertEqual([b.authors.count() for b in books], [3, 1, 1, 1])
+        self.assertQueries(2)
+
+    def test_values_ignored(self):
+        self.assertEqual(
+            list(Book.objects.prefetch_related('authors').values_list('title', flat=True)),
+            [u"Poems", u"Jane Eyre", u"Wuthering Heights", u"Sense and Sensibility"])
+
+    def test_attribute_error(self):
+        qs = Book.objects.all().prefetch_related('authors__xyz')
+        self.assertRaises(AttributeError, list, qs)
+
+    def test_invalid_final_lookup(self):
+        qs = Book.objects.prefetch_related('authors__name')
+        self.assertRaises(ValueError, list, qs)
@@ -1,12 +1,18 @@
 # -*- coding: utf-8 -*-
 # Unit and doctests for specific database backends.
 import datetime
+import os
+import tempfile
+import threading
+import time
 import unittest
 
 from django.conf import settings
 from django.core import management
 from django.core.management.color import no_style
 from django.db import backend, connection, connections, DEFAULT_DB_ALIAS
+from django.db.backends import pool
+from django.db.backends.pool import ConnectionPool
 from django.db.backends.signals import connection_created
 from django.test import TestCase
 
@@ -155,6 +161,36 @@ class SequenceResetTest(TestCase):
         self.assertTrue(obj.pk > 10)
 
 
+class ServerSideCursorTest(TestCase):
+    def setUp(self):
+        for i in range(1, 11):
+            models.Square.objects.create(root=i, square=i ** 2)
+
+    def test_chunked_cursor(self):
+        cursor = connection.chunked_cursor()
+        cursor.execute("SELECT 1")
+        self.assertEqual(list(cursor.fetchmany(10)), [(1,)])
+
+    def test_iterator_server_side(self):
+        qs = models.Square.objects.order_by('root')
+        self.assertEqual(
+            [s.square for s in qs.iterator(chunk_size=3, server_side=True)],
+            [i ** 2 for i in range(1, 11)])
+
+    def test_values_iterator_server_side(self):
+        qs = models.Square.objects.order_by('root').values_list('root', flat=True)
+        self.assertEqual(list(qs.iterator(chunk_size=4, server_side=True)),
+                         range(1, 11))
+        qs = models.Square.objects.filter(root__lte=2).order_by('root').values('root')
+        self.assertEqual(list(qs.iterator(chunk_size=1, server_side=True)),
+                         [{'root': 1}, {'root': 2}])
+
+    def test_small_chunk_size(self):
+        qs = models.Square.objects.order_by('-root')
+        self.assertEqual([s.root for s in qs.iterator(chunk_size=1)],
+                         range(10, 0, -1))
+
+
 def connection_created_test(sender, **kwargs):
     print 'connection_created signal'
 
@@ -197,3 +233,186 @@ connection_created signal
 
 if __name__ == '__main__':
     unittest.main()
+
+
+class FakeConnection(object):
+    def __init__(self, usable=True):
+        self.usable = usable
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(unittest.TestCase):
+
+    def is_usable(self, conn):
+        return conn.usable
+
+    def test_reuse(self):
+        pool = ConnectionPool(max_size=2)
+        self.assertEqual(pool.acquire(self.is_usable), (None, None))
+        conn = FakeConnection()
+        self.assertTrue(pool.release(conn))
+        self.assertEqual(pool.acquire(self.is_usable)[0], conn)
+        self.assertEqual(len(pool), 0)
+        self.assertFalse(conn.closed)
+
+    def test_max_size(self):
+        pool = ConnectionPool(max_size=1)
+        conn1, conn2 = FakeConnection(), FakeConnection()
+        self.assertTrue(pool.release(conn1))
+        self.assertFalse(pool.release(conn2))
+        self.assertTrue(conn2.closed)
+        self.assertEqual(len(pool), 1)
+
+    def test_max_age(self):
+        pool = ConnectionPool(max_age=60)
+        old, young = FakeConnection(), FakeConnection()
+        # Too old to be taken back.
+        self.assertFalse(pool.release(old, time.time() - 120))
+        self.assertTrue(old.closed)
+        # Expires while idle.
+        pool.release(young)
+        pool.max_age = 0
+        self.assertEqual(pool.acquire(self.is_usable), (None, None))
+        self.assertTrue(young.closed)
+
+    def test_health_check(self):
+        pool = ConnectionPool()
+        good, broken = FakeConnection(), FakeConnection(usable=False)
+        pool.release(good)
+        pool.release(broken)
+        self.assertEqual(pool.acquire(self.is_usable)[0], good)
+        self.assertTrue(broken.closed)
+
+        pool = ConnectionPool(health_check=False)
+        pool.release(broken)
+        self.assertEqual(pool.acquire(self.is_usable)[0], broken)
+
+    def test_keys(self):
+        pool = ConnectionPool()
+        conn = FakeConnection()
+        pool.release(conn, key=('db', 'host'))
+        self.assertEqual(pool.acquire(self.is_usable), (None, None))
+        self.assertEqual(pool.acquire(self.is_usable, ('test_db', 'host')), (None, None))
+        self.assertEqual(pool.acquire(self.is_usable, ('db', 'host'))[0], conn)
+
+    def test_close_all(self):
+        pool = ConnectionPool()
+        conns = [FakeConnection(), FakeConnection()]
+        for conn in conns:
+            pool.release(conn)
+        pool.close_all()
+        self.assertEqual(len(pool), 0)
+        self.assertTrue(conns[0].closed and conns[1].closed)
+
+
+class PooledConnectionTest(unittest.TestCase):
+    """
+    Pooling of real connections, using the stand-in pool of the SQLite
+    backend.
+    """
+    def setUp(self):
+        from django.db.backends.sqlite3.base import DatabaseWrapper
+        fd, self.name = tempfile.mkstemp()
+        os.close(fd)
+        self.settings_dict = {
+            'NAME': self.name,
+            'OPTIONS': {},
+            'POOL': {'MAX_SIZE': 2},
+        }
+        self.wrapper_class = DatabaseWrapper
+        self.wrapper = DatabaseWrapper(self.settings_dict, alias='pool_test')
+
+    def tearDown(self):
+        self.wrapper.pool.close_all()
+        del pool._pools['pool_test']
+        os.remove(self.name)
+
+    def test_connection_reused(self):
+        self.wrapper.cursor().execute("CREATE TABLE t (x integer)")
+        conn = self.wrapper.connection
+        self.wrapper.close()
+        self.assertEqual(self.wrapper.connection, None)
+        self.assertEqual(len(self.wrapper.pool), 1)
+
+        self.wrapper.cursor()
+        self.assertTrue(self.wrapper.connection is conn)
+        self.assertEqual(len(self.wrapper.pool), 0)
+
+    def test_pool_shared_by_alias(self):
+        other = self.wrapper_class(self.settings_dict, alias='pool_test')
+        self.assertTrue(other.pool is self.wrapper.pool)
+        unpooled = self.wrapper_class({'NAME': self.name, 'OPTIONS': {}})
+        self.assertEqual(unpooled.pool, None)
+
+    def test_uncommitted_changes_rolled_back(self):
+        cursor = self.wrapper.cursor()
+        cursor.execute("CREATE TABLE t (x integer)")
+        self.wrapper._commit()
+        cursor.execute("INSERT INTO t VALUES (1)")
+        self.wrapper.close()
+        cursor = self.wrapper.cursor()
+        cursor.execute("SELECT COUNT(*) FROM t")
+        self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_same_thread_only(self):
+        self.wrapper.cursor()
+        self.wrapper.close()
+        results = []
+        def acquire():
+            results.append(self.wrapper.pool.acquire(self.wrapper._is_usable,
+                                                     self.wrapper._get_pool_key()))
+        t = threading.Thread(target=acquire)
+        t.start()
+        t.join()
+        self.assertEqual(results, [(None, None)])
+        self.assertEqual(len(self.wrapper.pool), 1)
+
+    def database_names(self, wrapper):
+        cursor = wrapper.cursor()
+        cursor.execute("PRAGMA database_list")
+        return [row[2] for row in cursor.fetchall()]
+
+    def test_settings_changed(self):
+        fd, other_name = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            self.wrapper.cursor()
+            self.wrapper.close()
+            self.wrapper.settings_dict['NAME'] = other_name
+            self.assertEqual(self.database_names(self.wrapper), [os.path.realpath(other_name)])
+            self.wrapper.close()
+            self.assertEqual(len(self.wrapper.pool), 2)
+            self.wrapper.settings_dict['NAME'] = self.name
+            self.assertEqual(self.database_names(self.wrapper), [os.path.realpath(self.name)])
+        finally:
+            self.wrapper.close()
+            self.wrapper.pool.close_all()
+            os.remove(other_name)
+
+    def test_create_test_db(self):
+        from django.db.backends import creation
+        fd, test_name = tempfile.mkstemp()
+        os.close(fd)
+        self.settings_dict['TEST_NAME'] = test_name
+        # syncdb would install the models of all the apps loaded by the test
+        # suite; creating a table is enough to tell which database it uses.
+        def syncdb(*args, **kwargs):
+            self.wrapper.cursor().execute("CREATE TABLE synced (x integer)")
+        old_call_command = creation.call_command
+        creation.call_command = syncdb
+        try:
+            self.wrapper.cursor()
+            self.wrapper.creation.create_test_db(verbosity=0, autoclobber=True)
+            self.assertEqual(self.database_names(self.wrapper), [os.path.realpath(test_name)])
+            self.assertEqual(self.wrapper.introspection.table_names(), ['synced'])
+            self.wrapper.creation.destroy_test_db(self.name, verbosity=0)
+            self.assertEqual(self.database_names(self.wrapper), [os.path.realpath(self.name)])
+            self.assertEqual(self.wrapper.introspection.table_names(), [])
+        finally:
+            creation.call_command = old_call_command
+            self.wrapper.close()
+            if os.path.exists(test_name):
+                os.remove(test_name)
@@ -5,13 +5,19 @@
 
 import os
 import shutil
+import socket
 import tempfile
 import time
 import unittest
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
 
 from django.conf import settings
 from django.core import management
 from django.core.cache import get_cache
+from django.core.cache.backends import memcached
 from django.core.cache.backends.base import InvalidCacheBackendError
 from django.http import HttpResponse, HttpRequest
 from django.middleware.cache import FetchFromCacheMiddleware, UpdateCacheMiddleware
@@ -27,6 +33,10 @@ class C:
     def m(n):
         return 24
 
+def custom_key_func(key, key_prefix, version):
+    "A customized cache key function"
+    return 'CUSTOM-%s-%s' % (version, key)
+
 class DummyCacheTests(unittest.TestCase):
     # The Dummy cache backend doesn't really behave like a test backend,
     # so it has different test requirements.
@@ -143,6 +153,21 @@ class DummyCacheTests(unittest.TestCase):
         "clear does nothing for the dummy cache backend"
         self.cache.clear()
 
+    def test_versioning(self):
+        "Versions and namespaces are ignored by the dummy cache backend"
+        self.cache.set('answer', 42, version=2)
+        self.assertEqual(self.cache.get('answer', version=2), None)
+        self.assertRaises(ValueError, self.cache.incr_version, 'answer', version=2)
+        user = self.cache.namespace('user42')
+        user.set('name', 'Arthur')
+        self.assertEqual(user.get('name'), None)
+        self.cache.invalidate_namespace('user42')
+
+    def test_get_or_set(self):
+        "get_or_set always calls the default for the dummy cache backend"
+        self.assertEqual(self.cache.get_or_set('key', lambda: 'value'), 'value')
+        self.assertEqual(self.cache.get_or_set('key', lambda: 'other', stale_ttl=10), 'other')
+
 
 class BaseCacheTests(object):
     # A common set of tests to apply to all cache backends
@@ -328,6 +353,77 @@ class BaseCacheTests(object):
         self.assertEqual(self.cache.get("key2"), None)
         self.assertEqual(self.cache.get("key3"), "ham")
 
+    def test_get_many_expiration(self):
+        # get_many doesn't return expired values
+        self.cache.set_many({"key1": "spam", "key2": "eggs"}, 1)
+        self.cache.set("key3", "ham")
+        time.sleep(2)
+        self.assertEqual(self.cache.get_many(["key1", "key2", "key3"]), {"key3": "ham"})
+        self.assertEqual(self.cache.get("key1"), None)
+
+    def test_set_many_overwrite(self):
+        # set_many replaces existing values
+        self.cache.set("key1", "spam")
+        self.cache.set_many({"key1": "eggs", "key2": "ham"})
+        self.assertEqual(self.cache.get_many(["key1", "key2"]), {"key1": "eggs", "key2": "ham"})
+
+    def test_get_or_set(self):
+        # get_or_set only calls the default when the key isn't in the cache
+        calls = []
+        def compute():
+            calls.append(True)
+            return len(calls)
+        self.assertEqual(self.cache.get_or_set('key', compute), 1)
+        self.assertEqual(self.cache.get_or_set('key', compute), 1)
+        self.assertEqual(self.cache.get('key'), 1)
+        self.assertEqual(len(calls), 1)
+
+    def test_get_or_set_stale(self):
+        # Out of date values are served while another caller refreshes them
+        calls = []
+        def compute():
+            calls.append(True)
+            return len(calls)
+        self.assertEqual(self.cache.get_or_set('key', compute, 1, stale_ttl=60), 1)
+        self.assertEqual(self.cache.get_or_set('key', compute, 1, stale_ttl=60), 1)
+        time.sleep(2)
+        lock_key = self.cache._refresh_lock_key('key')
+        self.assertTrue(self.cache.add(lock_key, True))
+        self.assertEqual(self.cache.get_or_set('key', compute, 1, stale_ttl=60), 1)
+        self.assertEqual(len(calls), 1)
+        self.cache.delete(lock_key)
+        self.assertEqual(self.cache.get_or_set('key', compute, 60, stale_ttl=60), 2)
+        self.assertEqual(self.cache.get_or_set('key', compute, 60, stale_ttl=60), 2)
+        # The lock is released once the value is refreshed
+        self.assertTrue(self.cache.add(lock_key, True))
+
+    def test_get_or_set_plain_value(self):
+        # Values stored with set() are recomputed when a stale_ttl is given,
+        # and values stored with a stale_ttl are read without one.
+        self.cache.set('key', ('not', 'refreshable'))
+        self.assertEqual(self.cache.get_or_set('key', lambda: 'new', 60, stale_ttl=60), 'new')
+        self.assertEqual(self.cache.get_or_set('key', lambda: 'other', 60, stale_ttl=60), 'new')
+        self.assertEqual(self.cache.get_or_set('key', lambda: 'other'), 'new')
+
+    def test_get_or_set_error(self):
+        # The refresh lock is released if computing the value fails
+        def fail():
+            raise ValueError
+        self.assertRaises(ValueError, self.cache.get_or_set, 'key', fail, stale_ttl=60)
+        self.assertEqual(self.cache.get('key'), None)
+        self.assertTrue(self.cache.add(self.cache._refresh_lock_key('key'), True))
+
+    def test_get_or_set_foreign_lock(self):
+        # Callers computing a missing value don't release a lock they didn't take
+        def fail():
+            raise ValueError
+        lock_key = self.cache._refresh_lock_key('key')
+        self.assertTrue(self.cache.add(lock_key, True))
+        self.assertRaises(ValueError, self.cache.get_or_set, 'key', fail, stale_ttl=60)
+        self.assertEqual(self.cache.get(lock_key), True)
+        self.assertEqual(self.cache.get_or_set('key', lambda: 'new', 60, stale_ttl=60), 'new')
+        self.assertEqual(self.cache.get(lock_key), True)
+
     def test_clear(self):
         # The cache can be emptied using clear
         self.cache.set("key1", "spam")
@@ -352,6 +448,87 @@ class BaseCacheTests(object):
         self.assertEqual(self.cache.get('key3'), 'sausage')
         self.assertEqual(self.cache.get('key4'), 'lobster bisque')
 
+    def test_versioning(self):
+        # Each version of a key holds its own value
+        self.cache.set('answer', 42)
+        self.cache.set('answer', 37, version=2)
+        self.assertEqual(self.cache.get('answer'), 42)
+        self.assertEqual(self.cache.get('answer', version=1), 42)
+        self.assertEqual(self.cache.get('answer', version=2), 37)
+        self.assertEqual(self.cache.get('answer', version=3), None)
+        self.assertTrue(self.cache.has_key('answer', version=2))
+        self.assertFalse(self.cache.has_key('answer', version=3))
+
+        self.assertFalse(self.cache.add('answer', 0, version=2))
+        self.assertTrue(self.cache.add('answer', 40, version=3))
+        self.assertEqual(self.cache.incr('answer', version=3), 41)
+        self.assertEqual(self.cache.decr('answer', 2, version=3), 39)
+        self.assertEqual(self.cache.get('answer'), 42)
+
+        self.cache.delete('answer', version=2)
+        self.assertEqual(self.cache.get('answer', version=2), None)
+        self.assertEqual(self.cache.get('answer'), 42)
+
+    def test_versioning_many(self):
+        self.cache.set_many({'ford': 1, 'arthur': 2})
+        self.cache.set_many({'ford': 3, 'arthur': 4}, version=2)
+        self.assertEqual(self.cache.get_many(['ford', 'arthur']), {'ford': 1, 'arthur': 2})
+        self.assertEqual(self.cache.get_many(['ford', 'arthur'], version=2), {'ford': 3, 'arthur': 4})
+        self.cache.delete_many(['ford', 'arthur'], version=2)
+        self.assertEqual(self.cache.get_many(['ford', 'arthur'], version=2), {})
+        self.assertEqual(self.cache.get_many(['ford', 'arthur']), {'ford': 1, 'arthur': 2})
+
+    def test_incr_version(self):
+        self.cache.set('answer', 42, version=2)
+        self.assertEqual(self.cache.incr_version('answer', version=2), 3)
+        self.assertEqual(self.cache.get('answer', version=2), None)
+        self.assertEqual(self.cache.get('answer', version=3), 42)
+        self.assertEqual(self.cache.decr_version('answer', 2, version=3), 1)
+        self.assertEqual(self.cache.get('answer'), 42)
+        self.assertEqual(self.cache.get('answer', version=3), None)
+        self.assertRaises(ValueError, self.cache.incr_version, 'does_not_exist')
+
+    def test_namespace(self):
+        # A namespace can be invalidated as a whole
+        user = self.cache.namespace('user42')
+        user.set('name', 'Arthur')
+        user.set_many({'planet': 'Earth', 'towel': True})
+        self.cache.set('name', 'Ford')
+        self.assertEqual(user.get('name'), 'Arthur')
+        self.assertEqual(user.get_many(['name', 'planet']), {'name': 'Arthur', 'planet': 'Earth'})
+        self.assertTrue('towel' in user)
+        self.assertEqual(self.cache.namespace('user43').get('name'), None)
+        self.assertEqual(self.cache.namespace('user42').get('name'), 'Arthur')
+
+        self.cache.invalidate_namespace('user42')
+        self.assertEqual(self.cache.namespace('user42').get('name'), None)
+        self.assertEqual(self.cache.namespace('user42').get_many(['planet', 'towel']), {})
+        self.assertEqual(self.cache.get('name'), 'Ford')
+
+        # An existing namespace object has to be invalidated to see it
+        user.invalidate()
+        self.assertEqual(user.get('name'), None)
+        user.set('name', 'Zaphod')
+        self.assertEqual(self.cache.namespace('user42').get('name'), 'Zaphod')
+
+    def test_namespace_evicted(self):
+        # The entries of a namespace whose generation counter was evicted
+        # aren't used anymore
+        self.cache.namespace('user42').set('name', 'Arthur')
+        self.cache.delete(self.cache.namespace('user42')._generation_key())
+        # The new counter starts from the current time in milliseconds.
+        time.sleep(0.01)
+        self.assertEqual(self.cache.namespace('user42').get('name'), None)
+
+    def check_serializer(self, cache):
+        # Values round-trip through other serializers, and compression
+        value = {'text': 'x' * 100, 'list': [1, 2.5, None]}
+        cache.set('serialized', value)
+        cache.set_many({'short': 'short'})
+        self.assertEqual(cache.get('serialized'), value)
+        self.assertEqual(cache.get_many(['serialized', 'short']),
+                         {'serialized': value, 'short': 'short'})
+
 class DBCacheTests(unittest.TestCase, BaseCacheTests):
     def setUp(self):
         # Spaces are used in the table name to ensure quoting/escaping is working
@@ -364,10 +541,195 @@ class DBCacheTests(unittest.TestCase, BaseCacheTests):
         cursor = connection.cursor()
         cursor.execute('DROP TABLE %s' % connection.ops.quote_name(self._table_name))
 
+    def test_serializer(self):
+        self.check_serializer(get_cache('db://%s?serializer=json&compress_min_length=50' % self._table_name))
+
+    def test_count_interval(self):
+        # The entries are only counted every count_interval seconds
+        from django.db import connection
+        cache = get_cache('db://%s?count_interval=60' % self._table_name)
+        old_debug = settings.DEBUG
+        settings.DEBUG = True
+        try:
+            connection.queries = []
+            cache.set('key1', 'spam')
+            cache.set('key2', 'eggs')
+            cache.add('key3', 'ham')
+            counts = [q for q in connection.queries if 'COUNT' in q['sql']]
+            self.assertEqual(len(counts), 1)
+        finally:
+            settings.DEBUG = old_debug
+        self.assertEqual(cache._num_entries, 3)
+        self.assertEqual(cache.get_many(['key1', 'key2', 'key3']),
+                         {'key1': 'spam', 'key2': 'eggs', 'key3': 'ham'})
+
+    def test_cull(self):
+        cache = get_cache('db://%s?max_entries=30' % self._table_name)
+        for i in range(50):
+            cache.set('cull%d' % i, 'value', 1000 + i)
+        from django.db import connection
+        cursor = connection.cursor()
+        cursor.execute('SELECT COUNT(*) FROM %s' % connection.ops.quote_name(self._table_name))
+        self.assertTrue(cursor.fetchone()[0] <= 31)
+        # The entries that expire soonest were removed.
+        self.assertEqual(cache.get('cull0'), None)
+        self.assertEqual(cache.get('cull49'), 'value')
+
+    def test_add_expired(self):
+        self.cache.set('key', 'spam', -1)
+        self.assertEqual(self.cache.add('key', 'eggs'), True)
+        self.assertEqual(self.cache.get('key'), 'eggs')
+        self.assertEqual(self.cache.add('key', 'ham'), False)
+        self.assertEqual(self.cache.get('key'), 'eggs')
+
+    def test_add_in_transaction(self):
+        # Adding a live key doesn't run a failing query, which would abort
+        # the surrounding transaction on some databases.
+        from django.db import connection, transaction
+        self.cache.set('key', 'spam')
+        old_debug = settings.DEBUG
+        settings.DEBUG = True
+        try:
+            connection.queries = []
+            def add():
+                self.assertEqual(self.cache.add('key', 'eggs'), False)
+                self.assertEqual(self.cache.get('key'), 'spam')
+            transaction.commit_on_success(add)()
+            self.assertFalse([q for q in connection.queries if 'INSERT' in q['sql']])
+        finally:
+            settings.DEBUG = old_debug
+        self.assertEqual(self.cache.get('key'), 'spam')
+
+    def test_many_queries(self):
+        # get_many, set_many and delete_many don't run a query per key
+        from django.db import connection
+        keys = ['key%d' % i for i in range(10)]
+        old_debug = settings.DEBUG
+        settings.DEBUG = True
+        try:
+            connection.queries = []
+            self.cache.set_many(dict([(key, key) for key in keys]))
+            columns = [connection.ops.quote_name(c) for c in ('cache_key', 'value', 'expires')]
+            if connection.ops.replace_sql(self.cache._table, columns, [['%s'] * 3]) is not None:
+                # A count of the entries and a single write.
+                self.assertEqual(len(connection.queries), 2)
+            else:
+                # A count of the entries, a lookup of the existing keys and
+                # one write per key.
+                self.assertEqual(len(connection.queries), 12)
+            connection.queries = []
+            self.assertEqual(self.cache.get_many(keys + ['missing']),
+                             dict([(key, key) for key in keys]))
+            self.assertEqual(len(connection.queries), 1)
+            connection.queries = []
+            self.cache.delete_many(keys)
+            self.assertEqual(len(connection.queries), 1)
+        finally:
+            settings.DEBUG = old_debug
+        self.assertEqual(self.cache.get_many(keys), {})
+
 class LocMemCacheTests(unittest.TestCase, BaseCacheTests):
     def setUp(self):
         self.cache = get_cache('locmem://')
 
+    def test_serializer(self):
+        self.check_serializer(get_cache('locmem://?serializer=marshal&compress_min_length=50'))
+
+    def test_serializer_errors(self):
+        # Values that can't be serialized aren't stored, whichever the
+        # serializer.
+        for serializer in ('pickle', 'marshal', 'json'):
+            cache = get_cache('locmem://?serializer=%s' % serializer)
+            cache.set('unserializable', lambda: None)
+            cache.set_many({'unserializable': lambda: None})
+            self.assertEqual(cache.add('unserializable', lambda: None), False)
+            self.assertEqual(cache.get('unserializable'), None)
+
+    def test_stats(self):
+        self.cache.set('key1', 'spam')
+        self.cache.get('key1')
+        self.cache.get('key2')
+        self.cache.get_many(['key1', 'key2', 'key3'])
+        stats = self.cache.get_stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 3)
+        self.assertEqual(stats['evictions'], 0)
+        self.assertEqual(stats['entries'], 1)
+        self.assertTrue(stats['bytes'] > 0)
+        self.cache.delete('key1')
+        self.assertEqual(self.cache.get_stats()['bytes'], 0)
+
+    def test_make_key(self):
+        self.assertEqual(self.cache.make_key('key'), ':1:key')
+        self.assertEqual(self.cache.make_key('key', version=2), ':2:key')
+        cache = get_cache('locmem://?key_prefix=site1&version=3')
+        self.assertEqual(cache.make_key('key'), 'site1:3:key')
+        cache = get_cache('locmem://?key_function=regressiontests.cache.tests.custom_key_func')
+        self.assertEqual(cache.make_key('key'), 'CUSTOM-1-key')
+        cache.set('key', 'value')
+        self.assertEqual(cache._cache.keys(), ['CUSTOM-1-key'])
+        self.assertEqual(cache.get('key'), 'value')
+
+    def test_cull(self):
+        cache = get_cache('locmem://?max_entries=30&cull_frequency=3')
+        for i in range(30):
+            cache.set('key%d' % i, i)
+        self.assertEqual(cache.get_stats()['entries'], 30)
+        cache.set('key30', 30)
+        # A third of the entries were culled to make room.
+        self.assertEqual(cache.get_stats()['entries'], 21)
+        self.assertEqual(cache.get_stats()['evictions'], 10)
+        self.assertEqual(cache.get('key30'), 30)
+
+    def test_max_bytes(self):
+        cache = get_cache('locmem://?max_bytes=1000')
+        cache.set('key1', 'x' * 2000)
+        self.assertEqual(cache.get('key1'), None)
+        for i in range(10):
+            cache.set('key%d' % i, 'x' * 200)
+            self.assertTrue(cache.get_stats()['bytes'] <= 1000)
+        self.assertEqual(cache.get('key9'), 'x' * 200)
+
+    def test_max_bytes_keeps_new_value(self):
+        # Making room for a value never evicts the value itself
+        for frequency in (0, 1):
+            cache = get_cache('locmem://?max_bytes=1000&cull_frequency=%d' % frequency)
+            for i in range(10):
+                cache.set('key%d' % i, 'x' * 300)
+                self.assertEqual(cache.get('key%d' % i), 'x' * 300)
+                self.assertTrue(cache.get_stats()['bytes'] <= 1000)
+
+class LocMemLRUCacheTests(LocMemCacheTests):
+    def setUp(self):
+        self.cache = get_cache('locmem://?eviction=lru')
+
+    def test_cull(self):
+        cache = get_cache('locmem://?max_entries=3&eviction=lru')
+        cache.set('key1', 1)
+        cache.set('key2', 2)
+        cache.set('key3', 3)
+        # Reading key1 makes key2 the least recently used entry.
+        self.assertEqual(cache.get('key1'), 1)
+        cache.set('key4', 4)
+        self.assertEqual(cache.get_many(['key1', 'key2', 'key3', 'key4']),
+                         {'key1': 1, 'key3': 3, 'key4': 4})
+        # Setting a key again uses it too.
+        cache.set('key3', 3)
+        cache.set('key5', 5)
+        self.assertEqual(cache.get('key1'), None)
+        self.assertEqual(cache.get_stats()['evictions'], 2)
+        self.assertEqual(cache.get_stats()['entries'], 3)
+
+    def test_max_bytes(self):
+        super(LocMemLRUCacheTests, self).test_max_bytes()
+        cache = get_cache('locmem://?max_bytes=1000&eviction=lru')
+        for i in range(4):
+            cache.set('key%d' % i, 'x' * 200)
+        cache.get('key0')
+        cache.set('key4', 'x' * 200)
+        self.assertEqual(cache.get('key1'), None)
+        self.assertEqual(cache.get('key0'), 'x' * 200)
+
 # memcached backend isn't guaranteed to be available.
 # To check the memcached backend, the test settings file will
 # need to contain a CACHE_BACKEND setting that points at
@@ -377,6 +739,237 @@ if settings.CACHE_BACKEND.startswith('memcached://'):
         def setUp(self):
             self.cache = get_cache(settings.CACHE_BACKEND)
 
+class FakeMemcachedServer(object):
+    """
+    An in-process stand-in for a memcached server, with the interface of a
+    python-memcached client connected to it. Requests fail with a socket
+    error while 'down' is True.
+    """
+    def __init__(self):
+        self.data = {}
+        self.down = False
+        self.requests = 0
+
+    def _request(self):
+        if self.down:
+            raise socket.error('Connection refused')
+        self.requests += 1
+
+    def _expires(self, timeout):
+        if not timeout:
+            return None
+        if timeout > 2592000:
+            return timeout
+        return time.time() + timeout
+
+    def _get(self, key):
+        try:
+            value, expires = self.data[key]
+        except KeyError:
+            return None
+        if expires is not None and expires <= time.time():
+            del self.data[key]
+            return None
+        return pickle.loads(value)
+
+    def get(self, key):
+        self._request()
+        return self._get(key)
+
+    def get_multi(self, keys):
+        self._request()
+        d = {}
+        for key in keys:
+            value = self._get(key)
+            if value is not None:
+                d[key] = value
+        return d
+
+    def set(self, key, value, timeout=0):
+        self._request()
+        self.data[key] = (pickle.dumps(value), self._expires(timeout))
+        return True
+
+    def set_multi(self, data, timeout=0):
+        self._request()
+        for key, value in data.items():
+            self.data[key] = (pickle.dumps(value), self._expires(timeout))
+        return []
+
+    def add(self, key, value, timeout=0):
+        self._request()
+        if self._get(key) is not None:
+            return False
+        self.data[key] = (pickle.dumps(value), self._expires(timeout))
+        return True
+
+    def delete(self, key):
+        self._request()
+        self.data.pop(key, None)
+        return True
+
+    def delete_multi(self, keys):
+        self._request()
+        for key in keys:
+            self.data.pop(key, None)
+        return True
+
+    def incr(self, key, delta=1):
+        self._request()
+        value = self._get(key)
+        if value is None:
+            return None
+        value = int(value) + delta
+        self.data[key] = (pickle.dumps(value), self.data[key][1])
+        return value
+
+    def decr(self, key, delta=1):
+        return self.incr(key, -delta)
+
+    def flush_all(self):
+        self._request()
+        self.data.clear()
+
+    def disconnect_all(self):
+        pass
+
+class FakeMemcachedCache(memcached.CacheClass):
+    """
+    The memcached backend, talking to FakeMemcachedServers.
+    """
+    servers = {}
+
+    def _get_client(self, server):
+        return self.servers.setdefault(server, FakeMemcachedServer())
+
+class MemcachedRingTests(unittest.TestCase, BaseCacheTests):
+    """
+    Tests for the consistent hashing, replication and failover of the
+    memcached backend, run against fake in-process servers.
+    """
+    def setUp(self):
+        FakeMemcachedCache.servers = {}
+        self.servers = ['10.0.0.%d:11211' % i for i in range(1, 5)]
+        self.cache = self.get_cache(self.servers[:3])
+
+    def get_cache(self, servers, **params):
+        return FakeMemcachedCache(';'.join(servers), params)
+
+    def locations(self, keys):
+        """
+        Maps each key to the set of servers holding a value for it.
+        """
+        result = {}
+        for key in keys:
+            result[key] = set([name for name, server in FakeMemcachedCache.servers.items()
+                               if self.cache.make_key(key) in server.data])
+        return result
+
+    def test_ring(self):
+        ring = memcached.HashRing(['a', 'b', 'c'])
+        nodes = list(ring.iter_nodes('key'))
+        self.assertEqual(sorted(nodes), ['a', 'b', 'c'])
+        self.assertEqual(list(ring.iter_nodes('key')), nodes)
+        self.assertEqual(list(memcached.HashRing([]).iter_nodes('key')), [])
+
+    def test_distribution(self):
+        keys = ['key%d' % i for i in range(300)]
+        self.cache.set_many(dict([(key, key) for key in keys]))
+        for name in self.servers[:3]:
+            # Each server gets a fair share of the keys.
+            self.assertTrue(50 < len(FakeMemcachedCache.servers[name].data) < 150)
+        before = self.locations(keys)
+
+        # Adding a server only moves the keys that now belong to it.
+        cache = self.get_cache(self.servers)
+        cache.clear()
+        cache.set_many(dict([(key, key) for key in keys]))
+        after = self.locations(keys)
+        moved = [key for key in keys if before[key] != after[key]]
+        self.assertTrue(0 < len(moved) < 150)
+        for key in moved:
+            self.assertEqual(after[key], set([self.servers[3]]))
+
+    def test_get_many_one_request_per_server(self):
+        keys = ['key%d' % i for i in range(30)]
+        self.cache.set_many(dict([(key, key) for key in keys]))
+        for server in FakeMemcachedCache.servers.values():
+            server.requests = 0
+        self.assertEqual(self.cache.get_many(keys), dict([(key, key) for key in keys]))
+        for server in FakeMemcachedCache.servers.values():
+            self.assertEqual(server.requests, 1)
+
+    def test_replicas(self):
+        cache = self.get_cache(self.servers[:3], replicas=2)
+        keys = ['key%d' % i for i in range(30)]
+        cache.set_many(dict([(key, key) for key in keys]))
+        cache.set('single', 'value')
+        self.assertTrue(cache.add('added', 'value'))
+        for servers in self.locations(keys + ['single', 'added']).values():
+            self.assertEqual(len(servers), 2)
+
+        # The values survive the loss of a server.
+        FakeMemcachedCache.servers[self.servers[0]].down = True
+        self.assertEqual(cache.get_many(keys), dict([(key, key) for key in keys]))
+        self.assertEqual(cache.get('single'), 'value')
+
+        cache.delete('single')
+        self.assertEqual(cache.get('single'), None)
+        cache.delete_many(keys)
+        self.assertEqual(cache.get_many(keys), {})
+
+    def test_replicated_incr(self):
+        cache = self.get_cache(self.servers[:3], replicas=2)
+        cache.set('counter', 1)
+        self.assertEqual(cache.incr('counter'), 2)
+        self.assertEqual(cache.decr('counter', 2), 0)
+        self.assertRaises(ValueError, cache.incr, 'does_not_exist')
+        servers = list(self.locations(['counter'])['counter'])
+        FakeMemcachedCache.servers[servers[0]].down = True
+        self.assertEqual(cache.get('counter'), 0)
+
+    def test_dead_server(self):
+        keys = ['key%d' % i for i in range(30)]
+        dead = self.servers[0]
+        FakeMemcachedCache.servers[dead].down = True
+        self.cache.set_many(dict([(key, key) for key in keys]))
+        # The keys of the dead server went to the others.
+        self.assertEqual(self.cache.get_many(keys), dict([(key, key) for key in keys]))
+        self.assertEqual(FakeMemcachedCache.servers[dead].data, {})
+        self.assertTrue(self.cache._dead_until[dead] > time.time())
+
+        # The server isn't tried again until it's due for a retry.
+        FakeMemcachedCache.servers[dead].down = False
+        self.cache.set('key', 'value')
+        self.cache.get_many(keys)
+        self.assertEqual(FakeMemcachedCache.servers[dead].requests, 0)
+
+        self.cache._dead_until[dead] = 0
+        self.cache.set_many(dict([(key, key) for key in keys]))
+        self.assertTrue(FakeMemcachedCache.servers[dead].data)
+        self.assertFalse(dead in self.cache._failures)
+
+    def test_dead_server_backoff(self):
+        dead = self.servers[0]
+        FakeMemcachedCache.servers[dead].down = True
+        delays = []
+        for i in range(3):
+            self.cache._dead_until[dead] = 0
+            self.cache.clear()
+            delays.append(self.cache._dead_until[dead] - time.time())
+        self.assertTrue(25 < delays[0] <= 30)
+        self.assertTrue(55 < delays[1] <= 60)
+        self.assertTrue(115 < delays[2] <= 120)
+
+    def test_all_servers_dead(self):
+        for server in FakeMemcachedCache.servers.values():
+            server.down = True
+        self.cache.set('key', 'value')
+        self.assertEqual(self.cache.get('key', 'default'), 'default')
+        self.assertEqual(self.cache.add('key', 'value'), False)
+        self.assertEqual(self.cache.get_many(['key']), {})
+        self.assertRaises(ValueError, self.cache.incr, 'key')
+
 class FileBasedCacheTests(unittest.TestCase, BaseCacheTests):
     """
     Specific test cases for the file-based cache.
@@ -385,10 +978,28 @@ class FileBasedCacheTests(unittest.TestCase, BaseCacheTests):
         self.dirname = tempfile.mkdtemp()
         self.cache = get_cache('file://%s' % self.dirname)
 
+    def test_serializer(self):
+        self.check_serializer(get_cache('file://%s?serializer=json&compress_min_length=50' % self.dirname))
+
+    def test_corrupt_entry(self):
+        # Entries that can't be loaded are missing, whichever the serializer.
+        for serializer in ('pickle', 'marshal', 'json'):
+            cache = get_cache('file://%s?serializer=%s' % (self.dirname, serializer))
+            cache.set('corrupt', 'value')
+            fname = cache._digest_to_file(cache._key_to_digest(cache.make_key('corrupt')))
+            f = open(fname, 'rb')
+            exp = pickle.load(f)
+            f.close()
+            f = open(fname, 'wb')
+            pickle.dump(exp, f, pickle.HIGHEST_PROTOCOL)
+            f.write('corrupt')
+            f.close()
+            self.assertEqual(cache.get('corrupt', 'default'), 'default')
+
     def test_hashing(self):
         """Test that keys are hashed into subdirectories correctly"""
         self.cache.set("foo", "bar")
-        keyhash = md5_constructor("foo").hexdigest()
+        keyhash = md5_constructor(self.cache.make_key("foo")).hexdigest()
         keypath = os.path.join(self.dirname, keyhash[:2], keyhash[2:4], keyhash[4:])
         self.assert_(os.path.exists(keypath))
 
@@ -397,7 +1008,7 @@ class FileBasedCacheTests(unittest.TestCase, BaseCacheTests):
         Make sure that the created subdirectories are correctly removed when empty.
         """
         self.cache.set("foo", "bar")
-        keyhash = md5_constructor("foo").hexdigest()
+        keyhash = md5_constructor(self.cache.make_key("foo")).hexdigest()
         keypath = os.path.join(self.dirname, keyhash[:2], keyhash[2:4], keyhash[4:])
         self.assert_(os.path.exists(keypath))
 
@@ -406,6 +1017,144 @@ class FileBasedCacheTests(unittest.TestCase, BaseCacheTests):
         self.assert_(not os.path.exists(os.path.dirname(keypath)))
         self.assert_(not os.path.exists(os.path.dirname(os.path.dirname(keypath))))
 
+    def test_key_prefix(self):
+        # Caches with different key prefixes don't see each other's keys,
+        # even when they share the same storage
+        other = get_cache('file://%s?key_prefix=other' % self.dirname)
+        self.cache.set('key', 'value')
+        other.set('key', 'other value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(other.get('key'), 'other value')
+        other.delete('key')
+        self.assertEqual(self.cache.get('key'), 'value')
+
+    def test_no_temporary_files(self):
+        self.cache.set("foo", "bar")
+        self.cache.set("foo", "baz")
+        keypath = self.cache._key_to_file(self.cache.make_key("foo"))
+        self.assertEqual(os.listdir(os.path.dirname(keypath)), [os.path.basename(keypath)])
+        self.assertEqual(self.cache.get("foo"), "baz")
+
+    def test_cull(self):
+        cache = get_cache('file://%s?max_entries=30' % self.dirname)
+        for i in range(50):
+            cache.set('cull%d' % i, 'value', 1000 + i)
+        self.assertTrue(cache._num_entries <= 30)
+        # The entries that expire soonest were removed.
+        self.assertEqual(cache.get('cull0'), None)
+        self.assertEqual(cache.get('cull49'), 'value')
+        count = 0
+        for _, _, files in os.walk(self.dirname):
+            count += len(files)
+        # The index file is there too.
+        self.assertEqual(count, cache._num_entries + 1)
+
+    def test_cull_expired_first(self):
+        cache = get_cache('file://%s?max_entries=10&cull_frequency=10' % self.dirname)
+        for i in range(5):
+            cache.set('expired%d' % i, 'value', 1)
+        for i in range(5):
+            cache.set('cull%d' % i, 'value')
+        time.sleep(2)
+        cache.set('new', 'value')
+        self.assertEqual(cache._num_entries, 6)
+        for i in range(5):
+            self.assertFalse(os.path.exists(cache._key_to_file(cache.make_key('expired%d' % i))))
+            self.assertEqual(cache.get('cull%d' % i), 'value')
+
+    def test_index(self):
+        cache = get_cache('file://%s?max_entries=5' % self.dirname)
+        for i in range(5):
+            cache.set('key%d' % i, 'value')
+        self.assertEqual(cache._num_entries, 5)
+        # The index is saved, and other instances read it instead of scanning
+        # the directory.
+        cache.set('key5', 'value')
+        self.assertTrue(os.path.exists(os.path.join(self.dirname, 'index')))
+        other = get_cache('file://%s' % self.dirname)
+        other._scan = None
+        self.assertEqual(other._num_entries, cache._num_entries)
+        # Without the index file, the directory is scanned.
+        os.remove(os.path.join(self.dirname, 'index'))
+        other = get_cache('file://%s' % self.dirname)
+        self.assertEqual(other._num_entries, cache._num_entries)
+        self.assertEqual(other._index, cache._index)
+
+    def test_shared_max_entries(self):
+        # Two instances sharing the directory stand for two processes: each
+        # counts the entries the other stored.
+        cache = get_cache('file://%s?max_entries=10' % self.dirname)
+        other = get_cache('file://%s?max_entries=10' % self.dirname)
+        for i in range(20):
+            cache.set('cache%d' % i, 'value')
+            other.set_many({'other%d' % i: 'value'})
+        count = 0
+        for _, _, files in os.walk(self.dirname):
+            count += len(files)
+        # The index file is there too.
+        self.assertTrue(count <= 11)
+
+class TieredCacheTests(unittest.TestCase, BaseCacheTests):
+    """
+    Specific test cases for the tiered cache. Two instances sharing a
+    file-based cache stand for two processes.
+    """
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+        self.cache = get_cache('tiered://file:%s?l1_timeout=60' % self.dirname)
+        self.other = get_cache('tiered://file:%s?l1_timeout=60' % self.dirname)
+
+    def test_backend(self):
+        self.assertEqual(self.cache._l2._dir, self.dirname)
+        self.assertEqual(self.cache._l1_timeout, 60)
+        cache = get_cache('tiered://locmem:?timeout=30&max_entries=5')
+        self.assertEqual(cache.default_timeout, 30)
+        self.assertEqual(cache._l2.default_timeout, 30)
+        self.assertEqual(cache._l2._max_entries, 5)
+        self.assertEqual(cache._l1_timeout, 5)
+        self.assertRaises(InvalidCacheBackendError, get_cache, 'tiered://')
+
+    def test_local_cache(self):
+        # Values are served from the local cache...
+        self.cache.set('key', 'value')
+        self.cache._l2.set('key', 'changed')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.cache.get_many(['key']), {'key': 'value'})
+        # ...and fetched from the shared cache when they aren't in it.
+        self.assertEqual(self.other.get('key'), 'changed')
+        self.other._l2.set('key2', 'value2')
+        self.assertEqual(self.other.get_many(['key', 'key2']), {'key': 'changed', 'key2': 'value2'})
+        self.assertEqual(self.other.get_stats()['hits'], 1)
+        self.assertEqual(self.other.get_stats()['entries'], 2)
+
+    def test_local_timeout(self):
+        cache = get_cache('tiered://file:%s?l1_timeout=1' % self.dirname)
+        cache.set('key', 'value')
+        self.cache._l2.set('key', 'changed')
+        self.assertEqual(cache.get('key'), 'value')
+        time.sleep(2)
+        self.assertEqual(cache.get('key'), 'changed')
+
+    def test_invalidate(self):
+        self.assertEqual(self.cache.get('key'), None)
+        self.assertEqual(self.other.get('key'), None)
+        self.cache.set('key', 'value')
+        self.other.set('key', 'changed')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.other.invalidate()
+        # The other process notices the new generation when it next checks.
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.cache._generation_checked = 0
+        self.assertEqual(self.cache.get('key'), 'changed')
+
+    def test_incr_updates_local_cache(self):
+        self.cache.set('answer', 41)
+        self.assertEqual(self.other.get('answer'), 41)
+        self.assertEqual(self.other.incr('answer'), 42)
+        self.assertEqual(self.other.get('answer'), 42)
+        self.assertEqual(self.other.decr('answer', 2), 40)
+        self.assertEqual(self.other.get('answer'), 40)
+
 class CacheUtils(unittest.TestCase):
     """TestCase for django.utils.cache functions."""
 
@@ -473,6 +1222,68 @@ class CacheUtils(unittest.TestCase):
         learn_cache_key(request, response)
         self.assertEqual(get_cache_key(request), 'views.decorators.cache.cache_page.settingsprefix.a8c87a3d8c44853d7f79474f7ffe4ad5.d41d8cd98f00b204e9800998ecf8427e')
 
+class StaleCacheMiddlewareTest(unittest.TestCase):
+
+    def setUp(self):
+        self.orig_cache_middleware_seconds = settings.CACHE_MIDDLEWARE_SECONDS
+        self.orig_cache_middleware_key_prefix = settings.CACHE_MIDDLEWARE_KEY_PREFIX
+        self.orig_cache_middleware_stale_seconds = settings.CACHE_MIDDLEWARE_STALE_SECONDS
+        settings.CACHE_MIDDLEWARE_SECONDS = 1
+        settings.CACHE_MIDDLEWARE_KEY_PREFIX = 'stale'
+        settings.CACHE_MIDDLEWARE_STALE_SECONDS = 60
+
+    def tearDown(self):
+        settings.CACHE_MIDDLEWARE_SECONDS = self.orig_cache_middleware_seconds
+        settings.CACHE_MIDDLEWARE_KEY_PREFIX = self.orig_cache_middleware_key_prefix
+        settings.CACHE_MIDDLEWARE_STALE_SECONDS = self.orig_cache_middleware_stale_seconds
+
+    def _get_request(self, path='/cache/stale/'):
+        request = HttpRequest()
+        request.META = {
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': 80,
+        }
+        request.path = request.path_info = path
+        request.method = 'GET'
+        return request
+
+    def _render(self, request, content):
+        self.assertEqual(FetchFromCacheMiddleware().process_request(request), None)
+        self.assertTrue(request._cache_update_cache)
+        return UpdateCacheMiddleware().process_response(request, HttpResponse(content))
+
+    def test_stale_response(self):
+        self._render(self._get_request(), 'first')
+        response = FetchFromCacheMiddleware().process_request(self._get_request())
+        self.assertEqual(response.content, 'first')
+
+        time.sleep(2)
+        # The first request after the page went out of date regenerates it...
+        request = self._get_request()
+        self.assertEqual(FetchFromCacheMiddleware().process_request(request), None)
+        self.assertTrue(request._cache_update_cache)
+        # ...while the others are served the stale copy.
+        response = FetchFromCacheMiddleware().process_request(self._get_request())
+        self.assertEqual(response.content, 'first')
+
+        UpdateCacheMiddleware().process_response(request, HttpResponse('second'))
+        response = FetchFromCacheMiddleware().process_request(self._get_request())
+        self.assertEqual(response.content, 'second')
+
+    def test_plain_response(self):
+        # Pages cached before CACHE_MIDDLEWARE_STALE_SECONDS was set are
+        # regenerated...
+        settings.CACHE_MIDDLEWARE_STALE_SECONDS = 0
+        self._render(self._get_request('/cache/stale/plain/'), 'plain')
+        settings.CACHE_MIDDLEWARE_STALE_SECONDS = 60
+        self._render(self._get_request('/cache/stale/plain/'), 'refreshable')
+        response = FetchFromCacheMiddleware().process_request(self._get_request('/cache/stale/plain/'))
+        self.assertEqual(response.content, 'refreshable')
+        # ...and pages cached while it was set are still read once it isn't.
+        settings.CACHE_MIDDLEWARE_STALE_SECONDS = 0
+        response = FetchFromCacheMiddleware().process_request(self._get_request('/cache/stale/plain/'))
+        self.assertEqual(response.content, 'refreshable')
+
 class CacheI18nTest(unittest.TestCase):
 
     def setUp(self):
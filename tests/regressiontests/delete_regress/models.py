@@ -35,3 +35,19 @@ class PlayedWith(models.Model):
 class PlayedWithNote(models.Model):
     played = models.ForeignKey(PlayedWith)
     note = models.TextField()
+
+class Folder(models.Model):
+    name = models.CharField(max_length=50)
+
+class Attachment(models.Model):
+    folder = models.ForeignKey(Folder)
+
+class Document(models.Model):
+    folder = models.ForeignKey(Folder)
+
+class Revision(models.Model):
+    document = models.ForeignKey(Document)
+
+class FolderProxy(Folder):
+    class Meta:
+        proxy = True
@@ -2,9 +2,11 @@ import datetime
 
 from django.conf import settings
 from django.db import backend, connection, transaction, DEFAULT_DB_ALIAS
+from django.db.models import signals
 from django.test import TestCase, TransactionTestCase
 
-from models import Book, Award, AwardNote, Person, Child, Toy, PlayedWith, PlayedWithNote
+from models import (Book, Award, AwardNote, Person, Child, Toy, PlayedWith,
+    PlayedWithNote, Folder, FolderProxy, Attachment, Document, Revision)
 
 # Can't run this test under SQLite, because you can't
 # get two connections to an in-memory database.
@@ -114,3 +116,116 @@ class LargeDeleteTests(TestCase):
             track = Book.objects.create(pagecount=x+100)
         Book.objects.all().delete()
         self.assertEquals(Book.objects.count(), 0)
+
+class BulkDeleteTests(TestCase):
+    def setUp(self):
+        self.old_debug = settings.DEBUG
+        settings.DEBUG = True
+        self.folder = Folder.objects.create(name='reports')
+        self.other = Folder.objects.create(name='drafts')
+        for i in range(150):
+            Attachment.objects.create(folder=self.folder)
+        Attachment.objects.create(folder=self.other)
+        self.inits = []
+
+    def tearDown(self):
+        settings.DEBUG = self.old_debug
+
+    def count_init(self, sender, **kwargs):
+        self.inits.append(sender)
+
+    def count_queries(self, func, *args):
+        connection.queries = []
+        func(*args)
+        return len(connection.queries)
+
+    def test_fast_delete_related(self):
+        """
+        Related objects without signal receivers or relations of their own
+        are deleted without being fetched.
+        """
+        # Delete the attachments, look for documents and delete the folder.
+        self.assertEqual(self.count_queries(self.folder.delete), 3)
+        self.assertEqual(Attachment.objects.count(), 1)
+        self.assertEqual(self.folder.pk, None)
+
+    def test_fast_delete_queryset(self):
+        self.assertEqual(self.count_queries(Attachment.objects.filter(
+            folder=self.folder).delete), 1)
+        self.assertEqual(Attachment.objects.count(), 1)
+
+    def test_fast_delete_queryset_with_joins(self):
+        # The primary keys are looked up first, then deleted in two batches.
+        self.assertEqual(self.count_queries(Attachment.objects.filter(
+            folder__name='reports').delete), 3)
+        self.assertEqual(Attachment.objects.count(), 1)
+
+    def test_fast_delete_all(self):
+        self.assertEqual(self.count_queries(Attachment.objects.all().delete), 1)
+        self.assertEqual(Attachment.objects.count(), 0)
+
+    def test_signals_receivers_get_instances(self):
+        deleted = []
+        def receiver(sender, instance, **kwargs):
+            deleted.append(instance.pk)
+        signals.post_delete.connect(receiver, sender=Attachment)
+        try:
+            self.folder.delete()
+        finally:
+            signals.post_delete.disconnect(receiver, sender=Attachment)
+        self.assertEqual(len(deleted), 150)
+        self.assertEqual(Attachment.objects.count(), 1)
+
+    def test_cascade_in_batches(self):
+        """
+        Related objects that have relations of their own are only fetched as
+        primary keys, a batch at a time.
+        """
+        for i in range(150):
+            Revision.objects.create(
+                document=Document.objects.create(folder=self.folder))
+        signals.post_init.connect(self.count_init)
+        try:
+            # Fetch the documents' pks, delete attachments, revisions (two
+            # batches), documents (two batches) and the folder.
+            self.assertEqual(self.count_queries(self.folder.delete), 7)
+        finally:
+            signals.post_init.disconnect(self.count_init)
+        self.assertEqual(self.inits, [])
+        self.assertEqual(Document.objects.count(), 0)
+        self.assertEqual(Revision.objects.count(), 0)
+        self.assertEqual(Folder.objects.count(), 1)
+
+    def test_delete_proxy(self):
+        """
+        Deleting objects through a proxy model deletes the objects related to
+        the proxied model.
+        """
+        document = Document.objects.create(folder=self.folder)
+        Revision.objects.create(document=document)
+        FolderProxy.objects.get(pk=self.folder.pk).delete()
+        self.assertEqual(Attachment.objects.count(), 1)
+        self.assertEqual(Document.objects.count(), 0)
+        self.assertEqual(Revision.objects.count(), 0)
+
+        document = Document.objects.create(folder=self.other)
+        Revision.objects.create(document=document)
+        FolderProxy.objects.all().delete()
+        self.assertEqual(Attachment.objects.count(), 0)
+        self.assertEqual(Document.objects.count(), 0)
+        self.assertEqual(Revision.objects.count(), 0)
+        self.assertEqual(Folder.objects.count(), 0)
+
+    def test_delete_proxy_signals(self):
+        senders = []
+        def receiver(sender, instance, **kwargs):
+            senders.append(sender)
+        signals.pre_delete.connect(receiver, sender=FolderProxy)
+        signals.post_delete.connect(receiver, sender=FolderProxy)
+        try:
+            FolderProxy.objects.filter(pk=self.other.pk).delete()
+        finally:
+            signals.pre_delete.disconnect(receiver, sender=FolderProxy)
+            signals.post_delete.disconnect(receiver, sender=FolderProxy)
+        self.assertEqual(senders, [FolderProxy, FolderProxy])
+        self.assertEqual(Attachment.objects.count(), 150)
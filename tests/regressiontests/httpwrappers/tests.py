@@ -222,6 +222,14 @@ class HttpResponseTests(unittest.TestCase):
         self.assertRaises(BadHeaderError, r.__setitem__, 'test\rstr', 'test')
         self.assertRaises(BadHeaderError, r.__setitem__, 'test\nstr', 'test')
 
+    def test_iterator_content(self):
+        # Reading the content of a response built from an iterator doesn't
+        # prevent iterating over it afterwards.
+        r = HttpResponse(iter([u'abc', u'd\xe9f']))
+        self.assertEqual(r.content, 'abcd\xc3\xa9f')
+        self.assertEqual(list(r), ['abc', 'd\xc3\xa9f'])
+        self.assertEqual(r.content, 'abcd\xc3\xa9f')
+
 class CookieTests(unittest.TestCase):
     def test_encode(self):
         """
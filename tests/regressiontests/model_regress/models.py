@@ -50,6 +50,14 @@ class Worker(models.Model):
     def __unicode__(self):
         return self.name
 
+class Tally(models.Model):
+    name = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    def __init__(self, *args, **kwargs):
+        super(Tally, self).__init__(*args, **kwargs)
+        self.initial_count = self.count
+
 class BrokenUnicodeMethod(models.Model):
     name = models.CharField(max_length=7)
 
@@ -1,6 +1,8 @@
-from models import Worker
+from django.db.models import signals
 from django.test import TestCase
 
+from models import Department, Tally, Worker
+
 class RelatedModelOrderedLookupTest(TestCase):
     """
     Regression test for #10153: foreign key __gte and __lte lookups.
@@ -14,3 +16,43 @@ class RelatedModelOrderedLookupTest(TestCase):
 
     def test_related_lte_lookup(self):
         Worker.objects.filter(department__lte=0)
+
+
+class LoadedInstanceTests(TestCase):
+    def setUp(self):
+        self.department = Department.objects.create(id=1, name='Sales')
+        Worker.objects.create(department=self.department, name='Bob')
+
+    def test_loaded_instances(self):
+        worker = Worker.objects.get(name='Bob')
+        self.assertEqual(worker.name, 'Bob')
+        self.assertEqual(worker.department_id, 1)
+        self.assertEqual(worker._state.db, 'default')
+        worker = Worker.objects.select_related('department').get()
+        self.assertEqual(worker.department.name, 'Sales')
+        self.assertEqual(worker.department._state.db, 'default')
+        worker = Worker.objects.defer('name').get()
+        self.assertEqual(worker.department_id, 1)
+        self.assertFalse('name' in worker.__dict__)
+        self.assertEqual(worker.name, 'Bob')
+
+    def test_init_signals(self):
+        received = []
+        def receiver(sender, **kwargs):
+            received.append((sender, kwargs.get('instance')))
+        signals.pre_init.connect(receiver, sender=Worker)
+        signals.post_init.connect(receiver, sender=Worker)
+        try:
+            worker = Worker.objects.get(name='Bob')
+        finally:
+            signals.pre_init.disconnect(receiver, sender=Worker)
+            signals.post_init.disconnect(receiver, sender=Worker)
+        self.assertEqual(received, [(Worker, None), (Worker, worker)])
+        self.assertEqual(worker._state.db, 'default')
+
+    def test_overridden_init(self):
+        Tally.objects.create(name='votes', count=3)
+        tally = Tally.objects.get()
+        self.assertEqual(tally.initial_count, 3)
+        tally = Tally.objects.only('name').get()
+        self.assertEqual(tally.initial_count, 3)
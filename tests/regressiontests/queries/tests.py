@@ -81,3 +81,91 @@ class CloneTests(TestCase):
             self.assertEquals(ExtraInfo.objects.filter(note__in=n_list)[0].info, 'good')
         except:
             self.fail('Query should be clonable')
+
+    def test_where_tree_is_shared(self):
+        qs = Tag.objects.filter(name='t1', parent__name='t2')
+        clone = qs.query.clone()
+        self.assertFalse(clone.where is qs.query.where)
+        self.assertEqual(len(clone.where.children), 2)
+        for original, copied in zip(qs.query.where.children, clone.where.children):
+            self.assertTrue(original is copied)
+
+    def test_clone_is_independent(self):
+        t1 = Tag.objects.create(name='t1')
+        t2 = Tag.objects.create(name='t2', parent=t1)
+        qs = Tag.objects.filter(parent__name='t1')
+        sql = str(qs.query)
+        clone = qs.exclude(name='t2')
+        self.assertEqual(str(qs.query), sql)
+        self.assertEqual(list(qs), [t2])
+        self.assertEqual(list(clone), [])
+
+    def test_relabelling_clone(self):
+        qs = Tag.objects.filter(parent__name='t1')
+        sql = str(qs.query)
+        clone = qs.query.clone()
+        clone.bump_prefix()
+        self.assertNotEqual(str(clone), sql)
+        self.assertEqual(str(qs.query), sql)
+        # Both queries still work once nested in another query.
+        Tag.objects.create(name='t1')
+        self.assertEqual(list(Tag.objects.filter(pk__in=qs)), [])
+        self.assertEqual(list(Tag.objects.filter(pk__in=qs.values('pk'))), [])
+
+class SQLCacheTests(TestCase):
+    def setUp(self):
+        self.connection = connections[DEFAULT_DB_ALIAS]
+        self.old_cache = self.connection.sql_cache
+        self.old_size = self.connection.settings_dict['SQL_CACHE_SIZE']
+        self.connection.sql_cache = {}
+        self.connection.settings_dict['SQL_CACHE_SIZE'] = 10
+        self.t1 = Tag.objects.create(name='t1')
+        self.t2 = Tag.objects.create(name='t2', parent=self.t1)
+        self.t3 = Tag.objects.create(name='t3', parent=self.t1)
+
+    def tearDown(self):
+        self.connection.sql_cache = self.old_cache
+        self.connection.settings_dict['SQL_CACHE_SIZE'] = self.old_size
+
+    def assertSameSQL(self, qs):
+        """
+        The cached SQL of a query is what compiling it would produce.
+        """
+        compiler = qs.query.get_compiler(DEFAULT_DB_ALIAS)
+        cached = compiler.as_sql()
+        compiler = qs.query.clone().get_compiler(DEFAULT_DB_ALIAS)
+        self.assertEqual(cached, compiler.as_uncached_sql())
+
+    def test_same_shape_shares_sql(self):
+        self.assertEqual(list(Tag.objects.filter(name='t1')), [self.t1])
+        self.assertEqual(len(self.connection.sql_cache), 1)
+        self.assertEqual(list(Tag.objects.filter(name='t2')), [self.t2])
+        self.assertEqual(len(self.connection.sql_cache), 1)
+        self.assertSameSQL(Tag.objects.filter(name='t3'))
+
+    def test_different_shapes(self):
+        self.assertEqual(list(Tag.objects.filter(pk__in=[self.t1.pk])), [self.t1])
+        self.assertEqual(list(Tag.objects.filter(pk__in=[self.t1.pk, self.t2.pk])),
+                         [self.t1, self.t2])
+        self.assertEqual(list(Tag.objects.filter(parent__isnull=True)), [self.t1])
+        self.assertEqual(list(Tag.objects.filter(parent__isnull=False)),
+                         [self.t2, self.t3])
+        self.assertEqual(list(Tag.objects.exclude(name='t1')), [self.t2, self.t3])
+        self.assertEqual(list(Tag.objects.filter(name='t1')[1:]), [])
+        self.assertEqual(len(self.connection.sql_cache), 6)
+        self.assertSameSQL(Tag.objects.filter(parent__name='t1').order_by('-name'))
+        self.assertSameSQL(Tag.objects.values_list('name', flat=True).distinct())
+
+    def test_uncacheable(self):
+        list(Tag.objects.extra(select={'a': '1'}))
+        list(Tag.objects.select_related('parent'))
+        self.assertEqual(Tag.objects.count(), 3)
+        self.assertEqual(len(self.connection.sql_cache), 0)
+        # Only the subquery is cached.
+        list(Tag.objects.filter(parent__in=Tag.objects.filter(name='t1')))
+        self.assertEqual(len(self.connection.sql_cache), 1)
+
+    def test_size_limit(self):
+        for i in range(1, 12):
+            list(Tag.objects.filter(pk__in=range(i)))
+        self.assertEqual(len(self.connection.sql_cache), 1)
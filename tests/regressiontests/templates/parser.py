@@ -86,7 +86,7 @@ TemplateSyntaxError: Variables and attributes may not begin with underscores: 'a
 """
 
 variable_parsing = r"""
->>> from django.template import Variable
+>>> from django.template import Variable, VariableDoesNotExist
 
 >>> c = {'article': {'section': u'News'}}
 >>> Variable('article.section').resolve(c)
@@ -118,4 +118,41 @@ Variables should reject access of attributes beginning with underscores.
 Traceback (most recent call last):
 ...
 TemplateSyntaxError: Variables and attributes may not begin with underscores: 'article._hidden'
+
+The way each bit was looked up in objects of each type is remembered, which
+mustn't change the result of resolving the variable in other objects, even of
+the same type.
+
+>>> class Article(object):
+...     def __init__(self, section):
+...         self.section = section
+>>> class Sections(list):
+...     pass
+>>> v = Variable('article.section')
+>>> sections = Sections(['News'])
+>>> sections.section = 'Sports'
+>>> for article in [{'section': 'News'}, {}, Article('Sports'), ['News'], sections] * 2:
+...     try:
+...         print repr(v.resolve({'article': article}))
+...     except VariableDoesNotExist:
+...         print 'VariableDoesNotExist'
+'News'
+VariableDoesNotExist
+'Sports'
+VariableDoesNotExist
+'Sports'
+'News'
+VariableDoesNotExist
+'Sports'
+VariableDoesNotExist
+'Sports'
+>>> v = Variable('articles.0.section')
+>>> v.resolve({'articles': [Article('News')]})
+'News'
+>>> v.resolve({'articles': (Article('Sports'),)})
+'Sports'
+>>> v.resolve({'articles': []})
+Traceback (most recent call last):
+...
+VariableDoesNotExist: Failed lookup for key [0] in u'[]'
 """
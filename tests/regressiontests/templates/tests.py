@@ -9,7 +9,9 @@ if __name__ == '__main__':
 from datetime import datetime, timedelta
 import time
 import os
+import shutil
 import sys
+import tempfile
 import traceback
 import unittest
 
@@ -17,6 +19,7 @@ from django import template
 from django.core import urlresolvers
 from django.template import loader
 from django.template.loaders import app_directories, filesystem, cached
+from django.utils import translation
 from django.utils.translation import activate, deactivate, ugettext as _
 from django.utils.safestring import mark_safe
 from django.utils.tzinfo import LocalTimezone
@@ -282,6 +285,168 @@ class Templates(unittest.TestCase):
             loader.template_source_loaders = old_loaders
             settings.TEMPLATE_DEBUG = old_td
 
+    def test_generate_include_missing(self):
+        """
+        Same as test_extends_include_missing_baseloader, with the template
+        streamed with generate() rather than rendered.
+        """
+        old_td, settings.TEMPLATE_DEBUG = settings.TEMPLATE_DEBUG, True
+        old_loaders = loader.template_source_loaders
+
+        try:
+            loader.template_source_loaders = (app_directories.Loader(),)
+
+            tmpl = loader.get_template('test_extends_error.html')
+            r = None
+            try:
+                r = u''.join(tmpl.generate(template.Context({})))
+            except template.TemplateSyntaxError, e:
+                self.assertEqual(e.args[0], 'Caught TemplateDoesNotExist while rendering: missing.html')
+            self.assertEqual(r, None, 'Template rendering unexpectedly succeeded, produced: ->%r<-' % r)
+        finally:
+            loader.template_source_loaders = old_loaders
+            settings.TEMPLATE_DEBUG = old_td
+
+    def test_generate_chunks(self):
+        t = template.Template('{% for i in items %}<li>{{ i }}</li>{% endfor %}')
+        c = template.Context({'items': range(2000)})
+        chunks = list(t.generate(c))
+        self.assertTrue(len(chunks) > 1)
+        for chunk in chunks[:-1]:
+            self.assertTrue(len(chunk) >= template.GENERATE_CHUNK_SIZE)
+        self.assertEqual(u''.join(chunks), t.render(c))
+        self.assertEqual(len(c.dicts), 1)
+        self.assertEqual(len(c.render_context.dicts), 1)
+
+    def test_cachebatch(self):
+        from django.templatetags import cache as cache_tags
+        calls = []
+        class CountingCache(object):
+            def __init__(self, cache):
+                self.cache = cache
+            def __getattr__(self, name):
+                calls.append(name)
+                return getattr(self.cache, name)
+        old_cache = cache_tags.cache
+        cache_tags.cache = CountingCache(old_cache)
+        try:
+            t = template.Template('{% load cache %}{% cachebatch %}{% for i in items %}'
+                                  '{% cache 2 cachebatch i %}{{ i }}{{ suffix }}{% endcache %}'
+                                  '{% endfor %}{% endcachebatch %}')
+            c = template.Context({'items': range(5), 'suffix': 'a'})
+            self.assertEqual(t.render(c), u'0a1a2a3a4a')
+            self.assertEqual(calls, ['get_many', 'set_many'])
+            self.assertEqual(len(c.dicts), 1)
+            self.assertEqual(len(c.render_context.dicts), 1)
+
+            calls[:] = []
+            c = template.Context({'items': range(7), 'suffix': 'b'})
+            self.assertEqual(t.render(c), u'0a1a2a3a4a5b6b')
+            self.assertEqual(calls, ['get_many', 'set_many'])
+
+            calls[:] = []
+            self.assertEqual(t.render(c), u'0a1a2a3a4a5b6b')
+            self.assertEqual(calls, ['get_many'])
+
+            # The block is only rendered once, so iterators aren't used up,
+            # and the missing fragments are rendered with the context they
+            # were found in.
+            t = template.Template('{% load cache %}{% cachebatch %}{% for i in items %}'
+                                  '{% for j in items2 %}{% cache 2 cachebatch2 i j %}'
+                                  '{{ i }}{{ j }}{{ forloop.counter }}{{ forloop.parentloop.last }} '
+                                  '{% endcache %}{% endfor %}{% endfor %}{% endcachebatch %}')
+            calls[:] = []
+            c = template.Context({'items': iter([1, 2]), 'items2': ['x', 'y']})
+            self.assertEqual(t.render(c), u'1x1False 1y2False 2x1True 2y2True ')
+            self.assertEqual(calls, ['get_many', 'set_many'])
+        finally:
+            cache_tags.cache = old_cache
+
+    def test_generate_language(self):
+        # The output is rendered in the language active when generate() was
+        # called, which is restored afterwards.
+        t = template.Template('{% load i18n %}{% get_current_language as lang %}{{ lang }}')
+        activate('de')
+        try:
+            chunks = t.generate(template.Context())
+        finally:
+            deactivate()
+        activate('fr')
+        try:
+            self.assertEqual(u''.join(chunks), u'de')
+            self.assertEqual(translation.get_language(), 'fr')
+        finally:
+            deactivate()
+
+    def test_generate_signal(self):
+        from django.test.signals import template_rendered
+        rendered = []
+        def receiver(sender, template, context, **kwargs):
+            rendered.append(template)
+        t = template.Template('{{ x }}')
+        template_rendered.connect(receiver)
+        try:
+            self.assertEqual(u''.join(t.generate(template.Context({'x': 1}))), u'1')
+        finally:
+            template_rendered.disconnect(receiver)
+        self.assertEqual(rendered, [t])
+
+    def test_cached_loader_saved_templates(self):
+        from django.core.management import call_command
+
+        template_dir = tempfile.mkdtemp()
+        def write(name, source):
+            f = open(os.path.join(template_dir, name), 'w')
+            f.write(source)
+            f.close()
+        write('base.html', '{% block content %}{% endblock %}')
+        write('child.html', '{% extends "base.html" %}{% block content %}'
+                            '{% for i in items %}{% if i > 1 %}{% include "item.html" %}{% endif %}{% endfor %}'
+                            '{% endblock %}')
+        write('item.html', '<{{ i }}>')
+        c = template.Context({'items': [1, 2, 3]})
+
+        old_settings = settings.TEMPLATE_DIRS, settings.TEMPLATE_DEBUG, settings.TEMPLATE_CACHE_FILE
+        old_loaders = loader.template_source_loaders
+        old_get_template_from_string = cached.get_template_from_string
+        try:
+            settings.TEMPLATE_DIRS = (template_dir,)
+            settings.TEMPLATE_DEBUG = False
+            settings.TEMPLATE_CACHE_FILE = os.path.join(template_dir, 'templates.cache')
+
+            def new_loader():
+                cache_loader = cached.Loader(('',))
+                cache_loader._cached_loaders = (filesystem.Loader(),)
+                loader.template_source_loaders = (cache_loader,)
+                return cache_loader
+
+            new_loader()
+            call_command('cachetemplates', verbosity=0)
+
+            # The templates are unpickled, not parsed.
+            def get_template_from_string(source, origin=None, name=None):
+                self.fail('%s was parsed' % name)
+            cached.get_template_from_string = get_template_from_string
+            cache_loader = new_loader()
+            self.assertEqual(loader.get_template('child.html').render(c), '<2><3>')
+
+            # Templates whose source changed are parsed again, and the
+            # included template isn't saved within the templates including it.
+            cached.get_template_from_string = old_get_template_from_string
+            write('item.html', '[{{ i }}]')
+            new_loader()
+            self.assertEqual(loader.get_template('child.html').render(c), '[2][3]')
+
+            cache_loader = new_loader()
+            loader.preload_templates()
+            self.assertEqual(sorted(cache_loader.template_cache.keys()),
+                             ['base.html', 'child.html', 'item.html'])
+        finally:
+            settings.TEMPLATE_DIRS, settings.TEMPLATE_DEBUG, settings.TEMPLATE_CACHE_FILE = old_settings
+            loader.template_source_loaders = old_loaders
+            cached.get_template_from_string = old_get_template_from_string
+            shutil.rmtree(template_dir)
+
     def test_token_smart_split(self):
         # Regression test for #7027
         token = template.Token(template.TOKEN_BLOCK, 'sometag _("Page not found") value|yesno:_("yes,no")')
@@ -354,6 +519,8 @@ class Templates(unittest.TestCase):
         old_invalid = settings.TEMPLATE_STRING_IF_INVALID
         expected_invalid_str = 'INVALID'
 
+        old_compile = settings.TEMPLATE_COMPILE
+
         # Warm the URL reversing cache. This ensures we don't pay the cost
         # warming the cache during one of the tests.
         urlresolvers.reverse('regressiontests.templates.views.client_action',
@@ -379,30 +546,34 @@ class Templates(unittest.TestCase):
             for invalid_str, result in [('', normal_string_result),
                                         (expected_invalid_str, invalid_string_result)]:
                 settings.TEMPLATE_STRING_IF_INVALID = invalid_str
-                for is_cached in (False, True):
+                # The cached template is also rendered with compiled code, and
+                # streamed with generate(), which must give the same results.
+                for is_cached, is_compiled, is_streamed in ((False, False, False), (True, False, False),
+                                                            (True, True, False), (True, False, True)):
+                    settings.TEMPLATE_COMPILE = is_compiled
                     try:
                         start = datetime.now()
                         test_template = loader.get_template(name)
                         end = datetime.now()
                         if end-start > timedelta(seconds=0.2):
-                            failures.append("Template test (Cached='%s', TEMPLATE_STRING_IF_INVALID='%s'): %s -- FAILED. Took too long to parse test" % (is_cached, invalid_str, name))
+                            failures.append("Template test (Cached='%s', Compiled='%s', Streamed='%s', TEMPLATE_STRING_IF_INVALID='%s'): %s -- FAILED. Took too long to parse test" % (is_cached, is_compiled, is_streamed, invalid_str, name))
 
                         start = datetime.now()
-                        output = self.render(test_template, vals)
+                        output = self.render(test_template, vals, is_streamed)
                         end = datetime.now()
                         if end-start > timedelta(seconds=0.2):
-                            failures.append("Template test (Cached='%s', TEMPLATE_STRING_IF_INVALID='%s'): %s -- FAILED. Took too long to render test" % (is_cached, invalid_str, name))
+                            failures.append("Template test (Cached='%s', Compiled='%s', Streamed='%s', TEMPLATE_STRING_IF_INVALID='%s'): %s -- FAILED. Took too long to render test" % (is_cached, is_compiled, is_streamed, invalid_str, name))
                     except ContextStackException:
-                        failures.append("Template test (Cached='%s', TEMPLATE_STRING_IF_INVALID='%s'): %s -- FAILED. Context stack was left imbalanced" % (is_cached, invalid_str, name))
+                        failures.append("Template test (Cached='%s', Compiled='%s', Streamed='%s', TEMPLATE_STRING_IF_INVALID='%s'): %s -- FAILED. Context stack was left imbalanced" % (is_cached, is_compiled, is_streamed, invalid_str, name))
                         continue
                     except Exception:
                         exc_type, exc_value, exc_tb = sys.exc_info()
                         if exc_type != result:
                             tb = '\n'.join(traceback.format_exception(exc_type, exc_value, exc_tb))
-                            failures.append("Template test (Cached='%s', TEMPLATE_STRING_IF_INVALID='%s'): %s -- FAILED. Got %s, exception: %s\n%s" % (is_cached, invalid_str, name, exc_type, exc_value, tb))
+                            failures.append("Template test (Cached='%s', Compiled='%s', Streamed='%s', TEMPLATE_STRING_IF_INVALID='%s'): %s -- FAILED. Got %s, exception: %s\n%s" % (is_cached, is_compiled, is_streamed, invalid_str, name, exc_type, exc_value, tb))
                         continue
                     if output != result:
-                        failures.append("Template test (Cached='%s', TEMPLATE_STRING_IF_INVALID='%s'): %s -- FAILED. Expected %r, got %r" % (is_cached, invalid_str, name, result, output))
+                        failures.append("Template test (Cached='%s', Compiled='%s', Streamed='%s', TEMPLATE_STRING_IF_INVALID='%s'): %s -- FAILED. Expected %r, got %r" % (is_cached, is_compiled, is_streamed, invalid_str, name, result, output))
                 cache_loader.reset()
 
             if 'LANGUAGE_CODE' in vals[1]:
@@ -416,14 +587,18 @@ class Templates(unittest.TestCase):
         deactivate()
         settings.TEMPLATE_DEBUG = old_td
         settings.TEMPLATE_STRING_IF_INVALID = old_invalid
+        settings.TEMPLATE_COMPILE = old_compile
 
         self.assertEqual(failures, [], "Tests failed:\n%s\n%s" %
             ('-'*70, ("\n%s\n" % ('-'*70)).join(failures)))
 
-    def render(self, test_template, vals):
+    def render(self, test_template, vals, streamed=False):
         context = template.Context(vals[1])
         before_stack_size = len(context.dicts)
-        output = test_template.render(context)
+        if streamed:
+            output = u''.join(test_template.generate(context))
+        else:
+            output = test_template.render(context)
         if len(context.dicts) != before_stack_size:
             raise ContextStackException
         return output
@@ -1286,6 +1461,14 @@ class Templates(unittest.TestCase):
             # Regression test for #11270.
             'cache17': ('{% load cache %}{% cache 10 long_cache_key poem %}Some Content{% endcache %}', {'poem': 'Oh freddled gruntbuggly/Thy micturations are to me/As plurdled gabbleblotchits/On a lurgid bee/That mordiously hath bitled out/Its earted jurtles/Into a rancid festering/Or else I shall rend thee in the gobberwarts with my blurglecruncheon/See if I dont.'}, 'Some Content'),
 
+            # {% cachebatch %} fetches and stores the fragments in bulk, using
+            # the same keys as the {% cache %} tag.
+            'cache18': ('{% load cache %}{% cachebatch %}{% for i in items %}{% cache 2 batch i %}{{ i }}a{% endcache %}{% endfor %}{% endcachebatch %}', {'items': [1, 2]}, '1a2a'),
+            'cache19': ('{% load cache %}{% cachebatch %}{% for i in items %}{% cache 2 batch i %}{{ i }}b{% endcache %}{% endfor %}{% endcachebatch %}', {'items': [1, 2, 3]}, '1a2a3b'),
+            'cache20': ('{% load cache %}{% cache 2 batch i %}{{ i }}c{% endcache %}', {'i': 3}, '3b'),
+            'cache21': ('{% load cache %}{% cachebatch %}{% cycle "a" "b" %}{% cache 2 batch i %}{% endcache %}{% cycle "c" "d" %}{% endcachebatch %}', {'i': 1}, 'a1ac'),
+            'cache22': ('{% load cache %}{% cachebatch foo %}{% endcachebatch %}', {}, template.TemplateSyntaxError),
+
             ### AUTOESCAPE TAG ##############################################
             'autoescape-tag01': ("{% autoescape off %}hello{% endautoescape %}", {}, "hello"),
             'autoescape-tag02': ("{% autoescape off %}{{ first }}{% endautoescape %}", {"first": "<b>hello</b>"}, "<b>hello</b>"),
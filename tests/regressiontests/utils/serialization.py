@@ -0,0 +1,35 @@
+from unittest import TestCase
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.serialization import (get_serializer, PickleSerializer,
+    MarshalSerializer, JSONSerializer, CompressedSerializer)
+
+class SerializerTests(TestCase):
+    value = {'name': 'value', 'list': [1, 2.5, None, True], 'text': 'x' * 1000}
+
+    def test_get_serializer(self):
+        self.assertTrue(isinstance(get_serializer(), PickleSerializer))
+        self.assertTrue(isinstance(get_serializer('marshal'), MarshalSerializer))
+        self.assertTrue(isinstance(get_serializer('json'), JSONSerializer))
+        self.assertTrue(isinstance(get_serializer('django.utils.serialization.JSONSerializer'), JSONSerializer))
+        self.assertRaises(ImproperlyConfigured, get_serializer, 'yaml')
+        self.assertRaises(ImproperlyConfigured, get_serializer, 'django.utils.serialization.YAMLSerializer')
+
+    def test_round_trip(self):
+        for name in ('pickle', 'marshal', 'json'):
+            serializer = get_serializer(name)
+            data = serializer.dumps(self.value)
+            self.assertTrue(isinstance(data, str))
+            self.assertEqual(serializer.loads(data), self.value)
+
+    def test_compression(self):
+        serializer = get_serializer('pickle', compress_min_length=100)
+        self.assertTrue(isinstance(serializer, CompressedSerializer))
+        data = serializer.dumps(self.value)
+        self.assertEqual(data[0], 'z')
+        self.assertTrue(len(data) < len(PickleSerializer().dumps(self.value)))
+        self.assertEqual(serializer.loads(data), self.value)
+        # Short values aren't compressed.
+        data = serializer.dumps('short')
+        self.assertEqual(data[0], '-')
+        self.assertEqual(serializer.loads(data), 'short')
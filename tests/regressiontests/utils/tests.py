@@ -26,6 +26,7 @@ __test__ = {
 from dateformat import *
 from feedgenerator import *
 from module_loading import *
+from serialization import *
 from termcolors import *
 
 class TestUtilsHtml(TestCase):